@@ -0,0 +1,151 @@
+"""
+analytics/kpi_customer_revenue.py
+---------------------------------
+Genera tre file JSON per l'analisi del fatturato e del margine lordo per cliente:
+
+  kpi_revenue_by_customer.json
+      Ranking dei TOP_N_CUSTOMERS clienti per fatturato.
+      Adatto per un grafico a barre orizzontali o una tabella.
+
+  kpi_revenue_by_customer_type.json
+      Fatturato e margine per tipo cliente (Ospedale, Farmacia, Grossista, ASL).
+
+  kpi_revenue_by_region.json
+      Fatturato e margine per regione geografica.
+
+Definizioni:
+  - revenue      : somma di Venduto.SaleValue
+  - cogs         : somma di QuantitySold × MasterMaterial.UnitCost
+  - gross_margin : revenue − cogs
+  - margin_rate  : gross_margin / revenue
+  - revenue_share: quota del fatturato totale
+
+Output:
+  data_output/analytics/kpi_revenue_by_customer.json
+  data_output/analytics/kpi_revenue_by_customer_type.json
+  data_output/analytics/kpi_revenue_by_region.json
+
+Utilizzo:
+  python -m src analytics customer_revenue
+"""
+
+import pandas as pd
+
+from analytics.output import meta
+
+# ---------------------------------------------------------------------------
+# Configurazione
+# ---------------------------------------------------------------------------
+
+# Clienti inclusi nel ranking (i primi per fatturato)
+TOP_N_CUSTOMERS = 20
+
+# Tabelle e colonne lette dal runner (analytics/runner.py)
+KPI_INPUTS = {
+    "Venduto":        ["CustomerID", "MaterialID", "QuantitySold", "SaleValue"],
+    "MasterMaterial": ["MaterialID", "UnitCost"],
+    "MasterCustomer": ["CustomerID", "CustomerName", "CustomerType", "Region"],
+}
+
+# Motori supportati
+KPI_ENGINES = ["pandas"]
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+def _revenue_by_customer(venduto: pd.DataFrame, materials: pd.DataFrame) -> pd.DataFrame:
+    """
+    Fatturato e costo del venduto per CustomerID.
+
+    UnitCost viene associato alle categorie di MaterialID (una volta per
+    materiale, non per riga di Venduto).
+    """
+    unit_cost = venduto["MaterialID"].map(materials.set_index("MaterialID")["UnitCost"]).astype(float)
+    df = pd.DataFrame({
+        "CustomerID": venduto["CustomerID"],
+        "revenue":    venduto["SaleValue"],
+        "cogs":       venduto["QuantitySold"] * unit_cost,
+    })
+    return df.groupby("CustomerID", observed=True).sum().reset_index()
+
+
+def _finalize(df: pd.DataFrame, total_revenue: float) -> pd.DataFrame:
+    """Margine, rate e quota del fatturato; valori arrotondati per la serializzazione JSON."""
+    df["gross_margin"]  = (df["revenue"] - df["cogs"]).round(2)
+    df["margin_rate"]   = (df["gross_margin"] / df["revenue"]).round(4)
+    df["revenue_share"] = (df["revenue"] / total_revenue).round(4)
+    df["revenue"]       = df["revenue"].round(2)
+    return df.drop(columns="cogs").sort_values("revenue", ascending=False).reset_index(drop=True)
+
+
+def _by_attribute(df: pd.DataFrame, column: str, total_revenue: float) -> pd.DataFrame:
+    """Fatturato e margine per un attributo di MasterCustomer (CustomerType, Region)."""
+    grouped = (
+        df.groupby(column, observed=True)
+        .agg(customers=("CustomerID", "nunique"), revenue=("revenue", "sum"), cogs=("cogs", "sum"))
+        .reset_index()
+    )
+    grouped[column] = grouped[column].astype(str)
+    return _finalize(grouped, total_revenue)
+
+
+# ---------------------------------------------------------------------------
+# KPI
+# ---------------------------------------------------------------------------
+
+def compute(tables: dict, engine: str = "pandas") -> dict:
+    """
+    Calcola fatturato e margine lordo per cliente, tipo cliente e regione (chiamata da analytics/runner.py).
+
+    Args:
+        tables: {tabella: DataFrame} con le colonne di KPI_INPUTS
+        engine: uno di KPI_ENGINES
+
+    Returns:
+        {nome file JSON: payload {"meta", "data"}}
+    """
+    customers = tables["MasterCustomer"]
+    by_cust   = _revenue_by_customer(tables["Venduto"], tables["MasterMaterial"])
+    by_cust["CustomerID"] = by_cust["CustomerID"].astype(str)
+    by_cust   = customers.merge(by_cust, on="CustomerID", how="inner")
+    total     = by_cust["revenue"].sum()
+
+    by_type   = _by_attribute(by_cust, "CustomerType", total)
+    by_region = _by_attribute(by_cust, "Region", total)
+
+    # Ranking: rank=1 → cliente con il fatturato più alto
+    top = _finalize(by_cust.copy(), total).head(TOP_N_CUSTOMERS)
+    top.insert(0, "rank", range(1, len(top) + 1))
+    for col in ["CustomerType", "Region"]:
+        top[col] = top[col].astype(str)
+
+    tables_used = ["Venduto", "MasterMaterial", "MasterCustomer"]
+    return {
+        "kpi_revenue_by_customer.json": {
+            "meta": meta(
+                f"Fatturato per cliente — ranking dei primi {TOP_N_CUSTOMERS} clienti per fatturato "
+                "(SaleValue) con margine lordo (SaleValue − QuantitySold × UnitCost), "
+                "margin_rate e quota del fatturato totale (revenue_share).",
+                tables_used,
+            ),
+            "data": top.to_dict(orient="records"),
+        },
+        "kpi_revenue_by_customer_type.json": {
+            "meta": meta(
+                "Fatturato e margine lordo per tipo cliente (MasterCustomer.CustomerType), "
+                "con numero di clienti e quota del fatturato totale.",
+                tables_used,
+            ),
+            "data": by_type.to_dict(orient="records"),
+        },
+        "kpi_revenue_by_region.json": {
+            "meta": meta(
+                "Fatturato e margine lordo per regione (MasterCustomer.Region), "
+                "con numero di clienti e quota del fatturato totale.",
+                tables_used,
+            ),
+            "data": by_region.to_dict(orient="records"),
+        },
+    }
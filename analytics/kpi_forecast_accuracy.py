@@ -0,0 +1,244 @@
+"""
+analytics/kpi_forecast_accuracy.py
+----------------------------------
+Genera tre file JSON per l'analisi di forecast accuracy:
+
+  kpi_forecast_accuracy_by_horizon.json
+      MAE, MAPE, WAPE e Bias per orizzonte (H=1…15), su tutti i materiali.
+      Adatto per la curva accuracy vs orizzonte.
+
+  kpi_forecast_accuracy_by_category_horizon.json
+      Stesse metriche per categoria terapeutica × orizzonte.
+
+  kpi_forecast_accuracy_by_importance_horizon.json
+      Stesse metriche per classe di importanza (imp_1/imp_2/imp_3) × orizzonte.
+
+Definizioni (errore = ForecastQty − actual, actual = VendutoMensile.QuantitySold
+del materiale nel ForecastMonth):
+  - MAE      : media di |errore|
+  - MAPE     : media di |errore| / actual, sulle sole righe con actual > 0
+               (null se non ce ne sono)
+  - WAPE     : Σ |errore| / Σ actual
+  - Bias     : media dell'errore (> 0 = sovrastima, < 0 = sottostima)
+  - Bias %   : Σ errore / Σ actual
+
+Sono valutati solo i mesi storici (history_months: i mesi di
+Ordinato.OrderDate). Le vendite spedite dopo la finestra sono la coda degli
+ultimi ordini, non la domanda del mese, e ne sono escluse. Un materiale senza
+venduto in un mese storico ha actual 0.
+
+Calcolo: invece di unire Forecast (15 orizzonti per materiale × mese) con le
+vendite, gli actual vengono sommati in un array denso materiali × mesi; ogni
+forecast vi accede con indici interi (materiale, mese) e le metriche sono
+somme per gruppo × orizzonte con np.bincount. Nessun join e nessun groupby
+sulle righe di Forecast.
+
+Output:
+  data_output/analytics/kpi_forecast_accuracy_by_horizon.json
+  data_output/analytics/kpi_forecast_accuracy_by_category_horizon.json
+  data_output/analytics/kpi_forecast_accuracy_by_importance_horizon.json
+
+Utilizzo:
+  python -m src analytics forecast_accuracy
+"""
+
+import numpy as np
+import pandas as pd
+
+from analytics.loader import history_months
+from analytics.output import meta
+
+# ---------------------------------------------------------------------------
+# Configurazione
+# ---------------------------------------------------------------------------
+
+# Tabelle e colonne lette dal runner (analytics/runner.py)
+KPI_INPUTS = {
+    "Forecast":       ["ForecastMonth", "MaterialID", "Horizon", "ForecastQty"],
+    "VendutoMensile": ["SalesMonth", "MaterialID", "QuantitySold"],
+    "MasterMaterial": ["MaterialID", "Category", "Importance"],
+}
+
+# Motori supportati
+KPI_ENGINES = ["pandas"]
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+def _month_number(values: pd.Series) -> np.ndarray:
+    """Months since 1970-01 of a datetime64 column."""
+    return values.to_numpy().astype("datetime64[M]").astype(np.int64)
+
+
+def _material_index(ids: pd.Series, materials: pd.Index) -> np.ndarray:
+    """Position of each MaterialID in materials (-1 if unknown), resolved once per category."""
+    if isinstance(ids.dtype, pd.CategoricalDtype):
+        codes    = ids.cat.codes.to_numpy()
+        position = materials.get_indexer(ids.cat.categories)
+        return np.where(codes >= 0, position[codes], -1)
+    return materials.get_indexer(ids)
+
+
+def _actual_matrix(sales: pd.DataFrame, materials: pd.Index) -> tuple[np.ndarray, int]:
+    """
+    Dense materiali × mesi storici (history_months) of QuantitySold; sales
+    outside the window are dropped.
+
+    Returns:
+        (array float64 [n_materials, n_months], month number of column 0)
+    """
+    first, last = (int(m.astype(np.int64)) for m in history_months())
+    n_months    = last - first + 1
+    month = _month_number(sales["SalesMonth"])
+    mat   = _material_index(sales["MaterialID"], materials)
+    keep  = (mat >= 0) & (month >= first) & (month <= last)
+    month, mat = month[keep], mat[keep]
+
+    flat     = mat * n_months + (month - first)
+    actual   = np.bincount(flat, weights=sales["QuantitySold"].to_numpy()[keep],
+                           minlength=len(materials) * n_months)
+    return actual.reshape(len(materials), n_months), first
+
+
+def _forecast_errors(forecast: pd.DataFrame, actual: np.ndarray, first: int,
+                     materials: pd.Index) -> dict:
+    """
+    Forecast rows of the historical months with their actual, looked up by (material, month) index.
+
+    Returns:
+        dict of aligned arrays: material (index), horizon, actual, forecast
+    """
+    mat   = _material_index(forecast["MaterialID"], materials)
+    month = _month_number(forecast["ForecastMonth"]) - first
+    keep  = (mat >= 0) & (month >= 0) & (month < actual.shape[1])
+    mat, month = mat[keep], month[keep]
+    return {
+        "material": mat,
+        "horizon":  forecast["Horizon"].to_numpy()[keep].astype(np.int64),
+        "actual":   actual[mat, month],
+        "forecast": forecast["ForecastQty"].to_numpy()[keep].astype(np.float64),
+    }
+
+
+def _group_sums(rows: dict, group: np.ndarray, n_groups: int, n_horizons: int) -> dict:
+    """
+    Sums from which the metrics derive, for every group × horizon
+    (flat index group × n_horizons + horizon − 1).
+
+    Args:
+        rows:  output of _forecast_errors
+        group: group code of each row (0 … n_groups − 1)
+    """
+    flat   = group * n_horizons + rows["horizon"] - 1
+    size   = n_groups * n_horizons
+    error  = rows["forecast"] - rows["actual"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ape = np.where(rows["actual"] > 0, np.abs(error) / rows["actual"], 0.0)
+
+    def total(weights=None):
+        return np.bincount(flat, weights=weights, minlength=size)
+
+    return {
+        "forecasts":      total(),
+        "mape_forecasts": total((rows["actual"] > 0).astype(np.float64)),
+        "actual_qty":     total(rows["actual"]),
+        "forecast_qty":   total(rows["forecast"]),
+        "abs_error":      total(np.abs(error)),
+        "error":          total(error),
+        "ape":            total(ape),
+    }
+
+
+def _ratio(numerator: np.ndarray, denominator: np.ndarray, digits: int) -> np.ndarray:
+    """numerator / denominator rounded, None where the denominator is 0 (object array: JSON null)."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        values = np.round(numerator / denominator, digits)
+    return np.array([float(v) if d > 0 else None for v, d in zip(values, denominator)], dtype=object)
+
+
+def _accuracy(rows: dict, n_horizons: int, labels=None, column=None, codes=None) -> pd.DataFrame:
+    """
+    Metriche di accuracy per orizzonte, o per labels × orizzonte.
+
+    Args:
+        rows:       output of _forecast_errors
+        n_horizons: highest horizon
+        labels:     group names (es. categorie) indexed by codes
+        column:     name of the group column in the output
+        codes:      group code of each material
+
+    Returns:
+        DataFrame [column,] Horizon, forecasts, actual_qty, forecast_qty,
+        mae, mape, wape, bias, bias_pct — only the groups with forecasts
+    """
+    labels = [None] if labels is None else list(labels)
+    group  = np.zeros(len(rows["material"]), dtype=np.int64) if codes is None else codes[rows["material"]]
+    sums   = _group_sums(rows, group, len(labels), n_horizons)
+
+    n  = sums["forecasts"]
+    df = pd.DataFrame({
+        "Horizon":      np.tile(np.arange(1, n_horizons + 1), len(labels)),
+        "forecasts":    n.astype(np.int64),
+        "actual_qty":   sums["actual_qty"].astype(np.int64),
+        "forecast_qty": sums["forecast_qty"].astype(np.int64),
+        "mae":          _ratio(sums["abs_error"], n, 2),
+        "mape":         _ratio(sums["ape"], sums["mape_forecasts"], 4),
+        "wape":         _ratio(sums["abs_error"], sums["actual_qty"], 4),
+        "bias":         _ratio(sums["error"], n, 2),
+        "bias_pct":     _ratio(sums["error"], sums["actual_qty"], 4),
+    })
+    if column is not None:
+        df.insert(0, column, np.repeat(labels, n_horizons))
+    return df[n > 0].reset_index(drop=True)
+
+
+# ---------------------------------------------------------------------------
+# KPI
+# ---------------------------------------------------------------------------
+
+def compute(tables: dict, engine: str = "pandas") -> dict:
+    """
+    Calcola le metriche di forecast accuracy (chiamata da analytics/runner.py).
+
+    Args:
+        tables: {tabella: DataFrame} con le colonne di KPI_INPUTS
+        engine: uno di KPI_ENGINES
+
+    Returns:
+        {nome file JSON: payload {"meta", "data"}}
+    """
+    master    = tables["MasterMaterial"]
+    materials = pd.Index(master["MaterialID"].astype(str))
+
+    actual, first = _actual_matrix(tables["VendutoMensile"], materials)
+    rows          = _forecast_errors(tables["Forecast"], actual, first, materials)
+    n_horizons    = int(rows["horizon"].max()) if len(rows["horizon"]) else 0
+
+    outputs = {"Horizon": _accuracy(rows, n_horizons)}
+    for column in ["Category", "Importance"]:
+        groups          = pd.Categorical(master[column].astype(str))
+        outputs[column] = _accuracy(rows, n_horizons, groups.categories, column, groups.codes)
+
+    definitions = ("Errore = ForecastQty − QuantitySold del mese (VendutoMensile). "
+                   "MAE = media |errore|; MAPE = media |errore| / actual sulle righe con actual > 0; "
+                   "WAPE = Σ|errore| / Σ actual; bias = media errore (> 0 sovrastima); "
+                   "bias_pct = Σ errore / Σ actual. Solo mesi storici (i mesi di Ordinato.OrderDate).")
+    return {
+        "kpi_forecast_accuracy_by_horizon.json": {
+            "meta": meta("Forecast accuracy per orizzonte (H = mesi di anticipo), su tutti i materiali. "
+                         + definitions, ["Forecast", "VendutoMensile"]),
+            "data": outputs["Horizon"].to_dict(orient="records"),
+        },
+        "kpi_forecast_accuracy_by_category_horizon.json": {
+            "meta": meta("Forecast accuracy per categoria terapeutica × orizzonte. " + definitions,
+                         ["Forecast", "VendutoMensile", "MasterMaterial"]),
+            "data": outputs["Category"].to_dict(orient="records"),
+        },
+        "kpi_forecast_accuracy_by_importance_horizon.json": {
+            "meta": meta("Forecast accuracy per classe di importanza (imp_1 / imp_2 / imp_3) × orizzonte. "
+                         + definitions, ["Forecast", "VendutoMensile", "MasterMaterial"]),
+            "data": outputs["Importance"].to_dict(orient="records"),
+        },
+    }
@@ -0,0 +1,208 @@
+"""
+analytics/kpi_inventory.py
+--------------------------
+Genera due file JSON per l'analisi dell'inventario:
+
+  kpi_inventory_by_importance_month.json
+      Stockout, rotazione e copertura per classe di importanza × mese.
+      Adatto per linee multiple (una per classe) sul trend mensile.
+
+  kpi_inventory_by_importance.json
+      Stesse metriche per classe di importanza sull'intero periodo.
+
+Definizioni (per materiale × giorno di Inventario):
+  - Stockout        : OpeningStock + DailyInflow − DailyOutflow < 0, cioè la
+                      domanda del giorno non è stata coperta (come il
+                      conteggio di generate_inventory.py)
+  - Days of cover   : ClosingStock / uscita media giornaliera degli ultimi
+                      COVER_WINDOW_DAYS giorni del materiale (finestra mobile;
+                      indefinita se l'uscita media è 0)
+  - Low cover       : days of cover < LeadTimeDays del materiale: lo stock
+                      finisce prima che arrivi un rifornimento
+  - Turns           : uscite del periodo / stock medio del periodo (Σ dei
+                      ClosingStock medi dei materiali)
+
+Per riga JSON:
+  materials, material_days, stockout_days, stockout_rate, outflow_qty,
+  avg_stock, turns, avg_days_of_cover, low_cover_rate
+
+Calcolo: Inventario viene letto a blocchi di materiali interi (iter_table),
+per cui la memoria dipende da INVENTORY_CHUNK_ROWS e non dal numero di
+materiali × giorni. Ogni blocco viene ordinato una volta per
+(MaterialID, Date); le finestre mobili sono differenze di somme cumulate
+che ripartono a ogni materiale, senza un groupby per materiale. Ogni blocco
+produce somme per importanza × mese, sommate alla fine.
+
+Output:
+  data_output/analytics/kpi_inventory_by_importance_month.json
+  data_output/analytics/kpi_inventory_by_importance.json
+
+Utilizzo:
+  python -m src analytics inventory
+"""
+
+import numpy as np
+import pandas as pd
+
+from analytics.loader import iter_table
+from analytics.output import meta
+
+# ---------------------------------------------------------------------------
+# Configurazione
+# ---------------------------------------------------------------------------
+
+# Giorni della finestra mobile dell'uscita media (days of cover)
+COVER_WINDOW_DAYS = 28
+
+# Righe di Inventario per blocco (sempre materiali interi, vedi iter_table).
+# Il picco di memoria cresce di ~0,5 KiB per riga del blocco.
+INVENTORY_CHUNK_ROWS = 250_000
+
+# Colonne di Inventario lette a blocchi da compute()
+INVENTORY_COLUMNS = ["MaterialID", "Date", "OpeningStock", "DailyInflow", "DailyOutflow", "ClosingStock"]
+
+# Tabelle e colonne lette dal runner (analytics/runner.py); Inventario non è
+# fra queste: compute() lo legge a blocchi
+KPI_INPUTS = {
+    "MasterMaterial": ["MaterialID", "Importance", "LeadTimeDays"],
+}
+
+# Motori supportati
+KPI_ENGINES = ["pandas"]
+
+# Somme per importanza × mese accumulate sui blocchi
+_SUMS = ["material_days", "stockout_days", "outflow_qty", "stock_days", "cover_days", "cover_sum", "low_cover_days"]
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+def _rolling_mean(values: np.ndarray, group_start: np.ndarray, window: int) -> np.ndarray:
+    """
+    Mean of the last `window` values of each row's group (fewer at the start
+    of the group), rows sorted by group: differences of one cumulative sum.
+    """
+    idx    = np.arange(len(values))
+    cumsum = np.concatenate([[0.0], np.cumsum(values, dtype=np.float64)])
+    start  = np.maximum(idx - window + 1, group_start)
+    return (cumsum[idx + 1] - cumsum[start]) / (idx + 1 - start)
+
+
+def _chunk_sums(chunk: pd.DataFrame, master: pd.DataFrame) -> pd.DataFrame:
+    """
+    _SUMS per Importance × month (and materials, the distinct materials) of one
+    chunk of whole materials.
+
+    MaterialID is used through its category codes: the master attributes are
+    looked up once per material, not once per row.
+    """
+    chunk    = chunk.sort_values(["MaterialID", "Date"], kind="stable")
+    ids      = chunk["MaterialID"].astype("category")
+    material = ids.cat.codes.to_numpy()
+    new      = np.r_[True, material[1:] != material[:-1]]
+    start    = np.maximum.accumulate(np.where(new, np.arange(len(material)), 0))
+
+    closing = chunk["ClosingStock"].to_numpy(np.float64)
+    outflow = chunk["DailyOutflow"].to_numpy(np.float64)
+    raw     = chunk["OpeningStock"].to_numpy(np.int64) + chunk["DailyInflow"].to_numpy(np.int64) - outflow
+
+    info       = master.set_index("MaterialID").reindex(ids.cat.categories.astype(str))
+    lead_time  = info["LeadTimeDays"].to_numpy(np.float64)[material]
+    importance = info["Importance"].astype(str).to_numpy()[material]
+
+    avg_out = _rolling_mean(outflow, start, COVER_WINDOW_DAYS)
+    defined = avg_out > 0
+    cover   = np.divide(closing, avg_out, out=np.zeros_like(closing), where=defined)
+
+    df = pd.DataFrame({
+        "Importance":     pd.Categorical(importance),
+        "month":          chunk["Date"].to_numpy().astype("datetime64[M]"),
+        "material":       material,
+        "material_days":  1,
+        "stockout_days":  (raw < 0).astype(np.int64),
+        "outflow_qty":    outflow,
+        "stock_days":     closing,
+        "cover_days":     defined.astype(np.int64),
+        "cover_sum":      cover,
+        "low_cover_days": (defined & (cover < lead_time)).astype(np.int64),
+    })
+    keys = ["Importance", "month"]
+    sums = df.groupby(keys, observed=True)[_SUMS].sum()
+    sums["materials"] = df.groupby(keys, observed=True)["material"].nunique()
+    sums.index = sums.index.set_levels(sums.index.levels[0].astype(str), level=0)
+    return sums
+
+
+def _metrics(sums: pd.DataFrame) -> pd.DataFrame:
+    """Rate e medie dalle somme; valori arrotondati per la serializzazione JSON."""
+    df   = sums.reset_index()
+    days = df["material_days"] / df["materials"]          # giorni del periodo per materiale
+
+    def ratio(numerator, denominator, digits):
+        value = (numerator / denominator.where(denominator > 0)).round(digits)
+        return value.astype(object).where(value.notna(), None)
+
+    avg_stock = df["stock_days"] / days
+    out = df[["Importance", *(["month"] if "month" in df else []), "materials", "material_days", "stockout_days"]].copy()
+    out["stockout_rate"]     = ratio(df["stockout_days"], df["material_days"], 4)
+    out["outflow_qty"]       = df["outflow_qty"].astype(np.int64)
+    out["avg_stock"]         = avg_stock.round(1)
+    out["turns"]             = ratio(df["outflow_qty"], avg_stock, 4)
+    out["avg_days_of_cover"] = ratio(df["cover_sum"], df["cover_days"], 1)
+    out["low_cover_rate"]    = ratio(df["low_cover_days"], df["cover_days"], 4)
+    for col in ["materials", "material_days", "stockout_days"]:
+        out[col] = out[col].astype(np.int64)
+    return out
+
+
+# ---------------------------------------------------------------------------
+# KPI
+# ---------------------------------------------------------------------------
+
+def compute(tables: dict, engine: str = "pandas") -> dict:
+    """
+    Calcola stockout, rotazione e copertura per importanza (chiamata da analytics/runner.py).
+
+    Inventario viene letto qui a blocchi di materiali interi, non dal runner.
+
+    Args:
+        tables: {tabella: DataFrame} con le colonne di KPI_INPUTS
+        engine: uno di KPI_ENGINES
+
+    Returns:
+        {nome file JSON: payload {"meta", "data"}}
+    """
+    master = tables["MasterMaterial"].astype({"MaterialID": str})
+    partials = [_chunk_sums(chunk, master)
+                for chunk in iter_table("Inventario", INVENTORY_COLUMNS, key="MaterialID",
+                                        chunk_rows=INVENTORY_CHUNK_ROWS)]
+    if not partials:
+        raise ValueError("Inventario is empty: generate the data first (python -m src generate)")
+    # Chunks hold disjoint materials: every sum, the distinct materials too, adds up
+    by_month = pd.concat(partials).groupby(level=["Importance", "month"]).sum()
+
+    # Whole period: materials are the same in every month of a class, so they are not summed
+    by_importance = by_month.groupby(level="Importance")[_SUMS].sum()
+    by_importance["materials"] = by_month.groupby(level="Importance")["materials"].max()
+
+    by_month = _metrics(by_month)
+    by_month["month"] = by_month["month"].dt.strftime("%Y-%m")
+
+    definitions = ("Stockout = giorno con OpeningStock + DailyInflow − DailyOutflow < 0. "
+                   f"Days of cover = ClosingStock / uscita media degli ultimi {COVER_WINDOW_DAYS} giorni "
+                   "(giorni con uscita media 0 esclusi). Low cover = days of cover < LeadTimeDays. "
+                   "Turns = uscite del periodo / stock medio del periodo.")
+    tables_used = ["Inventario", "MasterMaterial"]
+    return {
+        "kpi_inventory_by_importance_month.json": {
+            "meta": meta("Inventario per classe di importanza × mese — stockout rate, rotazione "
+                         "(turns mensili) e giorni di copertura. " + definitions, tables_used),
+            "data": by_month.to_dict(orient="records"),
+        },
+        "kpi_inventory_by_importance.json": {
+            "meta": meta("Inventario per classe di importanza sull'intero periodo — stockout rate, "
+                         "rotazione (turns del periodo) e giorni di copertura. " + definitions, tables_used),
+            "data": _metrics(by_importance).to_dict(orient="records"),
+        },
+    }
@@ -20,23 +20,33 @@ Definizione OTIF:
 
 Mese di riferimento: OrderDate (mese in cui l'ordine è stato emesso).
 
+Motore di calcolo (ANALYTICS_ENGINE in src/config.py, `analytics --engine`):
+  - pandas : Ordinato e Venduto (KPI_INPUTS) letti da analytics/runner.py
+             insieme agli input degli altri KPI, join e aggregazioni in memoria
+  - sqlite : join, flag OTIF, aggregazioni, OTIF globale del mese e ranking
+             eseguiti da SQLite sul DB (DB_PATH, indice su Venduto.OrderID);
+             in Python arrivano solo le righe aggregate. I JSON sono identici
+             a quelli del motore pandas.
+
 Output:
   data_output/analytics/kpi_otif_by_month.json
   data_output/analytics/kpi_otif_by_customer_month.json
 
 Utilizzo:
   python -m analytics.kpi_otif
+  python -m src analytics otif --engine sqlite
 """
 
 import sys
-import json
 import random
+import sqlite3
+import numpy as np
 import pandas as pd
 from pathlib import Path
-from datetime import date
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
-from src.copy_to_local_directory_temp import copy_json_to_portfolio
+from src.config import DB_PATH, ANALYTICS_ENGINE
+from analytics.output import meta
 
 # ---------------------------------------------------------------------------
 # Configurazione
@@ -46,56 +56,115 @@ from src.copy_to_local_directory_temp import copy_json_to_portfolio
 # Tenuto basso per non appesantire il JSON — cambia se vuoi più clienti.
 SAMPLE_N_CUSTOMERS = 10
 
-# Cartella radice dei CSV generati da generate_fake_data.py
-OUTPUT_DIR    = Path("data_output")
+# Tabelle e colonne lette dal runner per il motore pandas (le date arrivano
+# già come datetime64, CustomerID come categoria)
+KPI_INPUTS = {
+    "Ordinato":       ["OrderID", "RequestedDate", "CustomerID", "QuantityOrdered"],
+    "Venduto":        ["OrderID", "ShipmentDate", "QuantitySold"],
+    "MasterCustomer": ["CustomerID", "CustomerName"],
+}
 
-# Sottocartella dove vengono scritti i JSON di analytics
-ANALYTICS_DIR = OUTPUT_DIR / "analytics"
-ANALYTICS_DIR.mkdir(parents=True, exist_ok=True)
+# Motori supportati (vedi OTIF_ENGINES)
+KPI_ENGINES = ["pandas", "sqlite"]
 
 
 # ---------------------------------------------------------------------------
-# Helpers
+# Query SQLite (motore "sqlite")
 # ---------------------------------------------------------------------------
 
-def _meta(description: str, tables: list[str]) -> dict:
-    """
-    Costruisce il blocco 'meta' da inserire in testa ad ogni JSON.
-
-    Contiene:
-      - description : testo libero che spiega il KPI
-      - tables      : lista delle tabelle sorgente usate per il calcolo
-      - generated_at: data di generazione (ISO 8601, solo giorno)
-    """
-    return {
-        "description":  description,
-        "tables":       tables,
-        "generated_at": date.today().isoformat(),
-    }
-
+# Ordinato ⟕ Venduto con i flag OTIF riga per riga (stessa logica di
+# _build_otif_base), aggregato per mese × cliente in una tabella temporanea:
+# il join viene percorso una sola volta e da qui derivano entrambi i KPI.
+# Le date sono testo YYYY-MM-DD, per cui il confronto fra stringhe equivale a
+# quello fra date.
+SQL_OTIF_CUSTOMER_MONTH = """
+CREATE TEMP TABLE otif_customer_month AS
+WITH base AS (
+    SELECT
+        substr(o.RequestedDate, 1, 7)                                      AS month,
+        o.CustomerID                                                       AS CustomerID,
+        o.OrderID                                                          AS OrderID,
+        v.ShipmentDate IS NOT NULL AND v.ShipmentDate <= o.RequestedDate   AS onTime,
+        v.QuantitySold IS NOT NULL AND v.QuantitySold >= o.QuantityOrdered AS inFull
+    FROM Ordinato o
+    LEFT JOIN Venduto v ON v.OrderID = o.OrderID
+)
+SELECT
+    month,
+    CustomerID,
+    COUNT(OrderID)         AS total_orders,
+    SUM(onTime AND inFull) AS otif_orders,
+    SUM(onTime)            AS on_time_orders,
+    SUM(inFull)            AS in_full_orders
+FROM base
+GROUP BY month, CustomerID
+"""
 
-def _load_data() -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
-    """
-    Legge i CSV necessari da OUTPUT_DIR e li restituisce come DataFrame.
+# KPI 1: totali del mese su tutti i clienti
+SQL_OTIF_BY_MONTH = """
+WITH by_month AS (
+    SELECT
+        month,
+        SUM(total_orders)   AS total_orders,
+        SUM(otif_orders)    AS otif_orders,
+        SUM(on_time_orders) AS on_time_orders,
+        SUM(in_full_orders) AS in_full_orders
+    FROM otif_customer_month
+    GROUP BY month
+)
+SELECT
+    month,
+    total_orders,
+    otif_orders,
+    on_time_orders,
+    in_full_orders,
+    pd_round(1.0 * otif_orders    / total_orders, 4) AS otif_rate,
+    pd_round(1.0 * on_time_orders / total_orders, 4) AS on_time_rate,
+    pd_round(1.0 * in_full_orders / total_orders, 4) AS in_full_rate
+FROM by_month
+ORDER BY month
+"""
 
-    Tabelle caricate:
-      - Ordinato.csv  : tutti gli ordini (1 riga = 1 ordine)
-      - Venduto.csv   : tutte le spedizioni/vendite (1 riga = 1 riga di venduto)
-      - MasterCustomer.csv : anagrafica clienti (solo CustomerID e CustomerName)
+# KPI 2: clienti campionati ({customers} = un segnaposto per cliente).
+# L'OTIF globale del mese è una somma a finestra su tutti i clienti, calcolata
+# prima di filtrare il campione; il ranking è nel mese fra i clienti campionati.
+SQL_OTIF_BY_CUSTOMER_MONTH = """
+WITH month_totals AS (
+    SELECT
+        c.*,
+        SUM(c.otif_orders)  OVER w AS month_otif_orders,
+        SUM(c.total_orders) OVER w AS month_total_orders
+    FROM otif_customer_month c
+    WINDOW w AS (PARTITION BY c.month)
+),
+sample AS (
+    SELECT
+        t.month,
+        t.CustomerID,
+        m.CustomerName,
+        t.total_orders,
+        t.otif_orders,
+        t.on_time_orders,
+        t.in_full_orders,
+        pd_round(1.0 * t.otif_orders       / t.total_orders,       4) AS otif_rate,
+        pd_round(1.0 * t.on_time_orders    / t.total_orders,       4) AS on_time_rate,
+        pd_round(1.0 * t.in_full_orders    / t.total_orders,       4) AS in_full_rate,
+        pd_round(1.0 * t.month_otif_orders / t.month_total_orders, 4) AS global_otif_rate
+    FROM month_totals t
+    JOIN MasterCustomer m ON m.CustomerID = t.CustomerID
+    WHERE t.CustomerID IN ({customers})
+)
+SELECT
+    *,
+    RANK() OVER (PARTITION BY month ORDER BY otif_rate DESC) AS "rank"
+FROM sample
+ORDER BY month, "rank", CustomerID
+"""
 
-    Le date vengono parsate direttamente in datetime per facilitare i confronti.
-    """
-    ordinato  = pd.read_csv(OUTPUT_DIR / "Ordinato.csv",
-                            parse_dates=["OrderDate", "RequestedDate"])
-    
-    venduto   = pd.read_csv(OUTPUT_DIR / "Venduto.csv",
-                            parse_dates=["ShipmentDate"])
-    
-    customers = pd.read_csv(OUTPUT_DIR / "MasterCustomer.csv",
-                            usecols=["CustomerID", "CustomerName"])
-    
-    return ordinato, venduto, customers
 
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
 
 def _build_otif_base(ordinato: pd.DataFrame,
                      venduto: pd.DataFrame) -> pd.DataFrame:
@@ -193,55 +262,37 @@ def _agg_otif(df: pd.DataFrame,
     return agg.sort_values(group_cols).reset_index(drop=True)
 
 
-def _save(payload: dict, filename: str) -> None:
-    """
-    Serializza il payload come JSON e lo scrive in ANALYTICS_DIR.
-
-    Il payload deve avere la struttura:
-      { "meta": {...}, "data": [...] }
+# ---------------------------------------------------------------------------
+# Motori di calcolo
+# ---------------------------------------------------------------------------
 
-    Stampa a console il nome del file e il numero di righe nel campo 'data'.
+def _pd_round(value: float, digits: int) -> float:
+    """
+    Arrotondamento di numpy (quello di Series.round nel motore pandas),
+    registrato in SQLite come pd_round: ROUND di SQLite arrotonda i valori a
+    metà (es. 0.03125) per eccesso invece che al pari, e i rate (e quindi il
+    ranking) differirebbero.
     """
-    path = ANALYTICS_DIR / filename
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(payload, f, indent=2, ensure_ascii=False)
-    n = len(payload["data"])
-    print(f"[OK] {filename:<45} — {n} righe")
+    return float(np.round(value, digits))
 
 
-# ---------------------------------------------------------------------------
-# Entry point
-# ---------------------------------------------------------------------------
+def _otif_pandas(tables: dict) -> tuple[list[dict], list[dict]]:
+    """
+    Motore pandas: calcola i due KPI in memoria sulle tabelle di KPI_INPUTS.
 
-def main() -> None:
-    # Load ordinato, venduto, MasterCustomer from csv files
-    ordinato, venduto, customers = _load_data()
+    Restituisce:
+      (righe by_month, righe by_customer_month) come liste di dict
+    """
+    ordinato, venduto, customers = tables["Ordinato"], tables["Venduto"], tables["MasterCustomer"]
 
     # OTIF calculation is returned to df
     df = _build_otif_base(ordinato, venduto)
 
-    # -----------------------------------------------------------------
     # KPI 1 — OTIF aggregato per mese (tutti i clienti)
-    # -----------------------------------------------------------------
     # Raggruppiamo solo per mese: 1 riga = 1 mese, con i totali globali.
-    # Questo JSON è pensato per grafici a linee o a barre sul trend mensile.
     by_month = _agg_otif(df, ["month"])
-    _save(
-        {
-            "meta": _meta(
-                "OTIF mensile aggregato — On Time In Full calcolato su tutti gli ordini. "
-                "Mese di riferimento = mese dell'ordine (OrderDate). "
-                "Ordini non evasi contano come NOT on time e NOT in full.",
-                ["Ordinato", "Venduto"],
-            ),
-            "data": by_month.to_dict(orient="records"),
-        },
-        "kpi_otif_by_month.json",
-    )
 
-    # -----------------------------------------------------------------
     # KPI 2 — OTIF per cliente × mese (campione casuale di clienti)
-    # -----------------------------------------------------------------
     # Estraiamo casualmente SAMPLE_N_CUSTOMERS clienti per contenere
     # le dimensioni del JSON (con tutti i clienti sarebbe troppo grande).
     sampled_ids      = random.sample(list(customers["CustomerID"]), SAMPLE_N_CUSTOMERS)
@@ -272,9 +323,86 @@ def main() -> None:
     # Ordine finale: prima per mese, poi per ranking (migliori in cima)
     by_cust = by_cust.sort_values(["month", "rank"]).reset_index(drop=True)
 
-    _save(
-        {
-            "meta": _meta(
+    return by_month.to_dict(orient="records"), by_cust.to_dict(orient="records")
+
+
+def _otif_sqlite(tables: dict) -> tuple[list[dict], list[dict]]:
+    """
+    Motore sqlite: calcola i due KPI con le query SQL_OTIF_* sul DB in sola
+    lettura (tables è vuoto: il runner non legge input per questo motore).
+
+    Le tabelle fatti non vengono mai lette in Python: arrivano solo le
+    anagrafiche clienti (per il campione, estratto come nel motore pandas,
+    nell'ordine del CSV) e le righe aggregate.
+
+    Restituisce:
+      (righe by_month, righe by_customer_month) come liste di dict
+    """
+    if not DB_PATH.exists():
+        raise FileNotFoundError(f"{DB_PATH} not found: generate the data first (python -m src generate)")
+
+    conn = sqlite3.connect(f"{DB_PATH.resolve().as_uri()}?mode=ro", uri=True)
+    try:
+        conn.create_function("pd_round", 2, _pd_round, deterministic=True)
+
+        def rows(sql, params=()):
+            cursor  = conn.execute(sql, params)
+            columns = [d[0] for d in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor]
+
+        conn.execute(SQL_OTIF_CUSTOMER_MONTH)
+        by_month = rows(SQL_OTIF_BY_MONTH)
+
+        customer_ids = [row[0] for row in conn.execute("SELECT CustomerID FROM MasterCustomer ORDER BY rowid")]
+        sampled_ids  = random.sample(customer_ids, SAMPLE_N_CUSTOMERS)
+        by_cust = rows(SQL_OTIF_BY_CUSTOMER_MONTH.format(customers=", ".join("?" * len(sampled_ids))),
+                       sampled_ids)
+    finally:
+        conn.close()
+    return by_month, by_cust
+
+
+# Motori di calcolo: nome → funzione che restituisce (by_month, by_customer_month)
+OTIF_ENGINES = {
+    "pandas": _otif_pandas,
+    "sqlite": _otif_sqlite,
+}
+
+
+# ---------------------------------------------------------------------------
+# KPI
+# ---------------------------------------------------------------------------
+
+def compute(tables: dict, engine: str = "pandas") -> dict:
+    """
+    Calcola i due KPI OTIF (chiamata da analytics/runner.py).
+
+    Args:
+        tables: {tabella: DataFrame} con le colonne di KPI_INPUTS (vuoto per il motore sqlite)
+        engine: uno di KPI_ENGINES
+
+    Returns:
+        {nome file JSON: payload {"meta", "data"}}
+    """
+    if engine not in OTIF_ENGINES:
+        raise ValueError(f"Unknown engine '{engine}' (expected one of {', '.join(OTIF_ENGINES)})")
+    by_month, by_cust = OTIF_ENGINES[engine](tables)
+
+    return {
+        # KPI 1 — OTIF aggregato per mese (tutti i clienti)
+        # Questo JSON è pensato per grafici a linee o a barre sul trend mensile.
+        "kpi_otif_by_month.json": {
+            "meta": meta(
+                "OTIF mensile aggregato — On Time In Full calcolato su tutti gli ordini. "
+                "Mese di riferimento = mese dell'ordine (OrderDate). "
+                "Ordini non evasi contano come NOT on time e NOT in full.",
+                ["Ordinato", "Venduto"],
+            ),
+            "data": by_month,
+        },
+        # KPI 2 — OTIF per cliente × mese (campione casuale di clienti)
+        "kpi_otif_by_customer_month.json": {
+            "meta": meta(
                 "OTIF mensile per cliente — On Time In Full disaggregato "
                 "per CustomerID × mese di ordine. "
                 "Include OTIF globale del mese (global_otif_rate) come benchmark "
@@ -283,12 +411,23 @@ def main() -> None:
                 "Solo mesi con almeno un ordine sono inclusi.",
                 ["Ordinato", "Venduto", "MasterCustomer"],
             ),
-            "data": by_cust.to_dict(orient="records"),
+            "data": by_cust,
         },
-        "kpi_otif_by_customer_month.json",
-    )
+    }
+
+
+# ---------------------------------------------------------------------------
+# Entry point
+# ---------------------------------------------------------------------------
+
+def main(engine: str = ANALYTICS_ENGINE) -> None:
+    """Calcola e scrive i JSON OTIF da solo (python -m src analytics li esegue con gli altri KPI)."""
+    from analytics.runner import run_kpis
+    run_kpis(["otif"], engine=engine)
 
 
 if __name__ == "__main__":
+    from src.copy_to_local_directory_temp import copy_json_to_portfolio
+
     main()
     copy_json_to_portfolio()
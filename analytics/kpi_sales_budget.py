@@ -0,0 +1,146 @@
+"""
+analytics/kpi_sales_budget.py
+-----------------------------
+Genera due file JSON per l'analisi Actual vs Budget:
+
+  kpi_sales_vs_budget_by_month.json
+      Venduto e budget (quantità e valore) per mese, su tutti i materiali.
+      Adatto per un grafico a barre affiancate con lo scostamento %.
+
+  kpi_sales_vs_budget_by_category_month.json
+      Stesso confronto per categoria terapeutica × mese.
+      Adatto per una heatmap degli scostamenti.
+
+Definizioni:
+  - Actual : VendutoMensile (QuantitySold, SaleValue), mese di spedizione
+  - Budget : Budget (BudgetQty, BudgetValue), mese di budget
+  - Scostamento % = (actual − budget) / budget (null se il budget è 0)
+
+Solo i mesi storici sono inclusi (history_months: i mesi di
+Ordinato.OrderDate, cioè la finestra dei dati analizzati), su entrambi i lati: il budget copre anche i mesi futuri, e le
+vendite spedite dopo la finestra sono solo la coda degli ultimi ordini.
+Un materiale a budget senza venduto nel mese conta come actual 0.
+
+Output:
+  data_output/analytics/kpi_sales_vs_budget_by_month.json
+  data_output/analytics/kpi_sales_vs_budget_by_category_month.json
+
+Utilizzo:
+  python -m src analytics sales_budget
+"""
+
+import pandas as pd
+
+from analytics.loader import history_months
+from analytics.output import meta
+
+# ---------------------------------------------------------------------------
+# Configurazione
+# ---------------------------------------------------------------------------
+
+# Tabelle e colonne lette dal runner (analytics/runner.py)
+KPI_INPUTS = {
+    "VendutoMensile": ["SalesMonth", "MaterialID", "QuantitySold", "SaleValue"],
+    "Budget":         ["BudgetMonth", "MaterialID", "BudgetQty", "BudgetValue"],
+    "MasterMaterial": ["MaterialID", "Category"],
+}
+
+# Motori supportati
+KPI_ENGINES = ["pandas"]
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+def _rate(numerator: pd.Series, denominator: pd.Series) -> pd.Series:
+    """numerator / denominator a 4 decimali, None dove il denominatore è 0 (JSON null)."""
+    rate = (numerator / denominator.where(denominator != 0)).round(4)
+    return rate.astype(object).where(rate.notna(), None)
+
+
+def _by_material_month(df: pd.DataFrame, month_col: str, measures: dict,
+                       category: pd.Series) -> pd.DataFrame:
+    """
+    Righe per materiale × mese storico (history_months) con month "YYYY-MM",
+    Category e le misure rinominate.
+    """
+    first, last = history_months()
+    month = df[month_col].to_numpy().astype("datetime64[M]")
+    df    = df[(month >= first) & (month <= last)]
+    return pd.DataFrame({
+        "month":    df[month_col].dt.strftime("%Y-%m"),
+        "Category": df["MaterialID"].map(category).astype(str),
+        **{name: df[col] for col, name in measures.items()},
+    })
+
+
+def _compare(actual: pd.DataFrame, budget: pd.DataFrame, keys: list[str]) -> pd.DataFrame:
+    """
+    Somma actual e budget per keys e li affianca, con gli scostamenti.
+
+    I conteggi vengono castati a int standard e i valori arrotondati a 2
+    decimali per la serializzazione JSON.
+    """
+    df = (
+        actual.groupby(keys).sum(numeric_only=True)
+        .join(budget.groupby(keys).sum(numeric_only=True), how="outer")
+        .fillna(0)
+        .reset_index()
+    )
+    for col in ["actual_qty", "budget_qty"]:
+        df[col] = df[col].astype(int)
+    for col in ["actual_value", "budget_value"]:
+        df[col] = df[col].round(2)
+
+    df["qty_variance"]       = df["actual_qty"] - df["budget_qty"]
+    df["value_variance"]     = (df["actual_value"] - df["budget_value"]).round(2)
+    df["qty_variance_pct"]   = _rate(df["qty_variance"], df["budget_qty"])
+    df["value_variance_pct"] = _rate(df["value_variance"], df["budget_value"])
+    return df.sort_values(keys).reset_index(drop=True)
+
+
+# ---------------------------------------------------------------------------
+# KPI
+# ---------------------------------------------------------------------------
+
+def compute(tables: dict, engine: str = "pandas") -> dict:
+    """
+    Calcola Actual vs Budget per mese e per categoria × mese (chiamata da analytics/runner.py).
+
+    Args:
+        tables: {tabella: DataFrame} con le colonne di KPI_INPUTS
+        engine: uno di KPI_ENGINES
+
+    Returns:
+        {nome file JSON: payload {"meta", "data"}}
+    """
+    category = tables["MasterMaterial"].set_index("MaterialID")["Category"]
+    actual   = _by_material_month(tables["VendutoMensile"], "SalesMonth",
+                                  {"QuantitySold": "actual_qty", "SaleValue": "actual_value"}, category)
+    budget   = _by_material_month(tables["Budget"], "BudgetMonth",
+                                  {"BudgetQty": "budget_qty", "BudgetValue": "budget_value"}, category)
+
+    by_month    = _compare(actual.drop(columns="Category"), budget.drop(columns="Category"), ["month"])
+    by_category = _compare(actual, budget, ["month", "Category"])
+
+    tables_used = ["VendutoMensile", "Budget"]
+    return {
+        "kpi_sales_vs_budget_by_month.json": {
+            "meta": meta(
+                "Actual vs Budget mensile — quantità e valore venduti (VendutoMensile, mese di "
+                "spedizione) contro il budget del mese, su tutti i materiali. "
+                "Scostamento % = (actual − budget) / budget. Solo mesi storici (i mesi di Ordinato.OrderDate).",
+                tables_used,
+            ),
+            "data": by_month.to_dict(orient="records"),
+        },
+        "kpi_sales_vs_budget_by_category_month.json": {
+            "meta": meta(
+                "Actual vs Budget per categoria terapeutica × mese — come il KPI mensile, "
+                "disaggregato per MasterMaterial.Category. Solo mesi storici (i mesi di Ordinato.OrderDate).",
+                [*tables_used, "MasterMaterial"],
+            ),
+            "data": by_category.to_dict(orient="records"),
+        },
+    }
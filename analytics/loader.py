@@ -0,0 +1,447 @@
+"""
+analytics/loader.py
+-------------------
+Lettura condivisa delle tabelle generate per gli script di analytics, guidata
+da TABLE_SCHEMA (src/generate_sql_lite_db/schema.py).
+
+Rispetto a un pd.read_csv con inferenza dei tipi:
+
+  - vengono lette solo le colonne richieste (usecols / proiezione Parquet)
+  - i tipi sono espliciti e compatti:
+      TEXT in "categories" (MaterialID, CustomerID, Region, ...) → category
+      TEXT in "dates"                                            → datetime64
+      INTEGER                                                    → int32 (int64 se non ci sta)
+      REAL                                                       → float64
+      altri TEXT (ID primari, nomi)                              → str
+  - un intervallo di date viene applicato durante la lettura: sul dataset
+    Parquet (se presente e aggiornato) filtra partizioni e row group, sul CSV
+    filtra ogni blocco di LOADER_CHUNK_ROWS righe prima di accumularlo
+  - le tabelle lette restano in memoria per tutto il processo: più KPI
+    eseguiti nello stesso processo non rileggono lo stesso file
+  - le tabelle troppo grandi per la memoria si leggono a blocchi di chiavi
+    intere con iter_table (es. tutti i giorni di un gruppo di materiali)
+
+Utilizzo:
+  from analytics.loader import load_table
+
+  ordinato = load_table("Ordinato", ["OrderID", "RequestedDate", "QuantityOrdered"])
+  venduto  = load_table("Venduto", start="2024-01-01", end="2024-12-31")   # su ShipmentDate
+
+  for chunk in iter_table("Inventario", key="MaterialID"):                  # materiali interi
+      ...
+
+  first, last = history_months()                                            # mesi di Ordinato.OrderDate
+"""
+
+import numpy as np
+import pandas as pd
+
+import src.config as config
+from src.utils.utils import parse_dates
+from src.generate_sql_lite_db.schema import TABLE_SCHEMA, csv_dtypes
+
+# ---------------------------------------------------------------------------
+# Configurazione
+# ---------------------------------------------------------------------------
+
+# Righe lette dal CSV per blocco quando è richiesto un intervallo di date
+LOADER_CHUNK_ROWS = 1_000_000
+
+# Sorgente delle tabelle:
+#   "auto"    : dataset Parquet se esiste e non è più vecchio del CSV, altrimenti CSV
+#   "csv"     : sempre OUTPUT_DIR/<csv>
+#   "parquet" : sempre PARQUET_DIR/<Table>/ (richiede pyarrow)
+LOADER_SOURCE = "auto"
+
+# Risoluzione delle colonne data
+DATE_DTYPE = "datetime64[s]"
+
+# Tabelle già lette nel processo: chiave → DataFrame (vedi load_table)
+_CACHE = {}
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+def _date_column(table_name: str) -> str:
+    """Default column of the date filter: "partition_by", else the first of "dates"."""
+    definition = TABLE_SCHEMA[table_name]
+    if definition.get("partition_by"):
+        return definition["partition_by"]
+    if definition.get("dates"):
+        return definition["dates"][0]
+    raise ValueError(f"'{table_name}' has no date column: start / end cannot be applied")
+
+
+def _source(table_name: str):
+    """(kind, path) of the file / dataset load_table reads the table from."""
+    csv_path     = config.OUTPUT_DIR / TABLE_SCHEMA[table_name]["csv"]
+    parquet_path = config.PARQUET_DIR / table_name
+
+    if LOADER_SOURCE == "csv":
+        return "csv", csv_path
+    if LOADER_SOURCE == "parquet":
+        return "parquet", parquet_path
+    if parquet_path.exists() and (not csv_path.exists()
+                                  or parquet_path.stat().st_mtime_ns >= csv_path.stat().st_mtime_ns):
+        return "parquet", parquet_path
+    return "csv", csv_path
+
+
+def _dates(values: pd.Series) -> np.ndarray:
+    """datetime64[D] array of a date column read as strings or as a categorical of strings."""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return parse_dates(values.cat.categories.to_numpy())[values.cat.codes.to_numpy()]
+    return parse_dates(values.to_numpy())
+
+
+def _coerce(df: pd.DataFrame, table_name: str) -> pd.DataFrame:
+    """Cast the columns of df to the loader dtypes declared by TABLE_SCHEMA."""
+    definition = TABLE_SCHEMA[table_name]
+    dates      = set(definition.get("dates", []))
+    categories = set(definition.get("categories", []))
+
+    for col in df.columns:
+        base = definition["columns"][col].split()[0]
+        if col in dates:
+            if df[col].dtype.kind != "M":
+                df[col] = _dates(df[col])
+            df[col] = df[col].astype(DATE_DTYPE)
+        elif col in categories:
+            df[col] = df[col].astype("category")
+        elif base == "INTEGER":
+            values  = df[col].to_numpy(dtype=np.int64)
+            fits    = len(values) == 0 or (values.min() >= np.iinfo(np.int32).min and values.max() <= np.iinfo(np.int32).max)
+            df[col] = values.astype(np.int32) if fits else values
+        elif base == "REAL":
+            df[col] = df[col].astype(np.float64)
+    return df
+
+
+def _read_csv(path, table_name: str, columns: list, date_col, start, end) -> pd.DataFrame:
+    """
+    Read the requested columns of a table CSV, keeping only the rows in [start, end] of date_col.
+
+    Date and "categories" columns are read as pandas categoricals, so each
+    distinct string is stored (and later parsed) once. With a date range the
+    CSV is read in chunks of LOADER_CHUNK_ROWS and each chunk is filtered
+    before being kept; the categorical columns are then read as strings,
+    since chunks with different categories cannot be concatenated as such.
+    """
+    definition = TABLE_SCHEMA[table_name]
+    compact    = set(definition.get("dates", [])) | set(definition.get("categories", []))
+    text       = csv_dtypes(table_name)
+
+    if date_col is None:
+        dtypes = {col: "category" if col in compact else text[col] for col in columns if col in text}
+        return pd.read_csv(path, usecols=columns, dtype=dtypes)[columns]
+
+    dates   = set(definition.get("dates", []))
+    usecols = columns if date_col in columns else [*columns, date_col]
+    dtypes  = {col: "category" if col in dates else text[col] for col in usecols if col in text}
+    chunks  = []
+    for chunk in pd.read_csv(path, usecols=usecols, dtype=dtypes, chunksize=LOADER_CHUNK_ROWS):
+        day  = _dates(chunk[date_col])
+        keep = np.ones(len(chunk), dtype=bool)
+        if start is not None:
+            keep &= day >= start
+        if end is not None:
+            keep &= day <= end
+        chunk = chunk.loc[keep, columns]
+        for col in dates.intersection(columns):
+            chunk[col] = _dates(chunk[col])
+        chunks.append(chunk)
+    return pd.concat(chunks, ignore_index=True)
+
+
+def _read_parquet(path, table_name: str, columns: list, date_col, start, end) -> pd.DataFrame:
+    """Read the requested columns of a table's Parquet dataset, filtering [start, end] on date_col."""
+    from src.generate_sql_lite_db.parquet import PARTITION_COLUMN, _import_pyarrow
+    pa, ds = _import_pyarrow()
+
+    partitioning = None
+    if TABLE_SCHEMA[table_name].get("partition_by"):
+        partitioning = ds.partitioning(pa.schema([(PARTITION_COLUMN, pa.string())]), flavor="hive")
+    dataset = ds.dataset(path, format="parquet", partitioning=partitioning)
+
+    predicate = None
+    if date_col is not None:
+        conditions = []
+        if start is not None:
+            conditions.append(ds.field(date_col) >= pa.scalar(start.astype(object), type=pa.date32()))
+        if end is not None:
+            conditions.append(ds.field(date_col) <= pa.scalar(end.astype(object), type=pa.date32()))
+        # Partition pruning: whole months outside the range are never opened
+        if date_col == TABLE_SCHEMA[table_name].get("partition_by"):
+            if start is not None:
+                conditions.append(ds.field(PARTITION_COLUMN) >= str(start.astype("datetime64[M]")))
+            if end is not None:
+                conditions.append(ds.field(PARTITION_COLUMN) <= str(end.astype("datetime64[M]")))
+        for condition in conditions:
+            predicate = condition if predicate is None else predicate & condition
+
+    table = dataset.to_table(columns=columns, filter=predicate)
+    return table.to_pandas(date_as_object=False)
+
+
+# ---------------------------------------------------------------------------
+# API
+# ---------------------------------------------------------------------------
+
+def load_table(table_name: str, columns=None, start=None, end=None, date_column=None) -> pd.DataFrame:
+    """
+    Legge una tabella generata con i tipi dichiarati in TABLE_SCHEMA.
+
+    Il risultato è memorizzato per tutto il processo (chiave: tabella, colonne,
+    intervallo, sorgente e data di modifica del file): una seconda chiamata
+    identica non rilegge il file. Viene restituita una copia superficiale:
+    con il copy-on-write di pandas le modifiche alla copia non toccano la
+    cache.
+
+    Args:
+        table_name:  chiave di TABLE_SCHEMA (es. "Venduto")
+        columns:     colonne da leggere, nell'ordine voluto (default: tutte)
+        start, end:  estremi inclusi dell'intervallo di date ("YYYY-MM-DD",
+                     datetime o numpy.datetime64; None = aperto)
+        date_column: colonna su cui applicare l'intervallo (default:
+                     "partition_by" della tabella, altrimenti la prima di "dates")
+
+    Returns:
+        DataFrame con le colonne richieste
+    """
+    if table_name not in TABLE_SCHEMA:
+        raise ValueError(f"Unknown table '{table_name}' (expected one of {', '.join(TABLE_SCHEMA)})")
+    schema_columns = list(TABLE_SCHEMA[table_name]["columns"])
+    columns = schema_columns if columns is None else list(columns)
+    unknown = [col for col in columns if col not in schema_columns]
+    if unknown:
+        raise ValueError(f"Unknown column(s) for '{table_name}': {', '.join(unknown)}")
+
+    date_col = None
+    if start is not None or end is not None:
+        date_col = date_column or _date_column(table_name)
+        start = None if start is None else np.datetime64(pd.Timestamp(start).date(), "D")
+        end   = None if end   is None else np.datetime64(pd.Timestamp(end).date(), "D")
+
+    kind, path = _source(table_name)
+    if not path.exists():
+        raise FileNotFoundError(f"{path} not found: generate the data first (python -m src generate)")
+
+    key = (table_name, tuple(columns), start, end, date_col, kind, str(path), path.stat().st_mtime_ns)
+    if key not in _CACHE:
+        reader = _read_parquet if kind == "parquet" else _read_csv
+        _CACHE[key] = _coerce(reader(path, table_name, columns, date_col, start, end), table_name)
+    return _CACHE[key].copy(deep=False)
+
+
+def _iter_csv_by_key(path, table_name: str, columns: list, key: str, chunk_rows: int):
+    """
+    Blocks of about chunk_rows rows of a table CSV, each holding every row of its keys.
+
+    One pass over the file: the rows of the last key of each block may
+    continue in the next one, so they are carried over. The CSV must keep
+    the rows of a key contiguous (as the generators and the streaming mode
+    write it); otherwise a ValueError is raised.
+    """
+    text    = csv_dtypes(table_name)
+    dtypes  = {col: text[col] for col in columns if col in text}
+    carried = None
+    seen    = set()
+
+    def complete(df):
+        runs = df[key].to_numpy()
+        runs = runs[np.r_[True, runs[1:] != runs[:-1]]]
+        if len(set(runs)) != len(runs) or seen.intersection(runs):
+            raise ValueError(f"{path}: the rows of each {key} are not contiguous, "
+                             f"the table cannot be read by {key}")
+        seen.update(runs)
+        return df
+
+    for block in pd.read_csv(path, usecols=columns, dtype=dtypes, chunksize=chunk_rows):
+        block = block[columns] if carried is None else pd.concat([carried, block[columns]], ignore_index=True)
+        keys  = block[key].to_numpy()
+        last  = len(keys) - np.argmax(keys[::-1] != keys[-1]) if (keys != keys[-1]).any() else 0
+        carried = block.iloc[last:]
+        if last:
+            yield complete(block.iloc[:last].reset_index(drop=True))
+    if carried is not None and len(carried):
+        yield complete(carried.reset_index(drop=True))
+
+
+def _key_less(keys: np.ndarray, bound) -> np.ndarray:
+    """
+    keys < bound in the order the IDs are generated: numbers as numbers,
+    strings by length and then text ("MAT999" < "MAT1000").
+    """
+    if keys.dtype.kind in "iuf":
+        return keys < bound
+    keys  = keys.astype(str)
+    bound = np.asarray(bound).astype(str)
+    size, bound_size = np.char.str_len(keys), np.char.str_len(bound)
+    return (size < bound_size) | ((size == bound_size) & (keys < bound))
+
+
+def _partition_files(path) -> list:
+    """
+    Files of a Parquet dataset grouped by partition directory, each group in
+    write order (part-<part>-<i>.parquet sorted by part, then i).
+    """
+    def write_order(file):
+        fields = file.stem.split("-")
+        return [int(f) if f.isdigit() else f for f in fields]
+
+    groups = {}
+    for file in sorted(path.rglob("*.parquet")):
+        groups.setdefault(file.parent, []).append(file)
+    return [sorted(files, key=write_order) for _, files in sorted(groups.items())]
+
+
+def _iter_parquet_by_key(path, table_name: str, columns: list, key: str, chunk_rows: int):
+    """
+    Blocks of about chunk_rows rows of a table's Parquet dataset, each holding every row of its keys.
+
+    One pass over the dataset. A partitioned table has the rows of a key in
+    every partition: each partition is streamed in write order with its own
+    carry-over, and the rows whose key is below the last key read from every
+    partition are complete and can be yielded. Memory is about chunk_rows
+    plus a batch per partition. Every partition must list its keys in
+    ascending order (see _key_less), as the generators, the streaming mode
+    and csv_to_parquet write them; otherwise a ValueError is raised.
+    """
+    from src.generate_sql_lite_db.parquet import _import_pyarrow
+    pa, _ = _import_pyarrow()
+    import pyarrow.parquet as pq
+
+    groups = _partition_files(path)
+    if not groups:
+        return
+    batch_rows = max(1, chunk_rows // len(groups))
+    streams    = [(batch for file in files
+                   for batch in pq.ParquetFile(file).iter_batches(batch_size=batch_rows, columns=columns))
+                  for files in groups]
+    carried = [[] for _ in groups]      # (batch, keys) read from each partition and not yet yielded
+    last    = [None for _ in groups]    # last key read from each partition, None once exhausted
+
+    def advance(i):
+        for batch in streams[i]:
+            if batch.num_rows:
+                break
+        else:
+            last[i] = None
+            return
+        keys = batch.column(key)
+        if pa.types.is_dictionary(keys.type):
+            keys = keys.dictionary_decode()
+        keys = keys.to_numpy(zero_copy_only=False)
+        if _key_less(keys[1:], keys[:-1]).any() or (last[i] is not None and _key_less(keys[:1], last[i]).any()):
+            raise ValueError(f"{path}: the rows of each {key} are not in ascending {key} order "
+                             f"in every partition, the table cannot be read by {key}")
+        carried[i].append((batch, keys))
+        last[i] = keys[-1]
+
+    def below(i, bound):
+        """Rows at the head of carried[i] with key < bound (the keys of a partition ascend)."""
+        n = 0
+        for batch, keys in carried[i]:
+            if not _key_less(keys[-1:], bound)[0]:
+                return n + int(_key_less(keys, bound).sum())
+            n += len(keys)
+        return n
+
+    def take(counts):
+        """Remove counts[i] rows from the head of every carried[i] and return them as one DataFrame."""
+        ready = []
+        for i, n in enumerate(counts):
+            while n:
+                batch, keys = carried[i].pop(0)
+                if n < len(keys):
+                    carried[i].insert(0, (batch.slice(n), keys[n:]))
+                    batch = batch.slice(0, n)
+                ready.append(pa.Table.from_batches([batch]))
+                n -= batch.num_rows
+        table = pa.concat_tables(ready, promote_options="permissive")
+        return table.to_pandas(date_as_object=False)[columns]
+
+    for i in range(len(groups)):
+        advance(i)
+    while any(k is not None for k in last):
+        # Every partition still open continues with keys >= its last key
+        frontier = None
+        for k in last:
+            if k is not None and (frontier is None or _key_less(np.asarray([k]), frontier)[0]):
+                frontier = k
+        counts = [below(i, frontier) for i in range(len(groups))]
+        if sum(counts) >= chunk_rows:
+            yield take(counts)
+            continue
+        for i, k in enumerate(last):
+            if k is not None and k == frontier:
+                advance(i)
+    counts = [sum(len(keys) for _, keys in batches) for batches in carried]
+    if sum(counts):
+        yield take(counts)
+
+
+def iter_table(table_name: str, columns=None, key: str = "MaterialID", chunk_rows: int = LOADER_CHUNK_ROWS):
+    """
+    Legge una tabella a blocchi di circa chunk_rows righe, ognuno con tutte le
+    righe delle sue chiavi (es. tutti i giorni di un gruppo di materiali).
+
+    Per i KPI su tabelle che non stanno in memoria (Inventario a grandi scale
+    factor): la memoria dipende da chunk_rows, non dalla dimensione della
+    tabella. I tipi sono quelli di load_table; i blocchi non passano dalla
+    cache e le categorie di ogni blocco sono solo quelle presenti nel blocco.
+
+    Args:
+        table_name: chiave di TABLE_SCHEMA (es. "Inventario")
+        columns:    colonne da leggere, nell'ordine voluto (default: tutte; key viene aggiunta)
+        key:        colonna le cui righe non vengono mai divise fra due blocchi
+        chunk_rows: righe indicative per blocco
+
+    Yields:
+        DataFrame con le colonne richieste
+    """
+    if table_name not in TABLE_SCHEMA:
+        raise ValueError(f"Unknown table '{table_name}' (expected one of {', '.join(TABLE_SCHEMA)})")
+    schema_columns = list(TABLE_SCHEMA[table_name]["columns"])
+    columns = schema_columns if columns is None else list(columns)
+    if key not in columns:
+        columns = [key, *columns]
+    unknown = [col for col in columns if col not in schema_columns]
+    if unknown:
+        raise ValueError(f"Unknown column(s) for '{table_name}': {', '.join(unknown)}")
+
+    kind, path = _source(table_name)
+    if not path.exists():
+        raise FileNotFoundError(f"{path} not found: generate the data first (python -m src generate)")
+
+    reader = _iter_parquet_by_key if kind == "parquet" else _iter_csv_by_key
+    for chunk in reader(path, table_name, columns, key, chunk_rows):
+        yield _coerce(chunk, table_name)
+
+
+def history_months() -> tuple:
+    """
+    Primo e ultimo mese (datetime64[M]) della finestra storica dei dati
+    analizzati: il primo e l'ultimo mese di Ordinato.OrderDate.
+
+    La finestra viene dai dati e non da START_DATE / MONTHS_HISTORY di
+    src/config.py, che possono essere stati cambiati alla generazione
+    (--start-date, --months-history). Gli ordini coprono ogni giorno della
+    finestra; le vendite spedite dopo sono solo la coda degli ultimi ordini
+    (spediti intorno a RequestedDate): i KPI sugli actual restano nella finestra.
+
+    Raises:
+        ValueError: se Ordinato non ha date d'ordine
+    """
+    dates = load_table("Ordinato", ["OrderDate"])["OrderDate"].dropna()
+    if dates.empty:
+        raise ValueError("Cannot determine the history window: Ordinato has no OrderDate "
+                         "(generate the data first: python -m src generate)")
+    return np.datetime64(dates.min(), "M"), np.datetime64(dates.max(), "M")
+
+
+def clear_cache() -> None:
+    """Svuota le tabelle memorizzate da load_table."""
+    _CACHE.clear()
@@ -0,0 +1,177 @@
+"""
+analytics/output.py
+-------------------
+Scrittura dei JSON di analytics, condivisa dai KPI.
+
+Ogni file contiene due chiavi, meta (descrizione del KPI, tabelle sorgente,
+data di generazione) e data, in uno dei due layout di ANALYTICS_JSON_FORMAT
+(src/config.py, `analytics --json-format`):
+
+  records : "data" è una lista di record {campo: valore}, JSON indentato
+            (leggibile, ogni chiave ripetuta su ogni riga)
+  columns : "data" è {campo: [valori]}, un array per campo, JSON compatto;
+            meta riporta anche format e rows. Serializzato con orjson se
+            installato (pip install orjson), altrimenti con json
+
+Con ANALYTICS_COMPRESSION (`analytics --compress gzip brotli`) accanto a
+ogni <file>.json vengono scritti <file>.json.gz e/o <file>.json.br, da
+servire con Content-Encoding senza comprimere a ogni richiesta; le copie
+dei codec non richiesti, rimaste da run precedenti, vengono cancellate.
+brotli richiede il pacchetto brotli (pip install brotli).
+
+Utilizzo:
+  from analytics.output import meta, save_json
+
+  save_json({"meta": meta("OTIF mensile ...", ["Ordinato", "Venduto"]), "data": rows},
+            "kpi_otif_by_month.json")
+"""
+
+import gzip
+import json
+from datetime import date
+
+import src.config as config
+
+# ---------------------------------------------------------------------------
+# Configurazione
+# ---------------------------------------------------------------------------
+
+# Sottocartella di OUTPUT_DIR dove vengono scritti i JSON (creata da save_json)
+ANALYTICS_SUBDIR = "analytics"
+
+# Layout disponibili (vedi il docstring del modulo)
+JSON_FORMATS = ["records", "columns"]
+
+# Compressioni disponibili: nome → estensione aggiunta al file JSON
+COMPRESSIONS = {
+    "gzip":   ".gz",
+    "brotli": ".br",
+}
+
+# Livelli di compressione: i file si comprimono una volta e si scaricano molte
+GZIP_LEVEL     = 9
+BROTLI_QUALITY = 11
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+def _dumps_compact(obj) -> bytes:
+    """Compact UTF-8 JSON: orjson when installed, else json without whitespace."""
+    try:
+        import orjson
+    except ImportError:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return orjson.dumps(obj)
+
+
+def _columns(payload: dict) -> dict:
+    """Columnar layout of a records payload: one array per field, fields in record order."""
+    records = payload["data"]
+    fields  = list(records[0]) if records else []
+    return {
+        "meta": {**payload["meta"], "format": "columns", "rows": len(records)},
+        "data": {field: [record[field] for record in records] for field in fields},
+    }
+
+
+def _import_brotli():
+    """Import brotli lazily so that only brotli output needs it."""
+    try:
+        import brotli
+    except ImportError as exc:
+        raise ImportError("brotli output requires brotli: pip install brotli") from exc
+    return brotli
+
+
+def _compress(raw: bytes, compression: str) -> bytes:
+    """raw compressed with gzip (reproducible: no timestamp) or brotli."""
+    if compression == "gzip":
+        return gzip.compress(raw, compresslevel=GZIP_LEVEL, mtime=0)
+    return _import_brotli().compress(raw, quality=BROTLI_QUALITY)
+
+
+# ---------------------------------------------------------------------------
+# API
+# ---------------------------------------------------------------------------
+
+def analytics_dir():
+    """Cartella dei JSON di analytics: OUTPUT_DIR/ANALYTICS_SUBDIR (letta a ogni chiamata, dopo la CLI)."""
+    return config.OUTPUT_DIR / ANALYTICS_SUBDIR
+
+
+def meta(description: str, tables: list[str]) -> dict:
+    """
+    Costruisce il blocco 'meta' da inserire in testa ad ogni JSON.
+
+    Contiene:
+      - description : testo libero che spiega il KPI
+      - tables      : lista delle tabelle sorgente usate per il calcolo
+      - generated_at: data di generazione (ISO 8601, solo giorno)
+    """
+    return {
+        "description":  description,
+        "tables":       tables,
+        "generated_at": date.today().isoformat(),
+    }
+
+
+def output_options(json_format=None, compression=None) -> tuple[str, list]:
+    """
+    Layout e compressioni effettivi (default: ANALYTICS_JSON_FORMAT,
+    ANALYTICS_COMPRESSION), validati prima di calcolare i KPI.
+
+    Raises:
+        ValueError:  layout o compressione sconosciuti
+        ImportError: brotli richiesto ma non installato
+    """
+    json_format = json_format or config.ANALYTICS_JSON_FORMAT
+    compression = list(config.ANALYTICS_COMPRESSION if compression is None else compression)
+    if json_format not in JSON_FORMATS:
+        raise ValueError(f"Unknown JSON format '{json_format}' (expected one of {', '.join(JSON_FORMATS)})")
+    unknown = [name for name in compression if name not in COMPRESSIONS]
+    if unknown:
+        raise ValueError(f"Unknown compression: {', '.join(unknown)} (expected any of {', '.join(COMPRESSIONS)})")
+    if "brotli" in compression:
+        _import_brotli()
+    return json_format, compression
+
+
+def save_json(payload: dict, filename: str, json_format=None, compression=None) -> None:
+    """
+    Serializza il payload come JSON e lo scrive in analytics_dir(), con le
+    eventuali copie compresse. Le copie .gz / .br di codec non richiesti
+    vengono cancellate, così non resta accanto al JSON una versione vecchia.
+
+    Il payload deve avere la struttura:
+      { "meta": {...}, "data": [...] }
+
+    Stampa a console il nome del file e il numero di righe nel campo 'data'.
+
+    Args:
+        payload:     meta + lista di record
+        filename:    nome del file JSON
+        json_format: uno di JSON_FORMATS (default: ANALYTICS_JSON_FORMAT)
+        compression: lista di chiavi di COMPRESSIONS (default: ANALYTICS_COMPRESSION)
+    """
+    json_format, compression = output_options(json_format, compression)
+    if json_format == "columns":
+        raw = _dumps_compact(_columns(payload))
+    else:
+        raw = json.dumps(payload, indent=2, ensure_ascii=False).encode("utf-8")
+
+    directory = analytics_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / filename
+    path.write_bytes(raw)
+    for name, extension in COMPRESSIONS.items():
+        sibling = path.with_name(path.name + extension)
+        if name in compression:
+            sibling.write_bytes(_compress(raw, name))
+        else:
+            # Una copia di un run precedente sarebbe servita al posto del JSON nuovo
+            sibling.unlink(missing_ok=True)
+
+    n = len(payload["data"])
+    print(f"[OK] {filename:<45} — {n} righe")
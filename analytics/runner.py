@@ -0,0 +1,168 @@
+"""
+analytics/runner.py
+-------------------
+Registro dei KPI ed esecuzione di tutte le analisi in un solo passaggio sui
+dati condivisi.
+
+Ogni modulo di KPI_MODULES dichiara:
+
+  KPI_INPUTS  : {tabella: [colonne]} che il motore pandas legge
+  KPI_ENGINES : motori supportati (es. ["pandas", "sqlite"])
+  compute(tables, engine) → {nome file JSON: payload {"meta", "data"}}
+
+run_kpis():
+
+  1. unisce le colonne richieste dai KPI per ogni tabella
+  2. legge ogni tabella una sola volta con load_table, le tabelle in parallelo
+  3. esegue i KPI in parallelo in un pool di thread: ognuno riceve solo le
+     sue colonne (selezioni senza copia, con il copy-on-write di pandas le
+     modifiche di un KPI non toccano gli altri)
+  4. scrive i JSON con save_json (layout e compressioni di analytics/output.py)
+
+I thread condividono le tabelle lette senza serializzarle: con un pool di
+processi ogni KPI riceverebbe una copia dei DataFrame. I KPI che non
+supportano il motore richiesto girano con pandas; quelli con motore sqlite non
+leggono tabelle (la query gira sul DB). Le tabelle troppo grandi per la
+memoria restano fuori da KPI_INPUTS: il KPI le legge a blocchi con
+iter_table (es. Inventario in kpi_inventory.py).
+
+A livello di modulo non si importa pandas: la CLI legge KPI_MODULES per
+validare la riga di comando.
+
+Utilizzo:
+  from analytics.runner import run_kpis
+
+  run_kpis()                             # tutti i KPI
+  run_kpis(["otif"], engine="sqlite")
+"""
+
+import importlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+# ---------------------------------------------------------------------------
+# Configurazione
+# ---------------------------------------------------------------------------
+
+# KPI disponibili: nome → modulo con KPI_INPUTS, KPI_ENGINES e compute()
+KPI_MODULES = {
+    "otif":              "analytics.kpi_otif",
+    "sales_budget":      "analytics.kpi_sales_budget",
+    "customer_revenue":  "analytics.kpi_customer_revenue",
+    "forecast_accuracy": "analytics.kpi_forecast_accuracy",
+    "inventory":         "analytics.kpi_inventory",
+}
+
+# Thread usati per leggere le tabelle e calcolare i KPI (1 = sequenziale)
+KPI_JOBS = min(4, os.cpu_count() or 1)
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+def _engine_for(module, engine: str) -> str:
+    """Engine a KPI runs with: the requested one if it supports it, else pandas."""
+    return engine if engine in getattr(module, "KPI_ENGINES", ["pandas"]) else "pandas"
+
+
+def _kpi_inputs(plan: dict) -> dict:
+    """
+    Union of the input columns of the KPIs that run with pandas.
+
+    Args:
+        plan: {kpi: (module, engine)}
+
+    Returns:
+        {table: [columns]} in order of first request
+    """
+    needed = {}
+    for module, engine in plan.values():
+        if engine != "pandas":
+            continue
+        for table, columns in module.KPI_INPUTS.items():
+            needed.setdefault(table, [])
+            needed[table] += [col for col in columns if col not in needed[table]]
+    return needed
+
+
+def _map(pool, function, items: list) -> list:
+    """pool.map that also works with pool = None (sequential, in this thread)."""
+    return list(map(function, items)) if pool is None else list(pool.map(function, items))
+
+
+def _load(table: str, columns: list):
+    """load_table inside a "read" span of the run report."""
+    from analytics.loader import load_table
+    from src.utils.run_report import span
+
+    with span(table, "read", columns=len(columns)) as record:
+        df = load_table(table, columns)
+        record["rows"] = len(df)
+    return df
+
+
+def _compute(name: str, module, engine: str, tables: dict) -> dict:
+    """module.compute inside a "kpi" span of the run report (rows = records of the JSONs)."""
+    from src.utils.run_report import span
+
+    with span(name, "kpi", engine=engine) as record:
+        outputs = module.compute(tables, engine)
+        record["rows"] = sum(len(payload["data"]) for payload in outputs.values())
+    return outputs
+
+
+# ---------------------------------------------------------------------------
+# API
+# ---------------------------------------------------------------------------
+
+def run_kpis(names=None, engine=None, jobs=KPI_JOBS) -> dict:
+    """
+    Calcola i KPI richiesti (default: tutti) e scrive i loro JSON.
+
+    Args:
+        names:  chiavi di KPI_MODULES (default: tutte)
+        engine: motore richiesto (default: ANALYTICS_ENGINE di src/config.py)
+        jobs:   thread per la lettura delle tabelle e per i KPI
+
+    Returns:
+        {kpi: [file JSON scritti]}
+    """
+    import src.config as config
+    from analytics.output import save_json, output_options
+
+    names   = list(names or KPI_MODULES)
+    unknown = [name for name in names if name not in KPI_MODULES]
+    if unknown:
+        raise ValueError(f"Unknown KPI: {', '.join(unknown)} (expected one of {', '.join(KPI_MODULES)})")
+    engine = engine or config.ANALYTICS_ENGINE
+    output_options()                      # an unusable output format fails before any KPI runs
+
+    plan = {}
+    for name in names:
+        module     = importlib.import_module(KPI_MODULES[name])
+        plan[name] = (module, _engine_for(module, engine))
+    needed = _kpi_inputs(plan)
+
+    pool = ThreadPoolExecutor(max_workers=jobs) if jobs > 1 else None
+    try:
+        # Each table is read once, with the columns of every KPI that uses it
+        frames = dict(zip(needed, _map(pool, lambda table: _load(table, needed[table]), list(needed))))
+
+        def run(name):
+            module, kpi_engine = plan[name]
+            tables = ({table: frames[table][columns] for table, columns in module.KPI_INPUTS.items()}
+                      if kpi_engine == "pandas" else {})
+            return _compute(name, module, kpi_engine, tables)
+
+        results = dict(zip(names, _map(pool, run, names)))
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    written = {}
+    for name, outputs in results.items():
+        for filename, payload in outputs.items():
+            save_json(payload, filename)
+        written[name] = list(outputs)
+    return written
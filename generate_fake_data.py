@@ -1,61 +1,38 @@
-#==============================================
-# Configurazione seed per riproducibilità
-#==============================================
-import random
-SEED = 42
-random.seed(SEED)
-
-#==============================================
-# CREATE OUTPUT DIRECTORY
-#==============================================
-from src.config import OUTPUT_DIR
-OUTPUT_DIR.mkdir(exist_ok=True)
-
-#==============================================
-# CREATE MASTER MATERIAL CSV
-#==============================================
-from src.generate_data.generate_master_material import generate_master_material
-dfMaMa = generate_master_material()
-
-#=============================================
-# CREATE MASTER CUSTOMER CSV
-#==============================================
-from src.generate_data.generate_master_customer import generate_master_customer
-dfMaCu = generate_master_customer()
-
-#==============================================
-# CREATE ORDERS
-#==============================================
-from src.generate_data.generate_orders import generate_ordinato
-dfOrd = generate_ordinato(dfMaMa, dfMaCu)
-
-#==============================================
-# CREATE SALES
-#==============================================
-from src.generate_data.generate_sales import generate_sales
-dfSal = generate_sales(dfOrd)
-
-#==============================================
-# CREATE BUDGET
-#==============================================
-from src.generate_data.generate_budget import generate_budget
-dfBud = generate_budget(dfSal)
-
-#==============================================
-# CREATE INVENTORY
-#==============================================
-from src.generate_data.generate_inventory import generate_inventory
-dfInv = generate_inventory(dfMaMa, dfSal)
-
-#==============================================
-# CREATE FORECAST
-#==============================================
-from src.generate_data.generate_forecast import generate_forecast
-dfFor = generate_forecast(dfSal, dfMaMa)
-
-#==============================================
-# CREATE SQLITE
-#==============================================
-from src.generate_sql_lite_db.load_to_db import load_to_db
-load_to_db()
+"""
+generate_fake_data.py
+---------------------
+Entry point della pipeline: genera tutti i CSV in OUTPUT_DIR e li carica nel DB SQLite.
 
+Il volume si controlla con uno scale factor in stile TPC: a scale factor 1 si
+ottengono i valori di default (NUM_MATERIALS, NUM_CUSTOMERS); le tabelle fatti
+crescono linearmente con il numero di materiali. Ogni dimensione può essere
+sovrascritta esplicitamente.
+
+Gli stage sono eseguiti da src/generate_data/pipeline.py: quelli la cui
+configurazione e i cui input non sono cambiati vengono riletti dalla cache.
+
+Equivale a `python -m src generate [opzioni]` (vedi src/cli.py, che espone
+anche i sottocomandi load e analytics).
+
+Utilizzo:
+  python generate_fake_data.py                          # default (SF 1, seed 42)
+  python generate_fake_data.py --scale-factor 10        # 10x materiali e clienti
+  python generate_fake_data.py -s 100 --months-history 36 --output-dir data_sf100
+  python generate_fake_data.py -s 1000 --stream         # memoria costante, a blocchi di materiali
+  python generate_fake_data.py -s 1000 --workers 32     # blocchi generati in parallelo (implica --stream)
+  python generate_fake_data.py --refresh                # ricarica nel DB solo le tabelle cambiate
+  python generate_fake_data.py --force                  # ignora la cache degli stage e rigenera tutto
+"""
+
+import sys
+
+from src.cli import main as cli_main
+
+
+def main(argv=None):
+    """Run `python -m src generate` with the given (or the process) arguments."""
+    cli_main(["generate", *(sys.argv[1:] if argv is None else argv)])
+
+
+if __name__ == "__main__":
+    main()
@@ -10,16 +10,15 @@ DROP VIEW IF EXISTS vw_SalesVsBudget;
 
 CREATE VIEW vw_SalesVsBudget AS
 
+-- Venduto già aggregato per Mese x Materiale (tabella VendutoMensile):
+-- nessuna scansione della tabella Venduto
 WITH sales_by_month AS (
     SELECT
-        strftime('%Y-%m', ShipmentDate) AS Month,
+        SalesMonth                      AS Month,
         MaterialID,
-        SUM(QuantitySold)               AS ActualQty,
-        SUM(SaleValue)                  AS ActualValue
-    FROM Venduto
-    GROUP BY
-        strftime('%Y-%m', ShipmentDate),
-        MaterialID
+        QuantitySold                    AS ActualQty,
+        SaleValue                       AS ActualValue
+    FROM VendutoMensile
 ),
 
 budget_by_month AS (
@@ -0,0 +1,273 @@
+"""
+src/cli.py
+----------
+Entry point del pacchetto, con sottocomandi:
+
+  python -m src generate [opzioni]     # genera CSV / Parquet e carica il DB (vedi generate_fake_data.py)
+  python -m src load [--refresh]       # carica i CSV esistenti nel DB SQLite
+  python -m src analytics [otif ...]   # calcola i KPI e scrive i JSON in OUTPUT_DIR/analytics (vedi analytics/runner.py)
+
+A livello di modulo si importa solo argparse: pandas, numpy, pycountry e
+sqlite3 vengono caricati dal sottocomando che li usa, dopo aver applicato la
+configurazione della riga di comando.
+"""
+
+import argparse
+import random
+import time
+from datetime import datetime
+from pathlib import Path
+
+from analytics.runner import KPI_MODULES
+
+#==============================================
+# Configurazione seed per riproducibilità
+#==============================================
+SEED = 42
+
+
+def build_parser():
+    """Build the argument parser with the generate / load / analytics subcommands."""
+    parser = argparse.ArgumentParser(
+        prog="python -m src",
+        description="Synthetic pharmaceutical company data: generation, SQLite load and analytics.",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    # Options shared by every subcommand
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("-o", "--output-dir", type=Path,
+                        help="directory for CSVs, Parquet and the SQLite DB (default: data_output)")
+    common.add_argument("--trace-memory", action="store_true",
+                        help="add the tracemalloc peak to every span of the run report (slower)")
+
+    #==============================================
+    # generate
+    #==============================================
+    # Dimension overrides (--materials, --customers, ...) win over --scale-factor;
+    # anything not given keeps the default from src/config.py or the generator modules.
+    generate = commands.add_parser("generate", parents=[common],
+                                   help="generate the tables and load them into SQLite")
+    generate.add_argument("-s", "--scale-factor", type=float, default=1.0,
+                          help="multiplier applied to NUM_MATERIALS and NUM_CUSTOMERS (default: 1)")
+    generate.add_argument("--materials", type=int,
+                          help="number of materials (overrides the scale factor)")
+    generate.add_argument("--customers", type=int,
+                          help="number of customers (overrides the scale factor)")
+    generate.add_argument("--start-date", type=lambda s: datetime.strptime(s, "%Y-%m-%d"),
+                          help="first day of the time window, YYYY-MM-DD")
+    generate.add_argument("--months-history", type=int,
+                          help="months of orders/sales/inventory history")
+    generate.add_argument("--months-forecast", type=int,
+                          help="extra months covered by budget and forecast")
+    generate.add_argument("--engine", choices=["numpy", "python"],
+                          help="generation engine (default: ENGINE from src/config.py)")
+    generate.add_argument("--surrogate-keys", action="store_true",
+                          help="carry integer keys and categoricals in memory; string IDs are rendered "
+                               "only by the sinks (output unchanged)")
+    generate.add_argument("--stream", action="store_true",
+                          help="generate the fact tables in material chunks with bounded memory")
+    generate.add_argument("--chunk-size", type=int,
+                          help="materials per chunk in --stream mode (default: STREAM_CHUNK_MATERIALS)")
+    generate.add_argument("--workers", type=int,
+                          help="worker processes for the chunks; implies --stream (default: STREAM_WORKERS)")
+    generate.add_argument("--format", nargs="+", choices=["csv", "parquet"], dest="formats",
+                          help="output sinks (default: OUTPUT_FORMATS from src/config.py); "
+                               "with --stream the SQLite DB is loaded only when csv is written")
+    generate.add_argument("--jobs", type=int,
+                          help="generation stages run concurrently (default: PIPELINE_JOBS)")
+    generate.add_argument("--force", action="store_true",
+                          help="ignore the stage cache and regenerate every table")
+    generate.add_argument("--refresh", action="store_true",
+                          help="update the existing SQLite DB in place, reloading only the tables that changed")
+    generate.add_argument("--seed", type=int, default=SEED,
+                          help=f"random seed (default: {SEED})")
+
+    #==============================================
+    # load
+    #==============================================
+    load = commands.add_parser("load", parents=[common],
+                               help="load the CSVs of OUTPUT_DIR into the SQLite DB")
+    load.add_argument("--refresh", action="store_true",
+                      help="reload only the tables whose CSV changed since the last load")
+
+    #==============================================
+    # analytics
+    #==============================================
+    analytics = commands.add_parser("analytics", parents=[common],
+                                    help="compute the KPI JSON files from the generated CSVs")
+    analytics.add_argument("kpis", nargs="*", metavar="KPI",
+                           help=f"KPIs to compute: {', '.join(KPI_MODULES)} (default: all)")
+    analytics.add_argument("--engine", choices=["pandas", "sqlite"],
+                           help="compute the KPIs in memory from the CSVs / Parquet (pandas) "
+                                "or inside the SQLite DB (default: ANALYTICS_ENGINE)")
+    analytics.add_argument("--jobs", type=int,
+                           help="threads reading the tables and computing the KPIs (default: KPI_JOBS)")
+    analytics.add_argument("--json-format", choices=["records", "columns"],
+                           help="JSON layout: list of records, indented, or one array per field, "
+                                "compact (default: ANALYTICS_JSON_FORMAT)")
+    analytics.add_argument("--compress", nargs="+", choices=["gzip", "brotli"],
+                           help="also write .json.gz / .json.br next to every JSON "
+                                "(default: ANALYTICS_COMPRESSION; brotli requires the brotli package)")
+    return parser
+
+
+def parse_args(argv=None):
+    """Parse and validate the command line."""
+    parser = build_parser()
+    args   = parser.parse_args(argv)
+
+    if args.command == "generate":
+        if args.scale_factor <= 0:
+            parser.error("--scale-factor must be positive")
+        if args.workers is not None:
+            args.stream = True
+        if args.stream and args.engine == "python":
+            parser.error("--stream requires the numpy engine")
+        if args.surrogate_keys and args.engine == "python":
+            parser.error("--surrogate-keys requires the numpy engine")
+        for name in ("materials", "customers", "months_history", "months_forecast", "chunk_size", "workers", "jobs"):
+            value = getattr(args, name)
+            if value is not None and value < 1:
+                parser.error(f"--{name.replace('_', '-')} must be at least 1")
+
+    if args.command == "analytics":
+        if args.jobs is not None and args.jobs < 1:
+            parser.error("--jobs must be at least 1")
+        unknown = [kpi for kpi in args.kpis if kpi not in KPI_MODULES]
+        if unknown:
+            parser.error(f"unknown KPI: {', '.join(unknown)} (choose from {', '.join(KPI_MODULES)})")
+    return args
+
+
+def _apply_config(args):
+    """
+    Push the CLI values into src/config.py and the generator module constants.
+
+    Must run before the generator modules are imported: they bind OUTPUT_DIR,
+    START_DATE, ... with `from src.config import ...` at import time.
+    """
+    import src.config as config
+
+    if args.output_dir is not None:
+        config.OUTPUT_DIR  = args.output_dir
+        config.DB_PATH     = args.output_dir / "company_data.db"
+        config.PARQUET_DIR = args.output_dir / "parquet"
+    if args.command == "analytics":
+        if args.engine is not None:
+            config.ANALYTICS_ENGINE = args.engine
+        if args.json_format is not None:
+            config.ANALYTICS_JSON_FORMAT = args.json_format
+        if args.compress is not None:
+            config.ANALYTICS_COMPRESSION = args.compress
+    if args.command != "generate":
+        return
+
+    if args.start_date is not None:
+        config.START_DATE = args.start_date
+    if args.months_history is not None:
+        config.MONTHS_HISTORY = args.months_history
+    if args.months_forecast is not None:
+        config.MONTHS_FORECAST = args.months_forecast
+    if args.engine is not None:
+        config.ENGINE = args.engine
+    if args.formats is not None:
+        config.OUTPUT_FORMATS = args.formats
+    if args.surrogate_keys:
+        config.SURROGATE_KEYS = True
+
+    import src.generate_data.generate_master_material as master_material
+    import src.generate_data.generate_master_customer as master_customer
+
+    master_material.NUM_MATERIALS = args.materials or max(1, round(master_material.NUM_MATERIALS * args.scale_factor))
+    master_customer.NUM_CUSTOMERS = args.customers or max(1, round(master_customer.NUM_CUSTOMERS * args.scale_factor))
+
+
+def cmd_generate(args):
+    """Generate every table (stage DAG, or material chunks with --stream) and load the DB."""
+    random.seed(args.seed)
+
+    #==============================================
+    # CREATE OUTPUT DIRECTORY
+    #==============================================
+    from src.config import OUTPUT_DIR
+    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+
+    from src.generate_data.pipeline import run_pipeline, PIPELINE_JOBS
+    jobs = args.jobs or PIPELINE_JOBS
+
+    if not args.stream:
+        #==============================================
+        # CREATE MASTERS, ORDERS, SALES, BUDGET, INVENTORY, FORECAST + SQLITE
+        #==============================================
+        # Stage DAG: unchanged stages come from the cache, budget / inventory /
+        # forecast run concurrently once sales are available
+        run_pipeline(seed=args.seed, jobs=jobs, force=args.force, load_db=True, refresh=args.refresh)
+        return
+
+    #==============================================
+    # CREATE MASTER MATERIAL / MASTER CUSTOMER CSV
+    #==============================================
+    frames = run_pipeline(["MasterMaterial", "MasterCustomer"], seed=args.seed, jobs=jobs, force=args.force)
+    dfMaMa, dfMaCu = frames["MasterMaterial"], frames["MasterCustomer"]
+
+    #==============================================
+    # CREATE ORDERS, SALES, BUDGET, INVENTORY, FORECAST (STREAMING)
+    #==============================================
+    from src.generate_data.generate_streaming import generate_streaming, STREAM_CHUNK_MATERIALS, STREAM_WORKERS
+    generate_streaming(dfMaMa, dfMaCu,
+                       chunk_size=args.chunk_size or STREAM_CHUNK_MATERIALS,
+                       workers=args.workers or STREAM_WORKERS)
+
+    #==============================================
+    # CREATE SQLITE
+    #==============================================
+    # Masters are inserted from memory; streamed tables are re-read from the CSVs in chunks
+    from src.config import OUTPUT_FORMATS
+    from src.utils.utils import on_going_messages
+    if "csv" not in OUTPUT_FORMATS:
+        on_going_messages("[WARN] --stream without csv output: SQLite DB not created.")
+    else:
+        from src.generate_sql_lite_db.load_to_db import load_to_db
+        load_to_db(frames, refresh=args.refresh)
+
+
+def cmd_load(args):
+    """Load the CSVs of OUTPUT_DIR into the SQLite DB."""
+    from src.generate_sql_lite_db.load_to_db import load_to_db
+    load_to_db(refresh=args.refresh)
+
+
+def cmd_analytics(args):
+    """Compute the requested KPIs (all of them by default) in one pass over the shared tables."""
+    from analytics.runner import run_kpis, KPI_JOBS
+    run_kpis(args.kpis, jobs=args.jobs or KPI_JOBS)
+
+
+COMMANDS = {
+    "generate":  cmd_generate,
+    "load":      cmd_load,
+    "analytics": cmd_analytics,
+}
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    _apply_config(args)
+
+    # Run report: one JSON line per span (stage, write, load, kpi) in OUTPUT_DIR/run_report.jsonl.
+    # generate starts a new report, load and analytics append to the one of the data they read.
+    import src.config as config
+    from src.utils.run_report import start_run, end_run, RUN_REPORT_NAME
+    from src.utils.utils import on_going_messages
+
+    options = {name: value for name, value in vars(args).items() if name != "command"}
+    start_run(config.OUTPUT_DIR, args.command, trace_memory=args.trace_memory,
+              append=args.command != "generate", options=options)
+    start, status = time.perf_counter(), "error"
+    try:
+        COMMANDS[args.command](args)
+        status = "ok"
+    finally:
+        end_run(time.perf_counter() - start, status)
+    on_going_messages(f"[OK] Run report written to {config.OUTPUT_DIR / RUN_REPORT_NAME}")
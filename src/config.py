@@ -3,13 +3,47 @@ from datetime import datetime
 # Configurazione globale
 OUTPUT_DIR            = Path("data_output")
 SEASONAL_PATTERN_PATH = Path("config") / "seasonal_pattern.json"
+REGIONS_CACHE_PATH    = Path("config") / "regions.json"   # region names per country (pycountry cache)
 DB_PATH               = OUTPUT_DIR / "company_data.db"
+PARQUET_DIR           = OUTPUT_DIR / "parquet"
+
+# Output sinks written by the generators: "csv" (OUTPUT_DIR/*.csv) and/or
+# "parquet" (PARQUET_DIR/<Table>/, typed and partitioned by month, needs pyarrow)
+OUTPUT_FORMATS = ["csv"]
 
 # Time window (shared by orders, sales, budget)
 START_DATE      = datetime(2023, 1, 1)
 MONTHS_HISTORY  = 24
 MONTHS_FORECAST = 12
 
+# Generation engine used by the generate_* stages:
+#   "numpy"  : vectorized implementation (bulk draws with numpy.random.Generator)
+#   "python" : original row-by-row loops driven by the `random` module
+ENGINE = "numpy"
+
+# In-memory representation of the tables between generation and the sinks:
+#   False : string IDs (MAT001, ORD000001, ...) everywhere
+#   True  : integer surrogate keys (int32, int64 when needed) and pandas
+#           categoricals for the master attributes; the string IDs are rendered
+#           only by the sinks, so CSV / Parquet / SQLite output is unchanged
+#           (numpy engine only: the python reference loops expect string IDs)
+SURROGATE_KEYS = False
+
+# Engine used by the analytics KPIs that support it (analytics/kpi_otif.py):
+#   "pandas" : tables read with analytics/loader.py and aggregated in memory
+#   "sqlite" : joins and aggregations run by SQLite on DB_PATH, only the
+#              aggregated result is read into Python
+ANALYTICS_ENGINE = "pandas"
+
+# Layout of the analytics JSON files (analytics/output.py):
+#   "records" : {"meta", "data": [{field: value, ...}, ...]}, indented
+#   "columns" : {"meta", "data": {field: [values]}}, compact (orjson if installed)
+ANALYTICS_JSON_FORMAT = "records"
+
+# Precompressed siblings written next to every analytics JSON:
+# any of "gzip" (.json.gz) and "brotli" (.json.br, requires brotli)
+ANALYTICS_COMPRESSION = []
+
 
 
 #====================
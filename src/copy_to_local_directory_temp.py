@@ -33,7 +33,8 @@ def copy_json_to_portfolio() -> None:
 
     PORTFOLIO_DIR.mkdir(parents=True, exist_ok=True)
 
-    json_files = list(ANALYTICS_DIR.glob("*.json"))
+    # JSON e copie precompresse (ANALYTICS_COMPRESSION)
+    json_files = [*ANALYTICS_DIR.glob("*.json"), *ANALYTICS_DIR.glob("*.json.gz"), *ANALYTICS_DIR.glob("*.json.br")]
 
     if not json_files:
         on_going_messages("[SKIP] Nessun file JSON trovato in analytics/")
@@ -1,10 +1,13 @@
 import random
+import numpy as np
 import pandas as pd
 from datetime import datetime
 
-from src.config import OUTPUT_DIR, START_DATE, MONTHS_HISTORY, MONTHS_FORECAST
-from src.utils.utils import on_going_messages
-from src.generate_data.generate_support_value import SEASONAL_FACTORS
+from src.config import START_DATE, MONTHS_HISTORY, MONTHS_FORECAST, ENGINE
+from src.generate_data.sinks import write_table
+from src.generate_sql_lite_db.schema import make_keys, key_array, render_keys
+from src.utils.utils import on_going_messages, numpy_rng
+from src.generate_data.generate_support_value import seasonal_factors, seasonal_vector
 
 #===============================
 # budget configuration
@@ -18,12 +21,52 @@ BUDGET_GRW_MIN = 0.02
 BUDGET_GRW_MAX = 0.08
 
 
-def generate_budget(sales_df):
+def _budget_months():
+    """
+    Return the first day of every budget month.
+
+    Budget covers the full historical window + forecast
+    Start: same as orders/sales (START_DATE)
+    End:   MONTHS_HISTORY + MONTHS_FORECAST months later
+    """
+    proj_dates = []
+    current = START_DATE
+    for _ in range(MONTHS_HISTORY + MONTHS_FORECAST):
+        proj_dates.append(current)
+        if current.month == 12:
+            current = datetime(current.year + 1, 1, 1)
+        else:
+            current = datetime(current.year, current.month + 1, 1)
+    return proj_dates
+
+
+def _avg_per_material(monthly_df):
+    """
+    Average monthly qty and value per MaterialID over the months with sales.
+
+    Reads the monthly sales aggregate (VendutoMensile, months of ShipmentDate)
+    so the baseline aligns with how sales are aggregated in the view.
+
+    Returns:
+        DataFrame with columns MaterialID, AvgQty, AvgValue (sorted by MaterialID)
+    """
+    avg = (
+        monthly_df
+        .groupby("MaterialID")
+        .agg(AvgQty=("QuantitySold", "mean"), AvgValue=("SaleValue", "mean"))
+        .reset_index()
+    )
+    # Order of the string IDs (MAT1000 < MAT101) also when MaterialID holds surrogate keys
+    order = np.argsort(render_keys(avg[["MaterialID"]])["MaterialID"].to_numpy(), kind="stable")
+    return avg.iloc[order].reset_index(drop=True)
+
+
+def generate_budget(sales_monthly_df, engine=ENGINE):
     """
     Genera il file Budget.csv con il budget mensile per materiale.
 
-    Aggrega lo storico delle vendite (Venduto) per MaterialID × Mese, calcola
-    la media mensile per ogni materiale e genera il budget per l'intero arco
+    Parte dal venduto mensile per materiale (VendutoMensile), calcola la media
+    mensile per ogni materiale e genera il budget per l'intero arco
     temporale (MONTHS_HISTORY + MONTHS_FORECAST mesi a partire da START_DATE)
     applicando:
       - seasonal_factor  : fattore stagionale del mese
@@ -35,51 +78,44 @@ def generate_budget(sales_df):
 
     Fields generated:
         BudgetID     (str)   : Sequential unique identifier (format: BDGxxxxxx)
-        BudgetMonth  (str)   : Budget month in YYYY-MM format
+        BudgetMonth  (date)  : Budget month (first day; YYYY-MM in the CSV)
         MaterialID   (str)   : Reference to MasterMaterial
         BudgetQty    (int)   : Planned quantity
         BudgetValue  (float) : Planned revenue
 
+    Engine:
+        "numpy"  : proiezione come prodotto esterno materiali × mesi (vedi _budget_numpy)
+        "python" : loop originale materiale → mese
+        Le distribuzioni sono le stesse, lo stream casuale no.
+
     Args:
-        sales_df: DataFrame delle vendite (deve contenere le colonne di Venduto.csv)
+        sales_monthly_df: venduto mensile per materiale (colonne di VendutoMensile,
+                          vedi generate_sales_aggregates.py)
+        engine:           "numpy" or "python" (default: ENGINE from src/config.py)
 
     Returns:
         DataFrame con il budget
     """
     on_going_messages("Generating budget...")
 
-    # Budget covers the full historical window + forecast
-    # Start: same as orders/sales (START_DATE)
-    # End:   MONTHS_HISTORY + MONTHS_FORECAST months later
+    proj_dates       = _budget_months()
+    avg_per_material = _avg_per_material(sales_monthly_df)
 
-    # Build list of budget dates
-    proj_dates = []
-    current = START_DATE
-    for _ in range(MONTHS_HISTORY + MONTHS_FORECAST):
-        proj_dates.append(current)
-        if current.month == 12:
-            current = datetime(current.year + 1, 1, 1)
-        else:
-            current = datetime(current.year, current.month + 1, 1)
+    if engine == "numpy":
+        df = _budget_numpy(avg_per_material, proj_dates)
+    elif engine == "python":
+        df = _budget_python(avg_per_material, proj_dates)
+    else:
+        raise ValueError(f"Unknown engine '{engine}' (expected 'numpy' or 'python')")
 
-    # Average monthly qty and value per MaterialID over the historical period
-    # Uses ShipmentDate so the baseline aligns with how sales are aggregated in the view
-    df_hist = sales_df.copy()
-    df_hist["YearMonth"] = pd.to_datetime(df_hist["ShipmentDate"]).dt.to_period("M")
+    write_table(df, "Budget")
+    on_going_messages(f"[OK] Generated Budget.csv - {len(df)} rows")
+    print(f"[OK] Generati {len(df)} righe budget")
+    return df
 
-    monthly_agg = (
-        df_hist
-        .groupby(["MaterialID", "YearMonth"])
-        .agg(TotalQty=("QuantitySold", "sum"), TotalValue=("SaleValue", "sum"))
-        .reset_index()
-    )
-    avg_per_material = (
-        monthly_agg
-        .groupby("MaterialID")
-        .agg(AvgQty=("TotalQty", "mean"), AvgValue=("TotalValue", "mean"))
-        .reset_index()
-    )
 
+def _budget_python(avg_per_material, proj_dates):
+    """Reference engine: one Python dict per (material, month)."""
     budget   = []
     budget_id = 1
 
@@ -92,22 +128,57 @@ def generate_budget(sales_df):
 
         for month_idx, date in enumerate(proj_dates):
             growth_factor   = 1 + annual_growth * (month_idx / 12)
-            seasonal_factor = SEASONAL_FACTORS[str(date.month)][0]
+            seasonal_factor = seasonal_factors()[str(date.month)][0]
             buffer_factor   = random.uniform(1 + BUFFER_MIN, 1 + BUFFER_MAX)
 
             combined = growth_factor * seasonal_factor * buffer_factor
 
             budget.append({
-                "BudgetID":    f"BDG{budget_id:06d}",
-                "BudgetMonth": date.strftime("%Y-%m"),
+                "BudgetID":    budget_id,
+                "BudgetMonth": date,
                 "MaterialID":  material_id,
                 "BudgetQty":   max(1, int(avg_qty * combined)),
                 "BudgetValue": round(avg_value * combined, 2),
             })
             budget_id += 1
 
-    df = pd.DataFrame(budget)
-    df.to_csv(OUTPUT_DIR / "Budget.csv", index=False)
-    on_going_messages(f"[OK] Generated Budget.csv - {len(df)} rows")
-    print(f"[OK] Generati {len(df)} righe budget")
-    return df
+    return render_keys(pd.DataFrame(budget))
+
+
+def _budget_numpy(avg_per_material, proj_dates, rng=None, first_id=1):
+    """
+    Vectorized engine: the projection is an outer product over materials × months.
+
+        combined[m, t] = (1 + growth[m] × t / 12) × seasonal[t] × buffer[m, t]
+        BudgetQty      = max(1, int(AvgQty[m] × combined[m, t]))
+        BudgetValue    = round(AvgValue[m] × combined[m, t], 2)
+
+    Rows keep the reference ordering (material, then month); BudgetIDs start
+    at `first_id`.
+    """
+    if rng is None:
+        rng = numpy_rng()
+
+    material_ids = avg_per_material["MaterialID"].to_numpy()
+    avg_qty      = avg_per_material["AvgQty"].to_numpy(dtype=float)
+    avg_value    = avg_per_material["AvgValue"].to_numpy(dtype=float)
+    n_materials  = len(material_ids)
+
+    months   = np.array(proj_dates, dtype="datetime64[M]")
+    n_months = len(months)
+    t        = np.arange(n_months)
+
+    annual_growth = rng.uniform(BUDGET_GRW_MIN, BUDGET_GRW_MAX, size=n_materials)
+    growth_factor = 1 + annual_growth[:, None] * (t[None, :] / 12)
+    seasonal      = seasonal_vector()[months.astype(np.int64) % 12]
+    buffer_factor = rng.uniform(1 + BUFFER_MIN, 1 + BUFFER_MAX, size=(n_materials, n_months))
+
+    combined = growth_factor * seasonal[None, :] * buffer_factor
+
+    return pd.DataFrame({
+        "BudgetID":    make_keys("BudgetID", np.arange(first_id, first_id + n_materials * n_months)),
+        "BudgetMonth": np.tile(months, n_materials),
+        "MaterialID":  key_array(material_ids).take(np.repeat(np.arange(n_materials), n_months)),
+        "BudgetQty":   np.maximum(1, (avg_qty[:, None] * combined).astype(np.int64)).ravel(),
+        "BudgetValue": np.round(avg_value[:, None] * combined, 2).ravel(),
+    })
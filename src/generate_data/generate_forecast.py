@@ -1,10 +1,13 @@
 import random
+import numpy as np
 import pandas as pd
 from datetime import datetime
 
-from src.config import OUTPUT_DIR, START_DATE, MONTHS_HISTORY, MONTHS_FORECAST
-from src.utils.utils import on_going_messages
-from src.generate_data.generate_support_value import SEASONAL_FACTORS
+from src.config import START_DATE, MONTHS_HISTORY, MONTHS_FORECAST, ENGINE
+from src.generate_data.sinks import write_table
+from src.generate_sql_lite_db.schema import make_keys, key_array, render_keys
+from src.utils.utils import on_going_messages, numpy_rng
+from src.generate_data.generate_support_value import seasonal_factors, seasonal_vector
 
 #===============================
 # forecast configuration
@@ -38,7 +41,7 @@ def _subtract_months(dt: datetime, months: int) -> datetime:
     return datetime(total // 12, total % 12 + 1, 1)
 
 
-def generate_forecast(sales_df, materials_df):
+def generate_forecast(sales_monthly_df, materials_df, engine=ENGINE):
     """
     Genera il file Forecast.csv con il forecast mensile della domanda per materiale.
 
@@ -47,9 +50,9 @@ def generate_forecast(sales_df, materials_df):
 
     Schema della tabella (formato tall):
         ForecastID     (str)   : Identificatore univoco (formato: FCSTxxxxxxx)
-        ForecastMadeOn (str)   : Mese in cui il forecast è stato prodotto (YYYY-MM)
-                                 = ForecastMonth − Horizon mesi
-        ForecastMonth  (str)   : Mese previsto (YYYY-MM)
+        ForecastMadeOn (date)  : Mese in cui il forecast è stato prodotto (primo
+                                 giorno; YYYY-MM nel CSV) = ForecastMonth − Horizon mesi
+        ForecastMonth  (date)  : Mese previsto (primo giorno; YYYY-MM nel CSV)
         MaterialID     (str)   : Riferimento a MasterMaterial
         Horizon        (int)   : Orizzonte previsionale in mesi (1 … 15)
         ForecastQty    (int)   : Quantità prevista (min 1)
@@ -59,7 +62,7 @@ def generate_forecast(sales_df, materials_df):
         - Ogni materiale riceve un bias casuale stabile (errore sistematico).
         - Il rumore cresce linearmente con l'orizzonte:
               noise_amp = NOISE_BASE + NOISE_SLOPE × (Horizon − 1)
-        - Per i mesi storici la base è la quantità effettiva (da Venduto).
+        - Per i mesi storici la base è la quantità effettiva (da VendutoMensile).
         - Per i mesi futuri si usa la media storica × stagionalità × crescita
           (stesso approccio di generate_budget.py).
 
@@ -68,16 +71,36 @@ def generate_forecast(sales_df, materials_df):
         filtrare sui mesi storici dove esistono le vendite reali, poi calcolare
         MAPE / MAE / Bias per ciascun orizzonte.
 
+    Engine:
+        "numpy"  : un unico tensore materiale × mese × orizzonte (vedi _forecast_numpy)
+        "python" : loop originali materiale → mese → orizzonte
+        Le distribuzioni sono le stesse, lo stream casuale no.
+
     Args:
-        sales_df:     DataFrame Venduto (colonne: MaterialID, ShipmentDate,
-                      QuantitySold, SaleValue)
-        materials_df: DataFrame MasterMaterial (colonne: MaterialID, UnitPrice)
+        sales_monthly_df: venduto mensile per materiale (colonne: SalesMonth,
+                          MaterialID, QuantitySold; vedi generate_sales_aggregates.py)
+        materials_df:     DataFrame MasterMaterial (colonne: MaterialID, UnitPrice)
+        engine:           "numpy" or "python" (default: ENGINE from src/config.py)
 
     Returns:
         DataFrame con il forecast mensile (tall format)
     """
     on_going_messages("Generating forecast...")
 
+    if engine == "numpy":
+        df = _forecast_numpy(sales_monthly_df, materials_df)
+    elif engine == "python":
+        df = _forecast_python(sales_monthly_df, materials_df)
+    else:
+        raise ValueError(f"Unknown engine '{engine}' (expected 'numpy' or 'python')")
+
+    write_table(df, "Forecast")
+    on_going_messages(f"[OK] Generated Forecast.csv - {len(df)} rows")
+    return df
+
+
+def _forecast_python(sales_monthly_df, materials_df):
+    """Reference engine: one Python dict per (material, month, horizon)."""
     # --- Build list of all months in the full window ---
     all_months = []
     current = START_DATE
@@ -88,23 +111,17 @@ def generate_forecast(sales_df, materials_df):
         else:
             current = datetime(current.year, current.month + 1, 1)
 
-    # --- Aggregate actual monthly sales per material ---
-    df_sales = sales_df.copy()
-    df_sales["YearMonth"] = pd.to_datetime(df_sales["ShipmentDate"]).dt.to_period("M")
-
+    # --- Actual monthly sales per material ---
     actual_agg = (
-        df_sales
-        .groupby(["MaterialID", "YearMonth"])["QuantitySold"]
-        .sum()
-        .reset_index()
-        .rename(columns={"QuantitySold": "ActualQty"})
+        sales_monthly_df[["MaterialID", "SalesMonth", "QuantitySold"]]
+        .rename(columns={"SalesMonth": "YearMonth", "QuantitySold": "ActualQty"})
     )
 
-    # Actual lookup: {mat_id: {ym_str: qty}}
-    actual_dict: dict[str, dict[str, int]] = {}
+    # Actual lookup: {mat_id: {month (first day): qty}}
+    actual_dict: dict[str, dict[datetime, int]] = {}
     for _, row in actual_agg.iterrows():
         mat = row["MaterialID"]
-        ym  = str(row["YearMonth"])   # e.g. "2023-01"
+        ym  = row["YearMonth"].to_pydatetime()
         actual_dict.setdefault(mat, {})[ym] = int(row["ActualQty"])
 
     # Historical monthly avg per material (used to extrapolate future months)
@@ -133,14 +150,13 @@ def generate_forecast(sales_df, materials_df):
         avg_qty       = avg_lookup.get(mat_id, 1.0)
 
         for month_idx, date in enumerate(all_months):
-            ym_str    = date.strftime("%Y-%m")
             is_future = month_idx >= MONTHS_HISTORY
 
             # Base quantity: actual for historical months, extrapolated for future
-            if not is_future and ym_str in actual_dict.get(mat_id, {}):
-                base_qty = actual_dict[mat_id][ym_str]
+            if not is_future and date in actual_dict.get(mat_id, {}):
+                base_qty = actual_dict[mat_id][date]
             else:
-                seasonal_factor = SEASONAL_FACTORS[str(date.month)][0]
+                seasonal_factor = seasonal_factors()[str(date.month)][0]
                 growth_factor   = 1 + annual_growth * (month_idx / 12)
                 base_qty        = avg_qty * seasonal_factor * growth_factor
 
@@ -154,9 +170,9 @@ def generate_forecast(sales_df, materials_df):
                 made_on_date   = _subtract_months(date, horizon)
 
                 records.append({
-                    "ForecastID":     f"FCST{forecast_id:07d}",
-                    "ForecastMadeOn": made_on_date.strftime("%Y-%m"),
-                    "ForecastMonth":  ym_str,
+                    "ForecastID":     forecast_id,
+                    "ForecastMadeOn": made_on_date,
+                    "ForecastMonth":  date,
                     "MaterialID":     mat_id,
                     "Horizon":        horizon,
                     "ForecastQty":    fcst_qty,
@@ -164,7 +180,85 @@ def generate_forecast(sales_df, materials_df):
                 })
                 forecast_id += 1
 
-    df = pd.DataFrame(records)
-    df.to_csv(OUTPUT_DIR / "Forecast.csv", index=False)
-    on_going_messages(f"[OK] Generated Forecast.csv - {len(df)} rows")
-    return df
+    return render_keys(pd.DataFrame(records))
+
+
+def _forecast_numpy(sales_monthly_df, materials_df, rng=None, first_id=1):
+    """
+    Tensor engine: the whole forecast is one (materials × months × horizons) array.
+
+        base[m, t]       : actual qty for historical months with sales, otherwise
+                           avg_qty[m] × seasonal[t] × (1 + growth[m] × t / 12)
+        noise[m, t, h]   : uniform in ±(NOISE_BASE + NOISE_SLOPE × (h − 1))
+        qty[m, t, h]     : max(1, int(base[m, t] × (1 + bias[m] + noise[m, t, h])))
+
+    ForecastMadeOn is computed with integer month arithmetic (month index − horizon).
+    Rows keep the reference ordering
+    (material, then month, then horizon); ForecastIDs start at `first_id`.
+    """
+    if rng is None:
+        rng = numpy_rng()
+
+    n_months    = MONTHS_HISTORY + MONTHS_FORECAST
+    first_month = np.datetime64(START_DATE.strftime("%Y-%m"), "M")
+    all_months  = first_month + np.arange(n_months)
+    horizons    = np.array(HORIZONS, dtype=np.int64)
+
+    material_ids = materials_df["MaterialID"].to_numpy()
+    unit_price   = materials_df["UnitPrice"].to_numpy(dtype=float)
+    n_materials  = len(material_ids)
+
+    # --- Dense actual matrix (materials × historical months) ---
+    mat_code  = pd.Categorical(sales_monthly_df["MaterialID"], categories=material_ids).codes.astype(np.int64)
+    month_idx = (sales_monthly_df["SalesMonth"].to_numpy().astype("datetime64[M]") - first_month).astype(np.int64)
+    qty       = sales_monthly_df["QuantitySold"].to_numpy(dtype=np.int64)
+
+    known   = mat_code >= 0
+    monthly = pd.DataFrame({"mat": mat_code[known], "month": month_idx[known], "qty": qty[known]})
+
+    # Historical monthly avg per material (over every month with sales, as in the loop engine)
+    avg_qty = (
+        monthly.groupby("mat")["qty"].mean()
+        .reindex(np.arange(n_materials), fill_value=1.0)
+        .to_numpy(dtype=float)
+    )
+
+    in_hist    = (monthly["month"] >= 0) & (monthly["month"] < MONTHS_HISTORY)
+    actual     = np.zeros((n_materials, n_months), dtype=float)
+    has_actual = np.zeros((n_materials, n_months), dtype=bool)
+    actual[monthly["mat"][in_hist], monthly["month"][in_hist]]     = monthly["qty"][in_hist]
+    has_actual[monthly["mat"][in_hist], monthly["month"][in_hist]] = True
+
+    # Per-material stable bias and growth rate
+    bias          = rng.uniform(BIAS_MIN, BIAS_MAX, size=n_materials)
+    annual_growth = rng.uniform(FORECAST_GRW_MIN, FORECAST_GRW_MAX, size=n_materials)
+
+    # --- Base quantity matrix (materials × months) ---
+    t        = np.arange(n_months)
+    seasonal = seasonal_vector()[all_months.astype(np.int64) % 12]
+    extrapolated = avg_qty[:, None] * seasonal[None, :] * (1 + annual_growth[:, None] * (t[None, :] / 12))
+    base_qty = np.where(has_actual, actual, extrapolated)
+
+    # --- Horizon-dependent noise (materials × months × horizons) ---
+    noise_amp  = NOISE_BASE + NOISE_SLOPE * (horizons - 1)
+    noise      = rng.uniform(-1.0, 1.0, size=(n_materials, n_months, len(horizons))) * noise_amp
+    multiplier = 1 + bias[:, None, None] + noise
+
+    fcst_qty   = np.maximum(1, (base_qty[:, :, None] * multiplier).astype(np.int64))
+    fcst_value = np.round(fcst_qty * unit_price[:, None, None], 2)
+
+    # --- Flatten to the tall layout ---
+    n_rows   = fcst_qty.size
+    mat_rows = np.repeat(np.arange(n_materials), n_months * len(horizons))
+    mon_rows = np.tile(np.repeat(t, len(horizons)), n_materials)
+    hor_rows = np.tile(horizons, n_materials * n_months)
+
+    return pd.DataFrame({
+        "ForecastID":     make_keys("ForecastID", np.arange(first_id, first_id + n_rows)),
+        "ForecastMadeOn": all_months[mon_rows] - hor_rows,
+        "ForecastMonth":  all_months[mon_rows],
+        "MaterialID":     key_array(material_ids).take(mat_rows),
+        "Horizon":        hor_rows,
+        "ForecastQty":    fcst_qty.ravel(),
+        "ForecastValue":  fcst_value.ravel(),
+    })
@@ -1,7 +1,10 @@
+import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
 
-from src.config import OUTPUT_DIR, START_DATE, MONTHS_HISTORY
+from src.config import START_DATE, MONTHS_HISTORY, ENGINE
+from src.generate_data.sinks import write_table
+from src.generate_sql_lite_db.schema import make_keys, key_array, render_keys
 from src.utils.utils import on_going_messages
 
 #===============================
@@ -55,13 +58,14 @@ def _generate_all_days(start_date, months):
     return days
 
 
-def generate_inventory(materials_df, sales_df):
+def generate_inventory(materials_df, sales_daily_df, engine=ENGINE):
     """
     Genera il file Inventario.csv con lo stock giornaliero per ogni materiale.
 
     Lo stock segue un andamento a dente di sega:
-      - Le uscite giornaliere (DailyOutflow) sono ricavate da Venduto.csv
-        (QuantitySold aggregato per MaterialID × ShipmentDate).
+      - Le uscite giornaliere (DailyOutflow) sono ricavate da Venduto
+        (QuantitySold aggregato per MaterialID × ShipmentDate, vedi
+        generate_sales_aggregates.py).
       - Le entrate (DailyInflow) sono generate da un modello a reorder point:
         quando lo stock scende sotto una soglia (reorder_point), viene piazzato
         un ordine di rifornimento che arriva dopo un lead time casuale.
@@ -79,35 +83,61 @@ def generate_inventory(materials_df, sales_df):
 
     Fields generated:
         InventoryID  (str)  : Sequential unique identifier (format: INVxxxxxxx)
-        Date         (str)  : Reference date in YYYY-MM-DD format
+        Date         (date) : Reference date (datetime64; YYYY-MM-DD in the CSV)
         MaterialID   (str)  : Reference to MasterMaterial
         OpeningStock (int)  : Stock at the start of the day
         DailyInflow  (int)  : Units received from replenishment orders that day
         DailyOutflow (int)  : Units shipped (from Venduto.csv) that day
         ClosingStock (int)  : Stock at the end of the day (min 0)
 
+    La simulazione è deterministica: i due engine producono lo stesso output.
+        "numpy"  : un solo loop sui giorni, stato di tutti i materiali in array
+                   (vedi _inventory_numpy)
+        "python" : loop originale materiale × giorno
+
     Args:
-        materials_df: DataFrame dei materiali (colonne: MaterialID, Importance, LeadTimeDays)
-        sales_df:     DataFrame delle vendite (colonne: MaterialID, ShipmentDate, QuantitySold)
+        materials_df:   DataFrame dei materiali (colonne: MaterialID, Importance, LeadTimeDays)
+        sales_daily_df: venduto giornaliero per materiale (colonne: MaterialID,
+                        ShipmentDate come datetime64, QuantitySold)
+        engine:         "numpy" or "python" (default: ENGINE from src/config.py)
 
     Returns:
         DataFrame con l'inventario giornaliero
     """
     on_going_messages("Generating inventory...")
 
-    # --- Build outflow lookup: {material_id: {date: qty}} ---
-    df_sales = sales_df.copy()
-    df_sales["ShipmentDate"] = pd.to_datetime(df_sales["ShipmentDate"])
+    if engine == "numpy":
+        df, stockout_log = _inventory_numpy(materials_df, sales_daily_df)
+    elif engine == "python":
+        df, stockout_log = _inventory_python(materials_df, sales_daily_df)
+    else:
+        raise ValueError(f"Unknown engine '{engine}' (expected 'numpy' or 'python')")
+
+    _log_stockouts(stockout_log)
+
+    write_table(df, "Inventario")
+    on_going_messages(f"[OK] Generated Inventario.csv - {len(df)} rows")
+    return df
+
+
+def _log_stockouts(stockout_log):
+    """Print the stockout summary ({MaterialID: stockout_days}) to console."""
+    total_stockouts = sum(stockout_log.values())
+    if total_stockouts > 0:
+        on_going_messages(f"[WARN] Stockout days detected:")
+        mat_ids = render_keys(pd.DataFrame({"MaterialID": list(stockout_log)}))["MaterialID"]
+        for mat_id, days in zip(mat_ids, stockout_log.values()):
+            if days > 0:
+                print(f"         {mat_id}: {days} days")
+    else:
+        on_going_messages("[OK] No stockout days detected")
 
-    outflow_agg = (
-        df_sales
-        .groupby(["MaterialID", "ShipmentDate"])["QuantitySold"]
-        .sum()
-        .reset_index()
-    )
 
+def _inventory_python(materials_df, sales_daily_df):
+    """Reference engine: one day loop per material with a pending_orders dict."""
+    # --- Build outflow lookup: {material_id: {date: qty}} ---
     outflow_dict = {}
-    for _, row in outflow_agg.iterrows():
+    for _, row in sales_daily_df.iterrows():
         mat  = row["MaterialID"]
         date = row["ShipmentDate"].date()
         outflow_dict.setdefault(mat, {})[date] = int(row["QuantitySold"])
@@ -161,8 +191,8 @@ def generate_inventory(materials_df, sales_df):
                 stockout_days += 1
 
             records.append({
-                "InventoryID":  f"INV{inv_id:07d}",
-                "Date":         day.strftime("%Y-%m-%d"),
+                "InventoryID":  inv_id,
+                "Date":         day,
                 "MaterialID":   mat_id,
                 "OpeningStock": opening_stock,
                 "DailyInflow":  inflow,
@@ -180,17 +210,95 @@ def generate_inventory(materials_df, sales_df):
 
         stockout_log[mat_id] = stockout_days
 
-    # --- Stockout summary ---
-    total_stockouts = sum(stockout_log.values())
-    if total_stockouts > 0:
-        on_going_messages(f"[WARN] Stockout days detected:")
-        for mat_id, days in stockout_log.items():
-            if days > 0:
-                print(f"         {mat_id}: {days} days")
-    else:
-        on_going_messages("[OK] No stockout days detected")
+    return render_keys(pd.DataFrame(records)), stockout_log
 
-    df = pd.DataFrame(records)
-    df.to_csv(OUTPUT_DIR / "Inventario.csv", index=False)
-    on_going_messages(f"[OK] Generated Inventario.csv - {len(df)} rows")
-    return df
+
+def _inventory_numpy(materials_df, sales_daily_df, first_id=1):
+    """
+    Batch engine: the reorder-point simulation steps once per day across all materials.
+
+    State kept as arrays of length n_materials:
+        opening stock, pending arrival day (-1 = none), pending qty,
+        reorder point, reorder qty, lead time, stockout counter.
+
+    Outflows come from a dense materials × days matrix built with a single
+    bincount over the daily sales aggregate (material code, day index) — the
+    sales that fall outside the window still count towards the average daily
+    consumption, as in the loop engine.
+
+    InventoryIDs start at `first_id`.
+
+    Returns:
+        (DataFrame, {MaterialID: stockout_days})
+    """
+    all_days   = np.array(_generate_all_days(START_DATE, MONTHS_HISTORY), dtype="datetime64[D]")
+    total_days = len(all_days)
+
+    material_ids  = materials_df["MaterialID"].to_numpy()
+    n_materials   = len(material_ids)
+    lead_time     = materials_df["LeadTimeDays"].to_numpy(dtype=np.int64)
+    importance    = materials_df["Importance"].to_numpy()
+    cfg = {key: np.array([INV_CONFIG[imp][key] for imp in importance], dtype=float)
+           for key in ("initial_days", "reorder_point_days", "reorder_qty_days")}
+
+    # --- Dense outflow matrix (materials × days) ---
+    mat_code = pd.Categorical(sales_daily_df["MaterialID"], categories=material_ids).codes.astype(np.int64)
+    day_idx  = (sales_daily_df["ShipmentDate"].to_numpy().astype("datetime64[D]") - all_days[0]).astype(np.int64)
+    qty      = sales_daily_df["QuantitySold"].to_numpy(dtype=np.int64)
+
+    known     = mat_code >= 0
+    in_window = known & (day_idx >= 0) & (day_idx < total_days)
+    outflow   = np.bincount(
+        mat_code[in_window] * total_days + day_idx[in_window],
+        weights=qty[in_window],
+        minlength=n_materials * total_days,
+    ).astype(np.int64).reshape(n_materials, total_days)
+    total_out = np.bincount(mat_code[known], weights=qty[known], minlength=n_materials)
+
+    # Average daily consumption over the full history window
+    avg_daily = total_out / total_days if total_days > 0 else np.full(n_materials, AVG_DAILY_FALLBACK, dtype=float)
+    avg_daily = np.where(avg_daily == 0, AVG_DAILY_FALLBACK, avg_daily)
+
+    initial_stock = np.maximum(10, (avg_daily * cfg["initial_days"]).astype(np.int64))
+    reorder_point = np.maximum(5,  (avg_daily * cfg["reorder_point_days"]).astype(np.int64))
+    reorder_qty   = np.maximum(10, (avg_daily * cfg["reorder_qty_days"]).astype(np.int64))
+
+    opening  = np.empty((n_materials, total_days), dtype=np.int64)
+    inflow   = np.zeros((n_materials, total_days), dtype=np.int64)
+    closing  = np.empty((n_materials, total_days), dtype=np.int64)
+
+    stock          = initial_stock.copy()
+    pending_day    = np.full(n_materials, -1, dtype=np.int64)   # -1 = no pending order
+    pending_qty    = np.zeros(n_materials, dtype=np.int64)
+    stockout_days  = np.zeros(n_materials, dtype=np.int64)
+
+    for d in range(total_days):
+        opening[:, d] = stock
+
+        # Receive any replenishment arriving today
+        arriving = pending_day == d
+        inflow[arriving, d] = pending_qty[arriving]
+        pending_day[arriving] = -1
+
+        # Closing stock — clamped to 0
+        closing_raw   = stock + inflow[:, d] - outflow[:, d]
+        stockout_days += closing_raw < 0
+        stock         = np.maximum(0, closing_raw)
+        closing[:, d] = stock
+
+        # Place a replenishment order if below reorder point and none pending
+        reorder = (stock <= reorder_point) & (pending_day < 0)
+        pending_day[reorder] = d + lead_time[reorder]
+        pending_qty[reorder] = reorder_qty[reorder]
+
+    n_rows = n_materials * total_days
+    df = pd.DataFrame({
+        "InventoryID":  make_keys("InventoryID", np.arange(first_id, first_id + n_rows)),
+        "Date":         np.tile(all_days, n_materials),
+        "MaterialID":   key_array(material_ids).take(np.repeat(np.arange(n_materials), total_days)),
+        "OpeningStock": opening.ravel(),
+        "DailyInflow":  inflow.ravel(),
+        "DailyOutflow": outflow.ravel(),
+        "ClosingStock": closing.ravel(),
+    })
+    return df, dict(zip(material_ids, stockout_days.tolist()))
@@ -1,9 +1,13 @@
+import json
 import random
-import pycountry
+from functools import lru_cache
+
 import pandas as pd
 
+from src.config import REGIONS_CACHE_PATH
+from src.generate_data.sinks import write_table
+from src.generate_sql_lite_db.schema import make_keys, categorize
 from src.utils.utils import on_going_messages
-from src.config import  OUTPUT_DIR
 
 #===============================
 # master customers configuration
@@ -28,14 +32,39 @@ def get_regions_from_pycountry(country_iso_code2):
     Args:
         country_iso_code2 (str): Two-letter ISO country code (e.g. 'IT' for Italy)
 
+    pycountry returns the subdivisions as a set, whose iteration order changes
+    between processes: the names are sorted so that random.choice(regions)
+    is reproducible for a given seed.
+
     Returns:
-        List[str]: Names of administrative subdivisions of type 'Region'
+        List[str]: Names of administrative subdivisions of type 'Region' (sorted)
     """
-    country_all_administration = pycountry.subdivisions.get(country_code = COUNTRY_ISO2_CODE)   # Get all administration from country
+    import pycountry   # slow to load its database: only needed when the region cache misses
+
+    country_all_administration = pycountry.subdivisions.get(country_code = country_iso_code2)   # Get all administration from country
     regions_temp = [sub for sub in country_all_administration if sub.type == "Region"]          # Get all regions from country ()
-    return [r.name for r in regions_temp]   
-                                                    
-regions = get_regions_from_pycountry(COUNTRY_ISO2_CODE)
+    return sorted(r.name for r in regions_temp)
+
+
+@lru_cache(maxsize=None)
+def get_regions(country_iso_code2):
+    """
+    Region names for a country, from the cached table REGIONS_CACHE_PATH.
+
+    A country missing from the cache is looked up once with pycountry and
+    added to the file, so pycountry is not needed on later runs.
+    """
+    cache = {}
+    if REGIONS_CACHE_PATH.exists():
+        with open(REGIONS_CACHE_PATH, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+
+    if country_iso_code2 not in cache:
+        cache[country_iso_code2] = get_regions_from_pycountry(country_iso_code2)
+        with open(REGIONS_CACHE_PATH, "w", encoding="utf-8") as f:
+            json.dump(cache, f, indent=4, ensure_ascii=False)
+            f.write("\n")
+    return cache[country_iso_code2]
 
 # Payment terms (Cambiare con qualcos'altro)
 PAYMENT_TERMS = [30, 60, 90, 120]
@@ -60,11 +89,11 @@ def generate_master_customer():
     """
     on_going_messages("Generating customers...")
 
+    regions   = get_regions(COUNTRY_ISO2_CODE)
     customers = []
     for i in range(1, NUM_CUSTOMERS + 1):
         
         customer = {
-            "CustomerID": f"CUST{i:03d}",
             "CustomerName": f"Cliente_{chr(64 + ((i-1)%26 + 1))}{i}",
             "CustomerType": random.choice(CUSTOMER_TYPES),
             "Region": random.choice(regions),
@@ -73,6 +102,8 @@ def generate_master_customer():
         customers.append(customer)
 
     df = pd.DataFrame(customers)
-    df.to_csv(OUTPUT_DIR / "MasterCustomer.csv", index=False)
+    df.insert(0, "CustomerID", make_keys("CustomerID", range(1, NUM_CUSTOMERS + 1)))
+    df = categorize(df, "MasterCustomer")
+    write_table(df, "MasterCustomer")
     on_going_messages("[OK] Generated MasterCustomers.csv")
     return df
\ No newline at end of file
@@ -1,8 +1,9 @@
 import random
 import pandas as pd
 
+from src.generate_data.sinks import write_table
+from src.generate_sql_lite_db.schema import make_keys, categorize
 from src.utils.utils import on_going_messages
-from src.config import  OUTPUT_DIR
 
 #===============================
 # master material configuration
@@ -70,7 +71,6 @@ def generate_master_material():
         importance = random.choices(IMPORTANCE_LEVELS, weights=IMPORTANCE_WEIGHTS, k=1)[0]
         lt_cfg     = LEAD_TIME_CONFIG[importance]
         material = {
-            "MaterialID":   f"MAT{i:03d}",
             "MaterialName": f"Farmaco_{chr(64 + ((i-1)%26 + 1))}{i}",
             "Category":     random.choice(PRODUCT_FAMILY),
             "UnitOfMeasure":random.choice(UNITS),
@@ -84,6 +84,8 @@ def generate_master_material():
     df = pd.DataFrame(materials)
     df["UnitPrice"] = round(df["UnitCost"] * df["MarkUp"],2)
     df = df.drop("MarkUp", axis = 1)
-    df.to_csv(OUTPUT_DIR / "MasterMaterial.csv", index=False)
+    df.insert(0, "MaterialID", make_keys("MaterialID", range(1, NUM_MATERIALS + 1)))
+    df = categorize(df, "MasterMaterial")
+    write_table(df, "MasterMaterial")
     on_going_messages("[OK] Generated MasterMaterial.csv")
     return df
\ No newline at end of file
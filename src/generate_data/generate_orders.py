@@ -1,10 +1,13 @@
 import random
+import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
 
-from src.config import OUTPUT_DIR, START_DATE, MONTHS_HISTORY
-from src.utils.utils import on_going_messages
-from src.generate_data.generate_support_value import SEASONAL_FACTORS
+from src.config import START_DATE, MONTHS_HISTORY, ENGINE
+from src.generate_data.sinks import write_table
+from src.generate_sql_lite_db.schema import make_keys, key_array, render_keys
+from src.utils.utils import on_going_messages, numpy_rng
+from src.generate_data.generate_support_value import seasonal_factors, seasonal_vector
 
 #===============================
 # table orders configuration
@@ -49,7 +52,7 @@ def _generate_all_days(start_date, months):
     return days
 
 
-def generate_ordinato(materials_df, customers_df):
+def generate_ordinato(materials_df, customers_df, engine=ENGINE):
     """
     Genera il file Ordinato.csv con gli ordini giornalieri degli ultimi x mesi.
 
@@ -72,22 +75,42 @@ def generate_ordinato(materials_df, customers_df):
 
     Fields generated:
         OrderID         (str)   : Sequential unique identifier (format: ORDxxxxxx)
-        OrderDate       (str)   : Order date in YYYY-MM-DD format
-        RequestedDate   (str)   : Requested delivery date (7–60 days after OrderDate)
+        OrderDate       (date)  : Order date (datetime64; YYYY-MM-DD in the CSV)
+        RequestedDate   (date)  : Requested delivery date (7–60 days after OrderDate)
         MaterialID      (str)   : Reference to MasterMaterial
         CustomerID      (str)   : Reference to MasterCustomer
         QuantityOrdered (int)   : Units ordered by this customer on this day
         OrderValue      (float) : Revenue (QuantityOrdered * UnitCost * random markup MRK_MIN–MRK_MAX)
 
+    Two engines produce the same distributions (but not the same random stream):
+        "numpy"  : bulk draws over the material × day grid (see _ordinato_numpy)
+        "python" : original nested loops driven by the `random` module
+
     Args:
         materials_df: DataFrame dei materiali (deve contenere la colonna Importance)
         customers_df: DataFrame dei clienti
+        engine:       "numpy" or "python" (default: ENGINE from src/config.py)
 
     Returns:
         DataFrame con gli ordini
     """
     on_going_messages("Generating orders...")
 
+    if engine == "numpy":
+        df = _ordinato_numpy(materials_df, customers_df)
+    elif engine == "python":
+        df = _ordinato_python(materials_df, customers_df)
+    else:
+        raise ValueError(f"Unknown engine '{engine}' (expected 'numpy' or 'python')")
+
+    write_table(df, "Ordinato")
+    on_going_messages(f"[OK] Generated Orders.csv - {len(df)} orders")
+    print(f"[OK] Generati {len(df)} ordini")
+    return df
+
+
+def _ordinato_python(materials_df, customers_df):
+    """Reference engine: one Python dict per order line (material → day → customer loops)."""
     all_days = _generate_all_days(START_DATE, MONTHS_HISTORY)
     customer_ids = list(customers_df["CustomerID"])
 
@@ -107,7 +130,7 @@ def generate_ordinato(materials_df, customers_df):
                 continue
 
             growth_factor   = 1 + annual_growth * (day_idx / 365)
-            seasonal_factor = SEASONAL_FACTORS[str(date.month)][0]
+            seasonal_factor = seasonal_factors()[str(date.month)][0]
             random_factor   = random.uniform(0.8, 1.3)
 
             daily_qty = max(1, int(
@@ -123,9 +146,9 @@ def generate_ordinato(materials_df, customers_df):
 
                 requested_date = date + timedelta(days=random.randint(7, 60))
                 orders.append({
-                    "OrderID":         f"ORD{order_id:06d}",
-                    "OrderDate":       date.strftime("%Y-%m-%d"),
-                    "RequestedDate":   requested_date.strftime("%Y-%m-%d"),
+                    "OrderID":         order_id,
+                    "OrderDate":       date,
+                    "RequestedDate":   requested_date,
                     "MaterialID":      material_id,
                     "CustomerID":      customer_id,
                     "QuantityOrdered": customer_qty,
@@ -133,8 +156,96 @@ def generate_ordinato(materials_df, customers_df):
                 })
                 order_id += 1
 
-    df = pd.DataFrame(orders)
-    df.to_csv(OUTPUT_DIR / "Ordinato.csv", index=False)
-    on_going_messages(f"[OK] Generated Orders.csv - {len(df)} orders")
-    print(f"[OK] Generati {len(df)} ordini")
-    return df
+    return render_keys(pd.DataFrame(orders))
+
+
+def _sample_distinct(rng, n_items, k, k_max):
+    """
+    Draw up to k_max distinct indices in [0, n_items) for every row, vectorized.
+
+    Row i keeps only its first k[i] picks. Each new pick is drawn among the
+    remaining n_items - j values and shifted past the (sorted) previous picks,
+    which is equivalent to random.sample on every row.
+
+    Returns:
+        int array of shape (len(k), k_max); unused slots are -1
+    """
+    picks = np.full((len(k), k_max), -1, dtype=np.int64)
+    for j in range(k_max):
+        draw = rng.integers(0, n_items - j, size=len(k))
+        previous = np.sort(picks[:, :j], axis=1)
+        for c in range(j):
+            draw += draw >= previous[:, c]
+        picks[:, j] = draw
+    picks[np.arange(k_max) >= k[:, None]] = -1
+    return picks
+
+
+def _ordinato_numpy(materials_df, customers_df, rng=None, first_id=1):
+    """
+    Vectorized engine: every random quantity is drawn as a numpy array.
+
+    Steps:
+        1. Bernoulli(daily_prob) over the whole material × day grid → order "hits"
+        2. per hit: base qty, noise, growth and seasonal factor → daily_qty
+        3. per hit: num_customers and distinct customer picks (_sample_distinct)
+        4. hits are expanded to one row per customer; per-line qty, requested-date
+           offset and markup are drawn in bulk and the frame is built column-wise
+
+    Rows keep the reference ordering (material, then day, then customer).
+
+    A caller generating in chunks passes its own `rng` and the next free
+    order number as `first_id`, so the random stream and OrderID sequence
+    continue across chunks.
+    """
+    if rng is None:
+        rng = numpy_rng()
+
+    all_days = np.array(_generate_all_days(START_DATE, MONTHS_HISTORY), dtype="datetime64[D]")
+    seasonal = seasonal_vector()[all_days.astype("datetime64[M]").astype(int) % 12]
+
+    # Key lookup tables: every ID is gathered by index (see key_array)
+    customer_ids = key_array(customers_df["CustomerID"])
+    material_ids = key_array(materials_df["MaterialID"])
+    unit_cost    = materials_df["UnitCost"].to_numpy(dtype=float)
+    importance   = materials_df["Importance"].to_numpy()
+
+    cfg = {key: np.array([IMP_CONFIG[imp][key] for imp in importance])
+           for key in ("qty_min", "qty_max", "daily_prob", "cust_max")}
+    annual_growth = rng.uniform(GRW_MIN, GRW_MAX, size=len(material_ids))
+
+    # 1. Bernoulli draw per material × day (same skip rule as the loop engine)
+    hits = rng.random((len(material_ids), len(all_days))) <= cfg["daily_prob"][:, None]
+    mat_idx, day_idx = np.nonzero(hits)
+
+    # 2. Daily quantity per hit
+    growth_factor = 1 + annual_growth[mat_idx] * (day_idx / 365)
+    random_factor = rng.uniform(0.8, 1.3, size=len(mat_idx))
+    base_qty      = rng.integers(cfg["qty_min"][mat_idx], cfg["qty_max"][mat_idx] + 1)
+    daily_qty     = np.maximum(1, (base_qty * growth_factor * seasonal[day_idx] * random_factor).astype(np.int64))
+
+    # 3. Customers per hit
+    num_customers = rng.integers(1, cfg["cust_max"][mat_idx] + 1)
+    k_max = min(int(cfg["cust_max"].max(initial=0)), len(customer_ids))
+    picks = _sample_distinct(rng, len(customer_ids), np.minimum(num_customers, len(customer_ids)), k_max)
+
+    # 4. Expand to one line per (hit, customer)
+    line_hit, line_slot = np.nonzero(picks >= 0)
+    n_lines = len(line_hit)
+
+    customer_qty = np.maximum(1, (daily_qty[line_hit] / num_customers[line_hit]
+                                  * rng.uniform(0.7, 1.3, size=n_lines)).astype(np.int64))
+    line_day     = day_idx[line_hit]
+    line_mat     = mat_idx[line_hit]
+    requested    = all_days[line_day] + rng.integers(7, 61, size=n_lines)
+    order_value  = np.round(customer_qty * unit_cost[line_mat] * rng.uniform(MRK_MIN, MRK_MAX, size=n_lines), 2)
+
+    return pd.DataFrame({
+        "OrderID":         make_keys("OrderID", np.arange(first_id, first_id + n_lines)),
+        "OrderDate":       all_days[line_day],
+        "RequestedDate":   requested,
+        "MaterialID":      material_ids.take(line_mat),
+        "CustomerID":      customer_ids.take(picks[line_hit, line_slot]),
+        "QuantityOrdered": customer_qty,
+        "OrderValue":      order_value,
+    })
@@ -1,9 +1,12 @@
 import random
+import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta
+from datetime import timedelta
 
-from src.config import OUTPUT_DIR
-from src.utils.utils import on_going_messages
+from src.config import ENGINE
+from src.generate_data.sinks import write_table
+from src.generate_sql_lite_db.schema import make_keys, render_keys
+from src.utils.utils import on_going_messages, numpy_rng
 
 #===============================
 # table sales configuration
@@ -26,7 +29,7 @@ SHIP_EARLY_MAX = 5
 SHIP_LATE_MAX  = 10
 
 
-def generate_sales(orders_df):
+def generate_sales(orders_df, engine=ENGINE):
     """
     Genera il file Venduto.csv a partire dagli ordini (Ordinato.csv).
 
@@ -39,22 +42,42 @@ def generate_sales(orders_df):
     Fields generated:
         SaleID          (str)   : Sequential unique identifier (format: SALExxxxxx)
         OrderID         (str)   : Reference to the originating order in Ordinato.csv
-        OrderDate       (str)   : Order creation date (copied from the order)
-        ShipmentDate    (str)   : Actual shipment date (RequestedDate ± a few days)
+        OrderDate       (date)  : Order creation date (copied from the order)
+        ShipmentDate    (date)  : Actual shipment date (RequestedDate ± a few days)
         MaterialID      (str)   : Same as in the order
         CustomerID      (str)   : Same as in the order
         QuantityOrdered (int)   : Original quantity from the order (reference)
         QuantitySold    (int)   : Actual quantity delivered (≤ QuantityOrdered)
         SaleValue       (float) : Revenue (OrderValue scaled by QuantitySold / QuantityOrdered)
 
+    Two engines produce the same distributions (but not the same random stream):
+        "numpy"  : column-wise derivation over the whole orders frame (see _sales_numpy)
+        "python" : original per-order loop driven by the `random` module
+
     Args:
         orders_df: DataFrame degli ordini (deve contenere le colonne di Ordinato.csv)
+        engine:    "numpy" or "python" (default: ENGINE from src/config.py)
 
     Returns:
         DataFrame con le vendite
     """
     on_going_messages("Generating sales...")
 
+    if engine == "numpy":
+        df = _sales_numpy(orders_df)
+    elif engine == "python":
+        df = _sales_python(orders_df)
+    else:
+        raise ValueError(f"Unknown engine '{engine}' (expected 'numpy' or 'python')")
+
+    write_table(df, "Venduto")
+    on_going_messages(f"[OK] Generated Venduto.csv - {len(df)} sales")
+    print(f"[OK] Generate {len(df)} vendite")
+    return df
+
+
+def _sales_python(orders_df):
+    """Reference engine: one Python dict per fulfilled order (iterrows)."""
     sales   = []
     sale_id = 1
 
@@ -79,7 +102,7 @@ def generate_sales(orders_df):
         sale_value = round(unit_value * qty_sold, 2)
 
         # ShipmentDate: actual delivery around RequestedDate
-        requested_date = datetime.strptime(order["RequestedDate"], "%Y-%m-%d")
+        requested_date = order["RequestedDate"]
         if random.random() < ON_TIME_RATE:
             offset_days = random.randint(-SHIP_EARLY_MAX, 0)   # early or on time
         else:
@@ -87,10 +110,10 @@ def generate_sales(orders_df):
         shipment_date  = requested_date + timedelta(days=offset_days)
 
         sales.append({
-            "SaleID":          f"SALE{sale_id:06d}",
+            "SaleID":          sale_id,
             "OrderID":         order["OrderID"],
             "OrderDate":       order["OrderDate"],
-            "ShipmentDate":    shipment_date.strftime("%Y-%m-%d"),
+            "ShipmentDate":    shipment_date,
             "MaterialID":      order["MaterialID"],
             "CustomerID":      order["CustomerID"],
             "QuantityOrdered": qty_ordered,
@@ -99,8 +122,56 @@ def generate_sales(orders_df):
         })
         sale_id += 1
 
-    df = pd.DataFrame(sales)
-    df.to_csv(OUTPUT_DIR / "Venduto.csv", index=False)
-    on_going_messages(f"[OK] Generated Venduto.csv - {len(df)} sales")
-    print(f"[OK] Generate {len(df)} vendite")
-    return df
+    return render_keys(pd.DataFrame(sales))
+
+
+def _sales_numpy(orders_df, rng=None, first_id=1):
+    """
+    Vectorized engine: fulfillment, partial quantity, shipment offset and value
+    are drawn as arrays over the whole orders frame.
+
+    Steps:
+        1. Bernoulli(FULFILLMENT_RATE) per order → fulfilled subset
+        2. Bernoulli(PARTIAL_RATE) → QuantitySold = max(1, int(qty × ratio)) or qty
+        3. Bernoulli(ON_TIME_RATE) → offset in [-SHIP_EARLY_MAX, 0] or [1, SHIP_LATE_MAX]
+        4. ShipmentDate = RequestedDate (as datetime64[D]) + offset
+
+    Rows keep the order of orders_df; SaleIDs start at `first_id`.
+    """
+    if rng is None:
+        rng = numpy_rng()
+
+    # 1. Fulfilled orders (same skip rule as the loop engine)
+    fulfilled = rng.random(len(orders_df)) <= FULFILLMENT_RATE
+    orders    = orders_df[fulfilled]
+    n_sales   = len(orders)
+
+    # 2. Quantity sold: partial deliveries between MIN_PARTIAL_RATIO and 99 %
+    qty_ordered   = orders["QuantityOrdered"].to_numpy()
+    partial       = rng.random(n_sales) < PARTIAL_RATE
+    partial_ratio = rng.uniform(MIN_PARTIAL_RATIO, 0.99, size=n_sales)
+    qty_sold      = np.where(partial,
+                             np.maximum(1, (qty_ordered * partial_ratio).astype(np.int64)),
+                             qty_ordered)
+
+    # SaleValue proportional to OrderValue (same unit price)
+    sale_value = np.round(orders["OrderValue"].to_numpy() / qty_ordered * qty_sold, 2)
+
+    # 3-4. ShipmentDate around RequestedDate
+    on_time     = rng.random(n_sales) < ON_TIME_RATE
+    offset_days = np.where(on_time,
+                           rng.integers(-SHIP_EARLY_MAX, 1, size=n_sales),
+                           rng.integers(1, SHIP_LATE_MAX + 1, size=n_sales))
+    shipment_date = orders["RequestedDate"].to_numpy().astype("datetime64[D]") + offset_days
+
+    return pd.DataFrame({
+        "SaleID":          make_keys("SaleID", np.arange(first_id, first_id + n_sales)),
+        "OrderID":         orders["OrderID"].to_numpy(),
+        "OrderDate":       orders["OrderDate"].to_numpy(),
+        "ShipmentDate":    shipment_date,
+        "MaterialID":      orders["MaterialID"].to_numpy(),
+        "CustomerID":      orders["CustomerID"].to_numpy(),
+        "QuantityOrdered": qty_ordered,
+        "QuantitySold":    qty_sold,
+        "SaleValue":       sale_value,
+    })
@@ -0,0 +1,169 @@
+import numpy as np
+import pandas as pd
+
+from src.generate_data.sinks import write_table
+from src.generate_sql_lite_db.schema import render_keys
+from src.utils.utils import on_going_messages
+
+#===============================
+# sales aggregates configuration
+#===============================
+# Venduto columns summed at every grain (Shipments counts the Venduto rows of the group)
+SALES_MEASURES = ["QuantitySold", "SaleValue"]
+
+
+def _aggregate(df, keys):
+    """Sum SALES_MEASURES (and count the rows as Shipments) by keys, sorted by keys."""
+    sums = {col: (col, "sum") for col in SALES_MEASURES}
+    return (
+        df.groupby(keys, sort=True)
+        .agg(**sums, Shipments=("QuantitySold", "size"))
+        .reset_index()
+    )
+
+
+def _order_by_key(df, column):
+    """
+    Rows of df (sorted by column, then month) in the order of the string IDs
+    (MAT1000 < MAT101), also when column holds surrogate keys: the written
+    tables are the same with and without SURROGATE_KEYS.
+    """
+    order = np.argsort(render_keys(df[[column]])[column].to_numpy(), kind="stable")
+    return df.iloc[order].reset_index(drop=True)
+
+
+def _sales_daily(sales_df):
+    """
+    Venduto aggregated by MaterialID × ShipmentDate (datetime64, as in Venduto).
+
+    Returns:
+        DataFrame with columns MaterialID, ShipmentDate, QuantitySold, SaleValue, Shipments
+        (sorted by MaterialID, ShipmentDate)
+    """
+    df = pd.DataFrame({
+        "MaterialID":   sales_df["MaterialID"].to_numpy(),
+        "ShipmentDate": sales_df["ShipmentDate"].to_numpy(),
+        **{col: sales_df[col].to_numpy() for col in SALES_MEASURES},
+    })
+    return _aggregate(df, ["MaterialID", "ShipmentDate"])
+
+
+def _sales_monthly(daily_df):
+    """
+    Daily aggregate rolled up to MaterialID × month (SalesMonth: first day of the month).
+
+    Returns:
+        DataFrame with the VendutoMensile columns (sorted by MaterialID, SalesMonth)
+    """
+    df = pd.DataFrame({
+        "MaterialID": daily_df["MaterialID"].to_numpy(),
+        "month":      daily_df["ShipmentDate"].to_numpy().astype("datetime64[M]"),
+        **{col: daily_df[col].to_numpy() for col in [*SALES_MEASURES, "Shipments"]},
+    })
+    df = df.groupby(["MaterialID", "month"], sort=True).sum().reset_index()
+    df.insert(0, "SalesMonth", df.pop("month"))
+    return _order_by_key(df, "MaterialID")
+
+
+def _sales_customer_monthly(sales_df):
+    """
+    Venduto aggregated by CustomerID × month (SalesMonth: first day of the month).
+
+    Returns:
+        DataFrame with the VendutoMensileCliente columns (sorted by CustomerID, SalesMonth)
+    """
+    df = pd.DataFrame({
+        "CustomerID": sales_df["CustomerID"].to_numpy(),
+        "month":      sales_df["ShipmentDate"].to_numpy().astype("datetime64[M]"),
+        **{col: sales_df[col].to_numpy() for col in SALES_MEASURES},
+    })
+    df = _aggregate(df, ["CustomerID", "month"])
+    df.insert(0, "SalesMonth", df.pop("month"))
+    return _order_by_key(df, "CustomerID")
+
+
+def _combine_customer_monthly(partials):
+    """
+    Merge the customer × month aggregates of several chunks of Venduto
+    (streaming: a customer buys materials of every chunk).
+    """
+    df = pd.concat(partials, ignore_index=True)
+    df = (
+        df.groupby(["CustomerID", "SalesMonth"], sort=True)[[*SALES_MEASURES, "Shipments"]]
+        .sum()
+        .reset_index()
+    )
+    return _order_by_key(df[["SalesMonth", "CustomerID", *SALES_MEASURES, "Shipments"]], "CustomerID")
+
+
+def generate_sales_daily(sales_df):
+    """
+    Aggrega il venduto per MaterialID × giorno di spedizione.
+
+    È il livello più fine dello strato di aggregati: Inventario ne legge le
+    uscite giornaliere e VendutoMensile ne deriva i totali mensili, per cui
+    Venduto viene percorso una sola volta. Resta un dato intermedio della
+    pipeline (cache degli stage): non viene scritto dai sink.
+
+    Args:
+        sales_df: DataFrame Venduto (colonne: MaterialID, ShipmentDate, QuantitySold, SaleValue)
+
+    Returns:
+        DataFrame MaterialID, ShipmentDate (datetime64), QuantitySold, SaleValue, Shipments
+    """
+    on_going_messages("Aggregating daily sales per material...")
+    df = _sales_daily(sales_df)
+    on_going_messages(f"[OK] Aggregated daily sales - {len(df)} rows")
+    return df
+
+
+def generate_sales_monthly(daily_df):
+    """
+    Genera VendutoMensile.csv: venduto mensile per materiale.
+
+    Derivato dall'aggregato giornaliero; è la base di Budget (media mensile per
+    materiale) e Forecast (quantità effettive per mese) e delle analisi sul
+    venduto mensile (es. forecast accuracy, vw_SalesVsBudget).
+
+    Fields generated:
+        SalesMonth   (date)  : Mese di spedizione (primo giorno; YYYY-MM nel CSV)
+        MaterialID   (str)   : Reference to MasterMaterial
+        QuantitySold (int)   : Quantità spedita nel mese
+        SaleValue    (float) : Valore venduto nel mese
+        Shipments    (int)   : Righe di Venduto nel mese
+
+    Args:
+        daily_df: aggregato giornaliero (generate_sales_daily)
+
+    Returns:
+        DataFrame con il venduto mensile per materiale
+    """
+    on_going_messages("Generating monthly sales per material...")
+    df = _sales_monthly(daily_df)
+    write_table(df, "VendutoMensile")
+    on_going_messages(f"[OK] Generated VendutoMensile.csv - {len(df)} rows")
+    return df
+
+
+def generate_sales_customer_monthly(sales_df):
+    """
+    Genera VendutoMensileCliente.csv: venduto mensile per cliente.
+
+    Fields generated:
+        SalesMonth   (date)  : Mese di spedizione (primo giorno; YYYY-MM nel CSV)
+        CustomerID   (str)   : Reference to MasterCustomer
+        QuantitySold (int)   : Quantità spedita nel mese
+        SaleValue    (float) : Valore venduto nel mese
+        Shipments    (int)   : Righe di Venduto nel mese
+
+    Args:
+        sales_df: DataFrame Venduto (colonne: CustomerID, ShipmentDate, QuantitySold, SaleValue)
+
+    Returns:
+        DataFrame con il venduto mensile per cliente
+    """
+    on_going_messages("Generating monthly sales per customer...")
+    df = _sales_customer_monthly(sales_df)
+    write_table(df, "VendutoMensileCliente")
+    on_going_messages(f"[OK] Generated VendutoMensileCliente.csv - {len(df)} rows")
+    return df
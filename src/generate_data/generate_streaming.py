@@ -0,0 +1,236 @@
+import random
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from pandas.api.types import is_integer_dtype
+
+import src.config as config
+from src.generate_data.sinks import write_table
+from src.generate_sql_lite_db.schema import TABLE_SCHEMA, KEY_FORMATS, make_keys
+from src.utils.utils import on_going_messages, chunk_rng
+from src.utils.run_report import span
+from src.generate_data import generate_orders, generate_sales, generate_budget, generate_inventory, generate_forecast
+from src.generate_data.generate_orders import _ordinato_numpy
+from src.generate_data.generate_sales import _sales_numpy
+from src.generate_data.generate_budget import _budget_months, _avg_per_material, _budget_numpy
+from src.generate_data.generate_inventory import _inventory_numpy, _log_stockouts
+from src.generate_data.generate_forecast import _forecast_numpy
+from src.generate_data.generate_sales_aggregates import (_sales_daily, _sales_monthly, _sales_customer_monthly,
+                                                         _combine_customer_monthly)
+
+#===============================
+# streaming configuration
+#===============================
+# Number of materials generated per chunk. Peak memory grows with this value,
+# not with the total number of materials. The chunk is also the unit of work
+# (and of random stream) in multi-process mode: the output depends on the seed
+# and on STREAM_CHUNK_MATERIALS, never on the number of workers.
+STREAM_CHUNK_MATERIALS = 250
+
+# Number of worker processes (1 = everything runs in the calling process)
+STREAM_WORKERS = 1
+
+# Primary key column per streamed table (prefix and width: KEY_FORMATS in schema.py;
+# None = no ID to renumber)
+STREAM_TABLES = {
+    "Ordinato":       "OrderID",
+    "Venduto":        "SaleID",
+    "VendutoMensile": None,
+    "Budget":         "BudgetID",
+    "Inventario":     "InventoryID",
+    "Forecast":       "ForecastID",
+}
+
+# src/config.py values a worker process must see (they may have been overridden from the CLI)
+_WORKER_SETTINGS = ("START_DATE", "MONTHS_HISTORY", "MONTHS_FORECAST", "SURROGATE_KEYS")
+
+# Per-process state set by _init_worker: customers_df and the budget months
+_worker_state = {}
+
+
+def _init_worker(settings, customers_df):
+    """
+    Prepare a process for _generate_chunk.
+
+    The generator modules bind START_DATE, MONTHS_HISTORY, ... at import time;
+    with the "spawn" start method (Windows) a worker re-imports them with the
+    defaults, so the caller's values are pushed into every module that uses them.
+    """
+    for module in (config, generate_orders, generate_sales, generate_budget, generate_inventory, generate_forecast):
+        for name, value in settings.items():
+            if hasattr(module, name):
+                setattr(module, name, value)
+
+    _worker_state["customers_df"] = customers_df
+    _worker_state["proj_dates"]   = _budget_months()
+
+
+def _generate_chunk(task):
+    """
+    Generate every fact table for one chunk of materials.
+
+    IDs are local to the chunk (they start at 1); the caller renumbers them
+    once the sizes of the previous chunks are known (see _renumber).
+
+    Args:
+        task: (chunk_idx, materials chunk DataFrame, master_seed)
+
+    Returns:
+        (chunk_idx, {table_name: DataFrame}, {MaterialID: stockout_days},
+         VendutoMensileCliente of the chunk's sales)
+    """
+    chunk_idx, materials, master_seed = task
+    rng = chunk_rng(master_seed, chunk_idx)
+
+    with span(f"chunk {chunk_idx}", "chunk", materials=len(materials)) as record:
+        orders = _ordinato_numpy(materials, _worker_state["customers_df"], rng=rng)
+        sales  = _sales_numpy(orders, rng=rng)
+        daily  = _sales_daily(sales)
+        monthly = _sales_monthly(daily)
+        budget = _budget_numpy(_avg_per_material(monthly), _worker_state["proj_dates"], rng=rng)
+        inventory, stockouts = _inventory_numpy(materials, daily)
+        forecast = _forecast_numpy(monthly, materials, rng=rng)
+
+        tables = {
+            "Ordinato":       orders,
+            "Venduto":        sales,
+            "VendutoMensile": monthly,
+            "Budget":         budget,
+            "Inventario":     inventory,
+            "Forecast":       forecast,
+        }
+        customers = _sales_customer_monthly(sales)
+        record["rows"] = sum(len(df) for df in tables.values())
+    return chunk_idx, tables, stockouts, customers
+
+
+def _renumber(tables, next_id):
+    """
+    Shift the chunk-local IDs of every table so they continue the global sequence.
+
+    next_id holds the first free number per table. Venduto.OrderID is shifted by
+    the same offset as Ordinato.OrderID so sales keep pointing at their order.
+    """
+    order_offset = next_id["Ordinato"] - 1
+    for table, df in tables.items():
+        column = STREAM_TABLES[table]
+        if column is None or next_id[table] == 1:
+            continue
+        df[column] = make_keys(column, np.arange(next_id[table], next_id[table] + len(df)))
+
+    if order_offset:
+        order_ids = tables["Venduto"]["OrderID"]
+        if is_integer_dtype(order_ids.dtype):
+            local = order_ids.to_numpy(dtype=np.int64)
+        else:
+            prefix = KEY_FORMATS["OrderID"][0]
+            local  = order_ids.str.slice(len(prefix)).astype(np.int64).to_numpy()
+        tables["Venduto"]["OrderID"] = make_keys("OrderID", local + order_offset)
+
+
+def _run_chunks(tasks, settings, customers_df, workers):
+    """
+    Yield _generate_chunk results in chunk order.
+
+    With workers > 1 the chunks run in a process pool; at most 2 × workers chunks
+    are in flight so finished-but-unwritten results cannot pile up in memory.
+    """
+    if workers <= 1:
+        _init_worker(settings, customers_df)
+        for task in tasks:
+            yield _generate_chunk(task)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers,
+                             initializer=_init_worker,
+                             initargs=(settings, customers_df)) as pool:
+        pending = deque()
+        for task in tasks:
+            pending.append(pool.submit(_generate_chunk, task))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def generate_streaming(materials_df, customers_df, chunk_size=STREAM_CHUNK_MATERIALS, workers=STREAM_WORKERS):
+    """
+    Genera Ordinato, Venduto (con i suoi aggregati), Budget, Inventario e Forecast a blocchi di materiali.
+
+    Tutti gli ordini (e quindi le vendite) di un materiale cadono nello stesso
+    blocco, per cui ogni stage a valle lavora solo sui dati del blocco:
+
+        orders chunk → sales chunk → aggregati → budget / inventory / forecast del blocco
+
+    Ogni blocco viene accodato agli output (write_table) appena prodotto e poi rilasciato: nessuna
+    tabella fatti è mai interamente in memoria, quindi il picco di RSS dipende da
+    chunk_size e non dal volume totale.
+
+    Con workers > 1 i blocchi sono generati in parallelo da un pool di processi.
+    Ogni blocco ha il proprio stream casuale, derivato dal seed globale e
+    dall'indice del blocco (chunk_rng), e gli ID vengono assegnati dal processo
+    principale nell'ordine dei blocchi: l'output è identico bit per bit
+    qualunque sia il numero di worker (a parità di seed e chunk_size).
+
+    VendutoMensile è per materiale e viene scritto blocco per blocco;
+    VendutoMensileCliente attraversa i blocchi (un cliente compra materiali di
+    tutti i blocchi): gli aggregati parziali dei blocchi vengono sommati dal
+    processo principale e la tabella è scritta alla fine. La sua dimensione
+    dipende da clienti × mesi, non dal numero di righe di Venduto.
+
+    Differenze rispetto alla pipeline in-memory:
+        - usa sempre l'engine numpy
+        - le righe di Budget seguono l'ordine di materials_df
+
+    Args:
+        materials_df: DataFrame MasterMaterial
+        customers_df: DataFrame MasterCustomer
+        chunk_size:   numero di materiali per blocco (default: STREAM_CHUNK_MATERIALS)
+        workers:      numero di processi (default: STREAM_WORKERS)
+
+    Returns:
+        dict {table_name: rows written}
+    """
+    on_going_messages(f"Generating facts in streaming mode "
+                      f"({chunk_size} materials per chunk, {workers} worker(s))...")
+
+    master_seed  = random.getrandbits(64)
+    settings     = {name: getattr(config, name) for name in _WORKER_SETTINGS}
+    next_id      = {table: 1 for table in STREAM_TABLES}
+    stockout_log = {}
+    customer_parts, customer_rows = [], 0
+
+    starts   = range(0, max(len(materials_df), 1), chunk_size)
+    n_chunks = len(starts)
+    tasks    = ((idx, materials_df.iloc[start:start + chunk_size], master_seed)
+                for idx, start in enumerate(starts))
+
+    for chunk_idx, tables, stockouts, customers in _run_chunks(tasks, settings, customers_df, workers):
+        _renumber(tables, next_id)
+        for table, df in tables.items():
+            write_table(df, table, part=chunk_idx)
+            next_id[table] += len(df)
+        stockout_log.update(stockouts)
+
+        # Customer aggregate: partials are summed once they outnumber the running total
+        customer_parts.append(customers)
+        customer_rows += len(customers)
+        if customer_rows > 2 * len(customer_parts[0]):
+            customer_parts = [_combine_customer_monthly(customer_parts)]
+            customer_rows  = len(customer_parts[0])
+
+        on_going_messages(f"[..] Chunk {chunk_idx + 1}/{n_chunks} - "
+                          f"{len(tables['Ordinato']):,} orders, {len(tables['Inventario']):,} inventory rows")
+        del tables
+
+    _log_stockouts(stockout_log)
+
+    customer_monthly = _combine_customer_monthly(customer_parts)
+    write_table(customer_monthly, "VendutoMensileCliente")
+
+    rows = {table: next_id[table] - 1 for table in STREAM_TABLES}
+    rows["VendutoMensileCliente"] = len(customer_monthly)
+    for table, n in rows.items():
+        on_going_messages(f"[OK] Generated {TABLE_SCHEMA[table]['csv']} - {n} rows")
+    return rows
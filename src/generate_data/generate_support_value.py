@@ -1,7 +1,24 @@
 import json
+from functools import lru_cache
+
+import numpy as np
 
 from src.config import SEASONAL_PATTERN_PATH
 
-# Seasonal factors by month (1-12), loaded once at import time
-with open(SEASONAL_PATTERN_PATH, "r") as _f:
-    SEASONAL_FACTORS = json.load(_f)
+
+@lru_cache(maxsize=None)
+def seasonal_factors():
+    """
+    Seasonal factors by month ("1"-"12" → [factor]), read from SEASONAL_PATTERN_PATH.
+
+    The JSON is parsed on first use and then cached, so importing a generator
+    module does not touch the file system.
+    """
+    with open(SEASONAL_PATTERN_PATH, "r") as f:
+        return json.load(f)
+
+
+def seasonal_vector():
+    """Return the seasonal factors as a numpy array indexed by month - 1 (0 = January)."""
+    factors = seasonal_factors()
+    return np.array([factors[str(m)][0] for m in range(1, 13)], dtype=float)
@@ -0,0 +1,339 @@
+"""
+src/generate_data/pipeline.py
+-----------------------------
+Runner a DAG degli stage di generazione, con cache basata sul contenuto.
+
+Ogni stage dichiara modulo, funzione e stage a monte (gli argomenti posizionali
+della funzione). L'impronta di uno stage comprende:
+
+  - le costanti di configurazione del modulo (nomi MAIUSCOLI, es. INV_CONFIG)
+    e le impostazioni di generazione di src/config.py (PIPELINE_SETTINGS)
+  - il sorgente del modulo e dei moduli condivisi (PIPELINE_SHARED_MODULES)
+  - il contenuto dei file di dati condivisi (PIPELINE_SHARED_FILES)
+  - il seed
+  - l'hash del contenuto degli output a monte
+
+Se l'impronta coincide con quella salvata e i file di output sono ancora quelli
+scritti dallo stage, lo stage viene saltato e il suo output riletto dalla cache.
+Gli stage indipendenti (gli aggregati di Venduto, poi Budget, Inventario e
+Forecast) girano in parallelo in un pool di processi. Gli stage a valle di
+Venduto leggono i suoi aggregati (generate_sales_aggregates.py) e non la
+tabella completa.
+
+Ogni stage ha un proprio seed, derivato dal seed globale e dal nome dello stage:
+l'output non dipende né dall'ordine di esecuzione né da quali stage vengono
+saltati.
+
+Utilizzo:
+  from src.generate_data.pipeline import run_pipeline
+  frames = run_pipeline(seed=42, load_db=True)
+"""
+
+import hashlib
+import importlib
+import importlib.util
+import json
+import os
+import random
+import time
+from pathlib import Path
+from concurrent.futures import Future, ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import pandas as pd
+
+import src.config as config
+from src.utils.utils import on_going_messages
+from src.utils.run_report import span, event
+from src.generate_sql_lite_db.schema import TABLE_SCHEMA
+
+#===============================
+# pipeline configuration
+#===============================
+# Stage name (= table produced) → generator module, function and upstream
+# stages, passed to the function as positional arguments in this order.
+# Stages that are not in TABLE_SCHEMA (VendutoGiornaliero) produce
+# intermediate frames: kept in the stage cache, never written by the sinks.
+PIPELINE_STAGES = {
+    "MasterMaterial":        {"module": "src.generate_data.generate_master_material",  "function": "generate_master_material",
+                              "inputs": []},
+    "MasterCustomer":        {"module": "src.generate_data.generate_master_customer",  "function": "generate_master_customer",
+                              "inputs": []},
+    "Ordinato":              {"module": "src.generate_data.generate_orders",           "function": "generate_ordinato",
+                              "inputs": ["MasterMaterial", "MasterCustomer"]},
+    "Venduto":               {"module": "src.generate_data.generate_sales",            "function": "generate_sales",
+                              "inputs": ["Ordinato"]},
+    "VendutoGiornaliero":    {"module": "src.generate_data.generate_sales_aggregates", "function": "generate_sales_daily",
+                              "inputs": ["Venduto"]},
+    "VendutoMensile":        {"module": "src.generate_data.generate_sales_aggregates", "function": "generate_sales_monthly",
+                              "inputs": ["VendutoGiornaliero"]},
+    "VendutoMensileCliente": {"module": "src.generate_data.generate_sales_aggregates", "function": "generate_sales_customer_monthly",
+                              "inputs": ["Venduto"]},
+    "Budget":                {"module": "src.generate_data.generate_budget",           "function": "generate_budget",
+                              "inputs": ["VendutoMensile"]},
+    "Inventario":            {"module": "src.generate_data.generate_inventory",        "function": "generate_inventory",
+                              "inputs": ["MasterMaterial", "VendutoGiornaliero"]},
+    "Forecast":              {"module": "src.generate_data.generate_forecast",         "function": "generate_forecast",
+                              "inputs": ["VendutoMensile", "MasterMaterial"]},
+}
+
+# Modules used by every stage: a change to their source invalidates the whole cache
+PIPELINE_SHARED_MODULES = [
+    "src.utils.utils",
+    "src.generate_data.generate_support_value",
+    "src.generate_data.sinks",
+    "src.generate_sql_lite_db.schema",
+]
+
+# src/config.py settings that change what the stages generate: only these are
+# part of the stage fingerprints (ANALYTICS_*, DB_PATH, ... never invalidate a
+# stage). The output paths are covered by the sink signature and the cache dir
+PIPELINE_SETTINGS = [
+    "START_DATE",
+    "MONTHS_HISTORY",
+    "MONTHS_FORECAST",
+    "ENGINE",
+    "SURROGATE_KEYS",
+    "OUTPUT_FORMATS",
+]
+
+# src/config.py paths of the data files read by the stages (seasonal pattern,
+# region table): their content is part of every stage fingerprint
+PIPELINE_SHARED_FILES = ["SEASONAL_PATTERN_PATH", "REGIONS_CACHE_PATH"]
+
+# Modules whose source is part of the SQLite load fingerprint
+PIPELINE_DB_MODULES = [
+    "src.generate_sql_lite_db.load_to_db",
+    "src.generate_sql_lite_db.schema",
+]
+
+# Maximum number of stages running at the same time (1 = sequential, in process)
+PIPELINE_JOBS = min(3, os.cpu_count() or 1)
+
+# Cache directory (inside OUTPUT_DIR): one pickle per stage + manifest.json
+PIPELINE_CACHE_DIR = ".pipeline_cache"
+
+# Manifest key of the SQLite load step
+DB_STEP = "SQLite"
+
+
+def _constants(module) -> dict:
+    """Module-level UPPERCASE names: the configuration constants of a module."""
+    return {name: value for name, value in vars(module).items() if name.isupper()}
+
+
+def _file_hash(path) -> str:
+    """Hash of a file's content (None if the file does not exist)."""
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        return hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+
+
+def _source_hash(module_name: str) -> str:
+    """Hash of a module's source file (without importing it)."""
+    return _file_hash(importlib.util.find_spec(module_name).origin)
+
+
+def _digest(*parts) -> str:
+    """Stable hash of JSON-able parts; other values (datetime, Path, ...) are hashed through repr."""
+    payload = json.dumps(parts, sort_keys=True, default=repr)
+    return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+
+def _output_hash(df: pd.DataFrame) -> str:
+    """Content hash of a stage output (values, column names and order)."""
+    h = hashlib.blake2b(json.dumps(list(df.columns)).encode(), digest_size=16)
+    h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+def _sink_signature(paths) -> list:
+    """(path, size, mtime) of the given output paths: detects files rewritten outside the pipeline."""
+    signature = []
+    for path in paths:
+        stat = path.stat() if path.exists() else None
+        signature.append([str(path), stat.st_size if stat else None, stat.st_mtime_ns if stat else None])
+    return signature
+
+
+def _stage_sinks(stage: str) -> list:
+    """Files / directories written by a stage according to OUTPUT_FORMATS."""
+    if stage not in TABLE_SCHEMA:
+        return []
+    paths = []
+    if "csv" in config.OUTPUT_FORMATS:
+        paths.append(config.OUTPUT_DIR / TABLE_SCHEMA[stage]["csv"])
+    if "parquet" in config.OUTPUT_FORMATS:
+        paths.append(config.PARQUET_DIR / stage)
+    return paths
+
+
+def _settings() -> dict:
+    """Current src/config.py values (they may have been overridden from the CLI)."""
+    return _constants(config)
+
+
+def _with_upstream(stages) -> list:
+    """stages plus everything they depend on, in PIPELINE_STAGES (topological) order."""
+    needed, todo = set(), list(stages)
+    while todo:
+        stage = todo.pop()
+        if stage not in needed:
+            needed.add(stage)
+            todo.extend(PIPELINE_STAGES[stage]["inputs"])
+    return [stage for stage in PIPELINE_STAGES if stage in needed]
+
+
+def _run_stage(stage, settings, params, seed, inputs):
+    """
+    Run one stage and return its DataFrame (also executed in worker processes).
+
+    The src/config.py values are applied before the generator module is
+    imported (it binds them with `from src.config import ...`), then the
+    module constants captured by the parent (e.g. NUM_MATERIALS set from the
+    CLI) are pushed into the module. inputs holds DataFrames, or cache paths
+    to read them from when running in a worker.
+    """
+    for name, value in settings.items():
+        setattr(config, name, value)
+
+    definition = PIPELINE_STAGES[stage]
+    module = importlib.import_module(definition["module"])
+    for name, value in params.items():
+        setattr(module, name, value)
+
+    inputs = [pd.read_pickle(i) if isinstance(i, Path) else i for i in inputs]
+    random.seed(f"{seed}:{stage}")
+    with span(stage, "stage", engine=config.ENGINE) as record:
+        df = getattr(module, definition["function"])(*inputs)
+        record["rows"] = len(df)
+    return df
+
+
+def _run_inline(stage, settings, params, seed, inputs) -> Future:
+    """Run a stage in the current process, keeping the caller's `random` state untouched."""
+    future = Future()
+    state  = random.getstate()
+    try:
+        future.set_result(_run_stage(stage, settings, params, seed, inputs))
+    except Exception as exc:
+        future.set_exception(exc)
+    finally:
+        random.setstate(state)
+    return future
+
+
+def run_pipeline(targets=None, seed=0, jobs=PIPELINE_JOBS, force=False, load_db=False, refresh=False) -> dict:
+    """
+    Esegue gli stage di PIPELINE_STAGES necessari per targets, saltando quelli in cache.
+
+    Uno stage parte appena tutti i suoi input sono disponibili; con jobs > 1
+    gli stage pronti girano in parallelo in un pool di processi. Gli input
+    passano dalla cache su disco, per cui ogni worker rilegge solo ciò che gli
+    serve.
+
+    Args:
+        targets: stage da produrre (default: tutti); quelli a monte sono aggiunti
+        seed:    seed globale; ogni stage usa il seed "<seed>:<stage>"
+        jobs:    numero massimo di stage contemporanei (default: PIPELINE_JOBS)
+        force:   ignora la cache e riesegue tutti gli stage
+        load_db: carica le tabelle nel DB SQLite (saltato se nessuna è cambiata)
+        refresh: passato a load_to_db: ricarica solo le tabelle cambiate
+
+    Returns:
+        dict {stage: DataFrame} per gli stage in targets
+    """
+    stages    = _with_upstream(targets or list(PIPELINE_STAGES))
+    cache_dir = config.OUTPUT_DIR / PIPELINE_CACHE_DIR
+    cache_dir.mkdir(parents=True, exist_ok=True)
+
+    manifest_path = cache_dir / "manifest.json"
+    manifest = {} if force or not manifest_path.exists() else json.loads(manifest_path.read_text())
+    settings = _settings()
+    hashed   = {name: settings[name] for name in PIPELINE_SETTINGS}
+    shared   = {name: _source_hash(name) for name in PIPELINE_SHARED_MODULES}
+    shared.update({name: _file_hash(getattr(config, name)) for name in PIPELINE_SHARED_FILES})
+
+    frames = {}
+    def frame(stage):
+        """Output of a stage: in memory if it ran in this process, else from the cache."""
+        if stage not in frames:
+            frames[stage] = pd.read_pickle(cache_dir / f"{stage}.pkl")
+        return frames[stage]
+
+    on_going_messages(f"Running pipeline: {len(stages)} stage(s), {jobs} job(s)...")
+    start    = time.perf_counter()
+    hashes   = {}   # stage → output content hash
+    pending  = list(stages)
+    running  = {}   # Future → (stage, fingerprint, start time)
+    executor = ProcessPoolExecutor(max_workers=jobs) if jobs > 1 else None
+    ran      = []
+
+    try:
+        while pending or running:
+            for stage in [s for s in pending if all(i in hashes for i in PIPELINE_STAGES[s]["inputs"])]:
+                pending.remove(stage)
+                definition = PIPELINE_STAGES[stage]
+                module     = importlib.import_module(definition["module"])
+                params     = _constants(module)
+                fingerprint = _digest(stage, seed, hashed, params, shared,
+                                      _source_hash(definition["module"]),
+                                      [hashes[i] for i in definition["inputs"]])
+
+                entry = manifest.get(stage, {})
+                if (entry.get("fingerprint") == fingerprint
+                        and (cache_dir / f"{stage}.pkl").exists()
+                        and entry.get("sinks") == _sink_signature(_stage_sinks(stage))):
+                    hashes[stage] = entry["output_hash"]
+                    on_going_messages(f"[OK] Stage '{stage}' unchanged — cached.")
+                    event(stage, "stage", status="cached")
+                    continue
+
+                on_going_messages(f"[..] Stage '{stage}' started.")
+                stage_start = time.perf_counter()
+                if executor is None:
+                    inputs = [frame(i) for i in definition["inputs"]]
+                    future = _run_inline(stage, settings, params, seed, inputs)
+                else:
+                    inputs = [cache_dir / f"{i}.pkl" for i in definition["inputs"]]
+                    future = executor.submit(_run_stage, stage, settings, params, seed, inputs)
+                running[future] = (stage, fingerprint, stage_start)
+
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage, fingerprint, stage_start = running.pop(future)
+                df = frames[stage] = future.result()
+                df.to_pickle(cache_dir / f"{stage}.pkl")
+                hashes[stage]   = _output_hash(df)
+                manifest[stage] = {
+                    "fingerprint": fingerprint,
+                    "output_hash": hashes[stage],
+                    "sinks":       _sink_signature(_stage_sinks(stage)),
+                }
+                manifest_path.write_text(json.dumps(manifest, indent=2))
+                ran.append(stage)
+                on_going_messages(f"[OK] Stage '{stage}' done ({time.perf_counter() - stage_start:.2f}s).")
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+    on_going_messages(f"[OK] Pipeline done in {time.perf_counter() - start:.2f}s — "
+                      f"{len(ran)} stage(s) run, {len(stages) - len(ran)} cached.")
+
+    if load_db:
+        tables = [stage for stage in stages if stage in TABLE_SCHEMA]
+        fingerprint = _digest(DB_STEP, str(config.DB_PATH), [hashes[t] for t in tables],
+                              {name: _source_hash(name) for name in PIPELINE_DB_MODULES})
+        entry = manifest.get(DB_STEP, {})
+        if entry.get("fingerprint") == fingerprint and entry.get("sinks") == _sink_signature([config.DB_PATH]):
+            on_going_messages("[OK] SQLite DB unchanged — load skipped.")
+            event(DB_STEP, "load", status="cached")
+        else:
+            from src.generate_sql_lite_db.load_to_db import load_to_db
+            load_to_db({t: frame(t) for t in tables}, refresh=refresh)
+            manifest[DB_STEP] = {"fingerprint": fingerprint, "sinks": _sink_signature([config.DB_PATH])}
+            manifest_path.write_text(json.dumps(manifest, indent=2))
+
+    return {stage: frame(stage) for stage in (targets or stages)}
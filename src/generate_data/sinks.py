@@ -0,0 +1,34 @@
+import src.config as config
+from src.generate_sql_lite_db.schema import TABLE_SCHEMA, render_keys, render_dates, check_types
+from src.utils.run_report import span
+
+
+def write_table(df, table_name, part=0):
+    """
+    Write a generated table to every sink listed in OUTPUT_FORMATS.
+
+    The file name comes from TABLE_SCHEMA[table_name]["csv"]; the Parquet sink
+    types and partitions the table as declared in the same schema entry.
+    df must follow the typed in-memory contract of TABLE_SCHEMA (check_types):
+    integer surrogate keys (SURROGATE_KEYS) are written as their string IDs,
+    datetime64 dates as ISO strings in the CSV and as date32 in Parquet.
+
+    Args:
+        df:         DataFrame to write
+        table_name: key of TABLE_SCHEMA (e.g. "Ordinato")
+        part:       0 replaces the previous output; > 0 appends (chunked generation)
+    """
+    check_types(df, table_name)
+    df = render_keys(df)
+
+    if "csv" in config.OUTPUT_FORMATS:
+        with span(table_name, "write", format="csv", part=part, rows=len(df)):
+            render_dates(df, table_name).to_csv(config.OUTPUT_DIR / TABLE_SCHEMA[table_name]["csv"],
+                                                mode="w" if part == 0 else "a",
+                                                header=part == 0,
+                                                index=False)
+
+    if "parquet" in config.OUTPUT_FORMATS:
+        from src.generate_sql_lite_db.parquet import write_parquet
+        with span(table_name, "write", format="parquet", part=part, rows=len(df)):
+            write_parquet(df, table_name, part=part)
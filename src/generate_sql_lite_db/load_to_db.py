@@ -1,10 +1,42 @@
+import hashlib
+import json
 import sqlite3
+import time
+from datetime import datetime
 
 import pandas as pd
 
-from src.config import OUTPUT_DIR, DB_PATH
+import src.config as config
 from src.utils.utils import on_going_messages
-from src.generate_sql_lite_db.schema import TABLE_SCHEMA
+from src.utils.run_report import span
+from src.generate_sql_lite_db.schema import TABLE_SCHEMA, csv_dtypes, render_keys, render_dates
+
+#===============================
+# load configuration
+#===============================
+# Rows read from each CSV (and inserted with one executemany) at a time
+LOAD_CHUNK_ROWS = 200_000
+
+# PRAGMAs applied for the bulk load. The DB is rebuilt from scratch on every
+# run, so durability is traded for speed: no rollback journal, no fsync.
+LOAD_PRAGMAS = {
+    "journal_mode": "OFF",
+    "synchronous":  "OFF",
+    "cache_size":   -262144,   # negative = KiB → 256 MiB page cache
+    "temp_store":   "MEMORY",
+}
+
+# PRAGMAs for load_to_db(refresh=True): the DB is updated in place, one
+# transaction per table, so a rollback journal is kept to make each table
+# swap atomic.
+REFRESH_PRAGMAS = {
+    **LOAD_PRAGMAS,
+    "journal_mode": "TRUNCATE",
+    "synchronous":  "NORMAL",
+}
+
+# Bookkeeping table: one row per loaded table with the fingerprint of its source
+MANIFEST_TABLE = "_LoadManifest"
 
 
 def _build_create_ddl(table_name: str, columns: dict) -> str:
@@ -13,51 +45,248 @@ def _build_create_ddl(table_name: str, columns: dict) -> str:
     return f'CREATE TABLE "{table_name}" (\n    {col_defs}\n)'
 
 
-def load_to_db() -> None:
+def _build_index_ddl(table_name: str, columns: list) -> str:
+    """Build a CREATE INDEX statement; the index is named ix_<table>_<col1>_<col2>..."""
+    index_name = "_".join(["ix", table_name, *columns])
+    col_list   = ", ".join(f'"{col}"' for col in columns)
+    return f'CREATE INDEX "{index_name}" ON "{table_name}" ({col_list})'
+
+
+def _build_indexes(conn: sqlite3.Connection, table_name: str) -> int:
+    """
+    Create the secondary indexes declared in TABLE_SCHEMA for one table.
+
+    Called once the table's rows are inserted: building an index over the
+    full table (one sort) is much cheaper than maintaining it row by row
+    during the inserts. Returns the number of indexes created.
+    """
+    indexes = TABLE_SCHEMA[table_name].get("indexes", [])
+    for columns in indexes:
+        conn.execute(_build_index_ddl(table_name, columns))
+    return len(indexes)
+
+
+def _fingerprint_hash(table_name: str):
+    """blake2b hash seeded with the table's TABLE_SCHEMA entry; the rows are added by _hash_chunk."""
+    definition = json.dumps(TABLE_SCHEMA[table_name], sort_keys=True).encode()
+    return hashlib.blake2b(definition, digest_size=16)
+
+
+def _hash_chunk(h, chunk: pd.DataFrame, columns: dict) -> None:
+    """
+    Add the row hashes of chunk to h, on the dtypes a CSV read gives
+    (int64, float64, str), so that the same rows hash alike whether they
+    come from memory or from the CSV.
+    """
+    canonical = {}
+    for col in columns:
+        values = chunk[col]
+        if pd.api.types.is_integer_dtype(values.dtype):
+            canonical[col] = values.astype("int64")
+        elif pd.api.types.is_float_dtype(values.dtype):
+            canonical[col] = values.astype("float64")
+        else:
+            canonical[col] = values.astype("str")
+    h.update(pd.util.hash_pandas_object(pd.DataFrame(canonical), index=False).to_numpy().tobytes())
+
+
+def _fingerprint(table_name: str, frame=None) -> str:
+    """
+    Fingerprint of a table's source: schema definition + data.
+
+    The data part is the row hashes of the table (see _hash_chunk), from frame
+    or from the CSV, so it does not depend on where the rows come from:
+    after `generate` (frames in memory) a `load --refresh` (CSVs) finds every
+    table unchanged. A change to either the data or the TABLE_SCHEMA entry
+    (columns, indexes, ...) forces a reload.
+    """
+    h      = _fingerprint_hash(table_name)
+    chunks = _table_chunks(table_name, frame)[0]
+    for chunk in chunks or []:
+        _hash_chunk(h, chunk, TABLE_SCHEMA[table_name]["columns"])
+    return h.hexdigest()
+
+
+def _frame_chunks(frame: pd.DataFrame, table_name: str):
+    """
+    Slices of LOAD_CHUNK_ROWS rows of frame, each with its surrogate keys and
+    dates rendered as in the CSV.
+
+    Rendering (and the tolist() in _rows) happens one slice at a time, so the
+    extra memory is bounded by the slice, not by the whole table.
+    """
+    for start in range(0, len(frame), LOAD_CHUNK_ROWS):
+        yield render_dates(render_keys(frame.iloc[start:start + LOAD_CHUNK_ROWS]), table_name)
+
+
+def _build_insert_sql(table_name: str, columns: dict) -> str:
+    """Build the prepared INSERT statement used by executemany."""
+    col_list = ", ".join(f'"{col}"' for col in columns)
+    params   = ", ".join("?" for _ in columns)
+    return f'INSERT INTO "{table_name}" ({col_list}) VALUES ({params})'
+
+
+def _rows(df: pd.DataFrame, columns: dict):
+    """
+    Iterate the rows of df as tuples of Python scalars, in schema column order.
+
+    Series.tolist() converts a whole column to native int/float/str at C speed,
+    which sqlite3 binds directly (NaN is stored as NULL).
+    """
+    return zip(*(df[col].tolist() for col in columns))
+
+
+def _csv_chunks(table_name: str):
+    """
+    Read the table's CSV from OUTPUT_DIR in chunks of LOAD_CHUNK_ROWS rows (None if missing).
+
+    Floats are parsed with float_precision="round_trip": the default parser can
+    be off by one ulp, and the rows would then differ from the frame they were
+    written from (in the DB and in _fingerprint).
     """
-    Carica tutti i CSV di OUTPUT_DIR nel database SQLite DB_PATH.
+    csv_path = config.OUTPUT_DIR / TABLE_SCHEMA[table_name]["csv"]
+    if not csv_path.exists():
+        return None
+    return pd.read_csv(csv_path, dtype=csv_dtypes(table_name), chunksize=LOAD_CHUNK_ROWS,
+                       float_precision="round_trip")
+
+
+def _table_chunks(table_name: str, frame=None):
+    """(chunks, source): slices of frame ("memory") or of the CSV ("csv"); chunks is None if neither exists."""
+    if frame is not None:
+        return _frame_chunks(frame, table_name), "memory"
+    return _csv_chunks(table_name), "csv"
 
-    Ad ogni invocazione il database viene cancellato e ricreato da zero,
-    in modo che rifletta sempre l'ultima generazione di dati.
+
+def _load_table(conn: sqlite3.Connection, table_name: str, frame=None, fingerprint=None):
+    """
+    Create table_name and insert its rows (from frame, or from the CSV in chunks).
+
+    fingerprint: optional _fingerprint_hash of the table, updated with every
+    chunk inserted (saves a second pass over the source).
+
+    Returns:
+        {"rows", "seconds", "rows_per_sec"}, or None when there is no source
+        (the table is created empty and a warning is printed)
+    """
+    definition = TABLE_SCHEMA[table_name]
+    columns    = definition["columns"]
+
+    # Crea la tabella con lo schema esplicito
+    conn.execute(_build_create_ddl(table_name, columns))
+
+    chunks, source = _table_chunks(table_name, frame)
+    if chunks is None:
+        on_going_messages(f"[WARN] {definition['csv']} not found — table '{table_name}' created empty.")
+        return None
+
+    insert_sql = _build_insert_sql(table_name, columns)
+    rows  = 0
+    start = time.perf_counter()
+    with span(table_name, "load", source=source) as record:
+        for chunk in chunks:
+            conn.executemany(insert_sql, _rows(chunk, columns))
+            if fingerprint is not None:
+                _hash_chunk(fingerprint, chunk, columns)
+            rows += len(chunk)
+        record["rows"] = rows
+    seconds = time.perf_counter() - start
+
+    stats = {"rows": rows, "seconds": seconds, "rows_per_sec": rows / seconds if seconds else 0.0}
+    on_going_messages(f"[OK] '{table_name}' — {rows:,} rows loaded from {source} "
+                      f"({seconds:.2f}s, {stats['rows_per_sec']:,.0f} rows/s).")
+    return stats
+
+
+def _save_fingerprint(conn: sqlite3.Connection, table_name: str, fingerprint: str, rows: int) -> None:
+    """Insert or replace the manifest row of table_name."""
+    conn.execute(f'INSERT OR REPLACE INTO "{MANIFEST_TABLE}" VALUES (?, ?, ?, ?)',
+                 (table_name, fingerprint, rows, datetime.now().isoformat(timespec="seconds")))
+
+
+def _connect(db_path, pragmas: dict) -> sqlite3.Connection:
+    """Open db_path with explicit transactions (isolation_level=None) and the given PRAGMAs."""
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    for pragma, value in pragmas.items():
+        conn.execute(f"PRAGMA {pragma} = {value}")
+    conn.execute(f'CREATE TABLE IF NOT EXISTS "{MANIFEST_TABLE}" ('
+                 '"TableName" TEXT PRIMARY KEY, "Fingerprint" TEXT NOT NULL, '
+                 '"Rows" INTEGER NOT NULL, "LoadedAt" TEXT NOT NULL)')
+    return conn
+
+
+def load_to_db(frames=None, refresh=False) -> dict:
+    """
+    Carica le tabelle di TABLE_SCHEMA nel database SQLite DB_PATH.
+
+    Di default il database viene cancellato e ricreato da zero, in modo che
+    rifletta sempre l'ultima generazione di dati.
 
     Il comportamento per ogni tabella definita in TABLE_SCHEMA è:
         1. Viene creata la tabella con i tipi espliciti dello schema.
-        2. Il CSV corrispondente viene letto con pandas.
-        3. Le righe vengono inserite con df.to_sql (if_exists='append').
-        4. Se il CSV non esiste, la tabella viene comunque creata (vuota)
-           e viene stampato un avviso.
+        2. Le righe arrivano dal DataFrame passato in frames oppure, se assente,
+           dal CSV in OUTPUT_DIR, in entrambi i casi a blocchi di LOAD_CHUNK_ROWS
+           righe.
+        3. Ogni blocco viene inserito con un INSERT preparato (executemany);
+           l'intero caricamento avviene in un'unica transazione, con i PRAGMA
+           di LOAD_PRAGMAS.
+        4. Se né il DataFrame né il CSV esistono, la tabella viene comunque
+           creata (vuota) e viene stampato un avviso.
+        5. A caricamento concluso vengono creati gli indici secondari dichiarati
+           in "indexes" ed eseguito ANALYZE.
+
+    Con refresh=True il DB esistente viene aggiornato sul posto: per ogni
+    tabella si confronta l'impronta della sorgente (vedi _fingerprint) con
+    quella salvata in MANIFEST_TABLE e si ricaricano solo le tabelle cambiate,
+    ciascuna nella propria transazione (DROP, CREATE, INSERT, indici). Le
+    tabelle invariate e i loro indici non vengono toccati.
 
     Per aggiungere una nuova tabella è sufficiente aggiungere una voce in
     src/generate_sql_lite_db/schema.py — nessuna modifica a questo file.
+
+    Args:
+        frames:  dict opzionale {table_name: DataFrame} con le tabelle già in
+                 memoria (evita la rilettura dei CSV)
+        refresh: aggiorna solo le tabelle la cui sorgente è cambiata
+
+    Returns:
+        dict {table_name: {"rows": int, "seconds": float, "rows_per_sec": float}}
+        per le tabelle caricate
     """
+    frames  = frames or {}
+    db_path = config.DB_PATH
+
+    if refresh and db_path.exists():
+        return _refresh_db(db_path, frames)
+
     on_going_messages("Loading data into SQLite DB...")
+    stats = {}
 
     # Ricrea il DB da zero ad ogni run
-    if DB_PATH.exists():
-        DB_PATH.unlink()
+    if db_path.exists():
+        db_path.unlink()
         on_going_messages("Existing DB removed.")
 
-    conn = sqlite3.connect(DB_PATH)
+    conn = _connect(db_path, LOAD_PRAGMAS)
 
     try:
-        for table_name, definition in TABLE_SCHEMA.items():
-            csv_path = OUTPUT_DIR / definition["csv"]
-            columns  = definition["columns"]
+        conn.execute("BEGIN")
+        for table_name in TABLE_SCHEMA:
+            fingerprint = _fingerprint_hash(table_name)
+            table_stats = _load_table(conn, table_name, frames.get(table_name), fingerprint)
+            if table_stats:
+                stats[table_name] = table_stats
+            _save_fingerprint(conn, table_name, fingerprint.hexdigest(), table_stats["rows"] if table_stats else 0)
+        conn.execute("COMMIT")
 
-            # Crea la tabella con lo schema esplicito
-            ddl = _build_create_ddl(table_name, columns)
-            conn.execute(ddl)
-
-            if not csv_path.exists():
-                on_going_messages(f"[WARN] {definition['csv']} not found — table '{table_name}' created empty.")
-                continue
-
-            # Legge il CSV e inserisce i dati
-            df = pd.read_csv(csv_path)
-            df.to_sql(table_name, conn, if_exists="append", index=False)
-            on_going_messages(f"[OK] '{table_name}' — {len(df):,} rows loaded.")
-
-        conn.commit()
+        start = time.perf_counter()
+        with span("indexes", "indexes") as record:
+            conn.execute("BEGIN")
+            n = sum(_build_indexes(conn, table_name) for table_name in TABLE_SCHEMA)
+            conn.execute("COMMIT")
+            conn.execute("ANALYZE")
+            record["indexes"] = n
+        on_going_messages(f"[OK] {n} indexes built and statistics analyzed ({time.perf_counter() - start:.2f}s).")
 
     except Exception as exc:
         conn.rollback()
@@ -66,4 +295,56 @@ def load_to_db() -> None:
     finally:
         conn.close()
 
-    on_going_messages(f"[OK] DB saved to {DB_PATH}")
+    on_going_messages(f"[OK] DB saved to {db_path}")
+    return stats
+
+
+def _refresh_db(db_path, frames: dict) -> dict:
+    """load_to_db(refresh=True): reload only the tables whose fingerprint changed."""
+    on_going_messages(f"Refreshing SQLite DB {db_path}...")
+    stats = {}
+
+    conn = _connect(db_path, REFRESH_PRAGMAS)
+    try:
+        saved    = dict(conn.execute(f'SELECT "TableName", "Fingerprint" FROM "{MANIFEST_TABLE}"'))
+        existing = {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+        for table_name in TABLE_SCHEMA:
+            frame       = frames.get(table_name)
+            fingerprint = _fingerprint(table_name, frame)
+            if table_name in existing and saved.get(table_name) == fingerprint:
+                on_going_messages(f"[OK] '{table_name}' unchanged — skipped.")
+                continue
+
+            # DROP + CREATE + INSERT + indici in un'unica transazione:
+            # in caso di errore la tabella precedente resta intatta
+            conn.execute("BEGIN")
+            try:
+                conn.execute(f'DROP TABLE IF EXISTS "{table_name}"')
+                table_stats = _load_table(conn, table_name, frame)
+                with span(table_name, "indexes"):
+                    _build_indexes(conn, table_name)
+                _save_fingerprint(conn, table_name, fingerprint, table_stats["rows"] if table_stats else 0)
+                conn.execute("COMMIT")
+            except Exception as exc:
+                conn.rollback()
+                raise RuntimeError(f"DB refresh of '{table_name}' failed: {exc}") from exc
+
+            conn.execute(f'ANALYZE "{table_name}"')
+            if table_stats:
+                stats[table_name] = table_stats
+
+    finally:
+        conn.close()
+
+    on_going_messages(f"[OK] DB refreshed — {len(stats)} table(s) reloaded.")
+    return stats
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Load the CSVs in OUTPUT_DIR into the SQLite DB.")
+    parser.add_argument("--refresh", action="store_true",
+                        help="reload only the tables whose CSV changed since the last load")
+    load_to_db(refresh=parser.parse_args().refresh)
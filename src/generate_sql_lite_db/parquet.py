@@ -0,0 +1,153 @@
+"""
+src/generate_sql_lite_db/parquet.py
+-----------------------------------
+Sink Parquet guidato da TABLE_SCHEMA.
+
+Ogni tabella viene scritta come dataset in PARQUET_DIR/<TableName>/ con tipi
+espliciti ricavati dallo schema SQLite:
+
+  INTEGER                  → int32 (int64 per le colonne in "int64")
+  REAL                     → float64
+  TEXT in "dates"          → date32  (datetime64 dalla generazione, oppure
+                                      stringhe ISO dai CSV: "YYYY-MM" diventa
+                                      il primo giorno del mese)
+  TEXT in "categories"     → dictionary<int32, string>
+  altri TEXT               → string
+
+I tipi dipendono solo dallo schema, non dai valori: tutte le parti di una
+tabella scritta a blocchi (--stream, csv_to_parquet) hanno lo stesso schema.
+
+Le tabelle con "partition_by" sono partizionate per mese (stile Hive):
+  PARQUET_DIR/Ordinato/PartitionMonth=2023-01/part-0-0.parquet
+
+Richiede pyarrow (pip install pyarrow).
+
+Utilizzo (conversione dei CSV già presenti in OUTPUT_DIR):
+  python -m src.generate_sql_lite_db.parquet
+"""
+
+import shutil
+
+import numpy as np
+import pandas as pd
+
+import src.config as config
+from src.utils.utils import on_going_messages, parse_dates, format_dates
+from src.generate_sql_lite_db.schema import TABLE_SCHEMA, csv_dtypes
+
+# Name of the (hive) partition key added to partitioned tables
+PARTITION_COLUMN = "PartitionMonth"
+
+# Rows per CSV chunk when converting existing CSVs
+CSV_CHUNK_ROWS = 1_000_000
+
+
+def _import_pyarrow():
+    """Import pyarrow lazily so that CSV-only runs do not need it."""
+    try:
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+    except ImportError as exc:
+        raise ImportError("Parquet output requires pyarrow: pip install pyarrow") from exc
+    return pa, ds
+
+
+def to_arrow(df: pd.DataFrame, table_name: str):
+    """
+    Convert a DataFrame to a pyarrow Table with the types declared in TABLE_SCHEMA.
+
+    Columns are emitted in schema order; for partitioned tables the month key
+    (PARTITION_COLUMN, "YYYY-MM") is appended as last column. INTEGER columns
+    are int32 unless listed in "int64": a value out of the int32 range raises
+    a ValueError rather than widening the column in this part only.
+    """
+    pa, _ = _import_pyarrow()
+
+    definition = TABLE_SCHEMA[table_name]
+    dates      = set(definition.get("dates", []))
+    categories = set(definition.get("categories", []))
+    int64      = set(definition.get("int64", []))
+
+    arrays, fields = [], []
+    for col, sql_type in definition["columns"].items():
+        values = df[col].to_numpy()
+        base   = sql_type.split()[0]
+
+        if col in dates:
+            arr = pa.array(parse_dates(values), type=pa.date32())
+        elif base == "INTEGER":
+            values = values.astype(np.int64)
+            if col not in int64 and len(values) and (values.min() < np.iinfo(np.int32).min
+                                                     or values.max() > np.iinfo(np.int32).max):
+                raise ValueError(f"{table_name}.{col}: values out of the int32 range, "
+                                 f'add the column to "int64" in TABLE_SCHEMA')
+            arr = pa.array(values, type=pa.int64() if col in int64 else pa.int32())
+        elif base == "REAL":
+            arr = pa.array(values.astype(np.float64), type=pa.float64())
+        elif col in categories:
+            arr = pa.array(values.astype(object), type=pa.string()).dictionary_encode()
+        else:
+            arr = pa.array(values.astype(object), type=pa.string())
+
+        arrays.append(arr)
+        fields.append(pa.field(col, arr.type, nullable="NOT NULL" not in sql_type and "PRIMARY KEY" not in sql_type))
+
+    partition_by = definition.get("partition_by")
+    if partition_by:
+        months = format_dates(parse_dates(df[partition_by].to_numpy()), unit="M")
+        arrays.append(pa.array(np.asarray(months, dtype=object), type=pa.string()))
+        fields.append(pa.field(PARTITION_COLUMN, pa.string(), nullable=False))
+
+    return pa.Table.from_arrays(arrays, schema=pa.schema(fields))
+
+
+def write_parquet(df: pd.DataFrame, table_name: str, part: int = 0) -> None:
+    """
+    Write df to the Parquet dataset PARQUET_DIR/<table_name>/.
+
+    part = 0 replaces the whole dataset; part > 0 adds new files next to the
+    existing ones (used by the streaming pipeline, one part per chunk).
+    """
+    pa, ds = _import_pyarrow()
+
+    table_dir = config.PARQUET_DIR / table_name
+    if part == 0 and table_dir.exists():
+        shutil.rmtree(table_dir)
+
+    partitioning = None
+    if TABLE_SCHEMA[table_name].get("partition_by"):
+        partitioning = ds.partitioning(pa.schema([(PARTITION_COLUMN, pa.string())]), flavor="hive")
+
+    ds.write_dataset(
+        to_arrow(df, table_name),
+        table_dir,
+        format="parquet",
+        partitioning=partitioning,
+        basename_template=f"part-{part}-{{i}}.parquet",
+        existing_data_behavior="overwrite_or_ignore",
+        preserve_order=True,
+    )
+
+
+def csv_to_parquet(tables=None) -> None:
+    """
+    Convert the CSVs in OUTPUT_DIR to Parquet datasets, reading CSV_CHUNK_ROWS rows at a time.
+
+    Args:
+        tables: table names to convert (default: every table in TABLE_SCHEMA)
+    """
+    for table_name in tables or TABLE_SCHEMA:
+        csv_path = config.OUTPUT_DIR / TABLE_SCHEMA[table_name]["csv"]
+        if not csv_path.exists():
+            on_going_messages(f"[WARN] {csv_path.name} not found — '{table_name}' skipped.")
+            continue
+
+        rows = 0
+        for part, chunk in enumerate(pd.read_csv(csv_path, dtype=csv_dtypes(table_name), chunksize=CSV_CHUNK_ROWS)):
+            write_parquet(chunk, table_name, part=part)
+            rows += len(chunk)
+        on_going_messages(f"[OK] '{table_name}' — {rows:,} rows written to {config.PARQUET_DIR / table_name}")
+
+
+if __name__ == "__main__":
+    csv_to_parquet()
@@ -6,6 +6,29 @@
 #   columns  : ordered dict of  column_name -> SQLite type declaration
 #              (PRIMARY KEY, NOT NULL, etc. can be included in the type string)
 #
+# Optional keys, used by the Parquet sink (src/generate_sql_lite_db/parquet.py):
+#   dates        : TEXT columns holding ISO dates ("YYYY-MM-DD" or "YYYY-MM") → date32
+#   months       : the "dates" columns holding months ("YYYY-MM")
+#   categories   : low-cardinality TEXT columns → dictionary-encoded strings
+#   partition_by : date column used to split the table into monthly partitions
+#   int64        : INTEGER columns written as int64; every other INTEGER column is
+#                  int32, so all the parts of a streamed table share one schema
+#
+# Optional key, used by the SQLite loader (src/generate_sql_lite_db/load_to_db.py):
+#   indexes      : list of secondary indexes, each a list of columns (composite
+#                  indexes in the given order). They are created after the bulk
+#                  load, followed by ANALYZE — never before, so inserts stay cheap.
+#
+# Key columns are declared once, by column name, in KEY_FORMATS below: the same
+# prefix / width applies wherever the column appears (primary or foreign key).
+#
+# In-memory contract: the DataFrames passed between generation stages are
+# typed, and only the sinks format them (see check_types / render_dates):
+#   "dates"  : datetime64 (a month is its first day)
+#   INTEGER  : integer dtype
+#   REAL     : float64
+#   TEXT     : strings, categoricals or, with SURROGATE_KEYS, integer keys
+#
 # To add a new table in the future, simply append a new entry here.
 # No other file needs to be modified.
 #
@@ -15,6 +38,8 @@
 #   REAL     : floating-point numbers (costs, prices, values)
 # =============================================================================
 
+import src.config as config
+
 TABLE_SCHEMA: dict[str, dict] = {
 
     "MasterMaterial": {
@@ -29,6 +54,7 @@ TABLE_SCHEMA: dict[str, dict] = {
             "Importance":    "TEXT    NOT NULL",   # imp_1 | imp_2 | imp_3
             "LeadTimeDays":  "INTEGER NOT NULL",   # nominal replenishment lead time (days)
         },
+        "categories": ["Category", "UnitOfMeasure", "Importance"],
     },
 
     "MasterCustomer": {
@@ -40,6 +66,7 @@ TABLE_SCHEMA: dict[str, dict] = {
             "Region":       "TEXT    NOT NULL",
             "PaymentTerms": "INTEGER NOT NULL",    # days
         },
+        "categories": ["CustomerType", "Region"],
     },
 
     "Ordinato": {
@@ -53,6 +80,13 @@ TABLE_SCHEMA: dict[str, dict] = {
             "QuantityOrdered": "INTEGER NOT NULL",
             "OrderValue":      "REAL    NOT NULL",
         },
+        "dates":        ["OrderDate", "RequestedDate"],
+        "categories":   ["MaterialID", "CustomerID"],
+        "partition_by": "OrderDate",
+        "indexes": [
+            ["MaterialID", "OrderDate"],
+            ["CustomerID"],
+        ],
     },
 
     "Venduto": {
@@ -68,6 +102,14 @@ TABLE_SCHEMA: dict[str, dict] = {
             "QuantitySold":    "INTEGER NOT NULL",
             "SaleValue":       "REAL    NOT NULL",
         },
+        "dates":        ["OrderDate", "ShipmentDate"],
+        "categories":   ["MaterialID", "CustomerID"],
+        "partition_by": "ShipmentDate",
+        "indexes": [
+            ["OrderID"],                           # Ordinato ⟕ Venduto (OTIF)
+            ["MaterialID", "ShipmentDate"],
+            ["CustomerID"],
+        ],
     },
 
     "Budget": {
@@ -79,6 +121,31 @@ TABLE_SCHEMA: dict[str, dict] = {
             "BudgetQty":   "INTEGER NOT NULL",
             "BudgetValue": "REAL    NOT NULL",
         },
+        "dates":      ["BudgetMonth"],
+        "months":     ["BudgetMonth"],
+        "categories": ["MaterialID"],
+        "indexes": [
+            ["MaterialID", "BudgetMonth"],
+        ],
+    },
+
+    "Inventario": {
+        "csv": "Inventario.csv",
+        "columns": {
+            "InventoryID":  "TEXT    PRIMARY KEY",
+            "Date":         "TEXT    NOT NULL",     # YYYY-MM-DD
+            "MaterialID":   "TEXT    NOT NULL",
+            "OpeningStock": "INTEGER NOT NULL",
+            "DailyInflow":  "INTEGER NOT NULL",
+            "DailyOutflow": "INTEGER NOT NULL",
+            "ClosingStock": "INTEGER NOT NULL",
+        },
+        "dates":        ["Date"],
+        "categories":   ["MaterialID"],
+        "partition_by": "Date",
+        "indexes": [
+            ["MaterialID", "Date"],
+        ],
     },
 
     "Forecast": {
@@ -92,6 +159,183 @@ TABLE_SCHEMA: dict[str, dict] = {
             "ForecastQty":    "INTEGER NOT NULL",
             "ForecastValue":  "REAL    NOT NULL",
         },
+        "dates":        ["ForecastMadeOn", "ForecastMonth"],
+        "months":       ["ForecastMadeOn", "ForecastMonth"],
+        "categories":   ["MaterialID"],
+        "partition_by": "ForecastMadeOn",
+        "indexes": [
+            ["MaterialID", "ForecastMonth", "Horizon"],
+        ],
     },
 
+    # Aggregates of Venduto (src/generate_data/generate_sales_aggregates.py)
+    "VendutoMensile": {
+        "csv": "VendutoMensile.csv",
+        "columns": {
+            "SalesMonth":   "TEXT    NOT NULL",     # YYYY-MM (ShipmentDate)
+            "MaterialID":   "TEXT    NOT NULL",
+            "QuantitySold": "INTEGER NOT NULL",
+            "SaleValue":    "REAL    NOT NULL",
+            "Shipments":    "INTEGER NOT NULL",     # Venduto rows in the month
+        },
+        "dates":      ["SalesMonth"],
+        "months":     ["SalesMonth"],
+        "categories": ["MaterialID"],
+        "indexes": [
+            ["MaterialID", "SalesMonth"],
+        ],
+    },
+
+    "VendutoMensileCliente": {
+        "csv": "VendutoMensileCliente.csv",
+        "columns": {
+            "SalesMonth":   "TEXT    NOT NULL",     # YYYY-MM (ShipmentDate)
+            "CustomerID":   "TEXT    NOT NULL",
+            "QuantitySold": "INTEGER NOT NULL",
+            "SaleValue":    "REAL    NOT NULL",
+            "Shipments":    "INTEGER NOT NULL",     # Venduto rows in the month
+        },
+        "dates":      ["SalesMonth"],
+        "months":     ["SalesMonth"],
+        "categories": ["CustomerID"],
+        "indexes": [
+            ["CustomerID", "SalesMonth"],
+        ],
+    },
+
+}
+
+
+def csv_dtypes(table_name: str) -> dict:
+    """
+    pd.read_csv dtypes for a table: every TEXT column is read as string.
+
+    Keeps IDs and codes that look numeric (e.g. "00123") from being turned
+    into numbers; INTEGER / REAL columns are left to pandas inference.
+    """
+    return {col: "str" for col, sql_type in TABLE_SCHEMA[table_name]["columns"].items()
+            if sql_type.startswith("TEXT")}
+
+
+# Key columns: column name -> (prefix, zero-pad width) of the rendered string ID.
+# With SURROGATE_KEYS the generators carry these columns as integers (the number
+# after the prefix) and the sinks render them with render_keys.
+KEY_FORMATS = {
+    "MaterialID":  ("MAT",  3),
+    "CustomerID":  ("CUST", 3),
+    "OrderID":     ("ORD",  6),
+    "SaleID":      ("SALE", 6),
+    "BudgetID":    ("BDG",  6),
+    "InventoryID": ("INV",  7),
+    "ForecastID":  ("FCST", 7),
 }
+
+
+def make_keys(column: str, ids):
+    """
+    Values of the key column for the integer ids.
+
+    With SURROGATE_KEYS the ids themselves, as int32 (int64 once they no longer
+    fit); otherwise the string IDs, e.g. make_keys("OrderID", [1, 2]) -> ORD000001, ORD000002.
+    """
+    import numpy as np
+    from src.utils.utils import format_ids
+
+    ids = np.asarray(ids, dtype=np.int64)
+    if config.SURROGATE_KEYS:
+        return ids.astype(np.int32) if not len(ids) or ids.max() <= np.iinfo(np.int32).max else ids
+    prefix, width = KEY_FORMATS[column]
+    return format_ids(prefix, ids, width)
+
+
+def key_array(values):
+    """
+    Lookup array of a key column, gathered by index with .take(): integer
+    surrogate keys stay a numpy array, string IDs become a pandas string array
+    (each ID string is then built once, not once per fact row).
+    """
+    import numpy as np
+    import pandas as pd
+    from pandas.api.types import is_integer_dtype
+
+    if is_integer_dtype(np.asarray(values).dtype):
+        return np.asarray(values)
+    return pd.array(values, dtype="str")
+
+
+def render_keys(df):
+    """
+    Return df with its integer key columns rendered as string IDs (see KEY_FORMATS).
+
+    Used by the sinks, so CSV / Parquet / SQLite always hold the same strings
+    whether or not the tables were generated with SURROGATE_KEYS. df is only
+    copied when it has something to render.
+    """
+    from pandas.api.types import is_integer_dtype
+    from src.utils.utils import format_ids
+
+    rendered = {}
+    for col in df.columns:
+        if col in KEY_FORMATS and is_integer_dtype(df[col].dtype):
+            prefix, width = KEY_FORMATS[col]
+            rendered[col] = format_ids(prefix, df[col].to_numpy(), width)
+    return df.assign(**rendered) if rendered else df
+
+
+def categorize(df, table_name: str):
+    """With SURROGATE_KEYS, cast the table's "categories" columns (keys excluded) to pandas categoricals."""
+    if not config.SURROGATE_KEYS:
+        return df
+    columns = [col for col in TABLE_SCHEMA[table_name].get("categories", []) if col not in KEY_FORMATS]
+    return df.astype({col: "category" for col in columns})
+
+
+def check_types(df, table_name: str) -> None:
+    """
+    Check that a generated table follows the in-memory contract (see the header).
+
+    Called by the sinks on every stage output, so a stage that hands formatted
+    strings (or mistyped numbers) downstream fails where it is produced.
+
+    Raises:
+        TypeError: naming the first column that is missing or has the wrong dtype
+    """
+    from pandas.api.types import is_datetime64_dtype, is_integer_dtype
+
+    definition = TABLE_SCHEMA[table_name]
+    dates      = set(definition.get("dates", []))
+    for col, sql_type in definition["columns"].items():
+        if col not in df.columns:
+            raise TypeError(f"{table_name}.{col} is missing")
+        dtype = df[col].dtype
+        base  = sql_type.split()[0]
+        if col in dates:
+            expected, ok = "datetime64", is_datetime64_dtype(dtype)
+        elif base == "INTEGER":
+            expected, ok = "an integer dtype", is_integer_dtype(dtype)
+        elif base == "REAL":
+            expected, ok = "float64", dtype == "float64"
+        else:
+            expected, ok = "text", not is_datetime64_dtype(dtype)
+        if not ok:
+            raise TypeError(f"{table_name}.{col} is {dtype}, expected {expected}")
+
+
+def render_dates(df, table_name: str):
+    """
+    Return df with its datetime64 "dates" columns rendered as ISO strings:
+    "YYYY-MM" for the "months" columns, "YYYY-MM-DD" for the others.
+
+    Used by the text sinks (CSV, SQLite); the Parquet sink writes the dates as
+    date32. df is only copied when it has something to render.
+    """
+    from pandas.api.types import is_datetime64_dtype
+    from src.utils.utils import format_dates
+
+    definition = TABLE_SCHEMA[table_name]
+    months     = set(definition.get("months", []))
+    rendered   = {}
+    for col in definition.get("dates", []):
+        if col in df.columns and is_datetime64_dtype(df[col].dtype):
+            rendered[col] = format_dates(df[col].to_numpy(), unit="M" if col in months else "D")
+    return df.assign(**rendered) if rendered else df
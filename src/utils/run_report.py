@@ -0,0 +1,201 @@
+"""
+src/utils/run_report.py
+-----------------------
+Strumentazione a span: tempi, righe e memoria di ogni generatore, scrittura,
+caricamento nel DB e KPI, registrati come report JSON lines
+(OUTPUT_DIR/run_report.jsonl, una riga per evento).
+
+Ogni span registra:
+
+  wall_s               tempo reale
+  cpu_s                tempo CPU del processo (utente + sistema; con span
+                       concorrenti in thread diversi include anche gli altri)
+  rows, rows_per_sec   righe prodotte / scritte / caricate (se indicate)
+  rss_mb               memoria residente a fine span
+  peak_rss_mb          picco di memoria residente del processo a fine span
+  tracemalloc_peak_mb  picco di memoria Python allocata durante lo span
+                       (solo con trace_memory, rallenta l'esecuzione)
+
+più il nome, il tipo (stage, chunk, write, load, indexes, read, kpi, ...), lo
+span che lo contiene nello stesso thread, il pid e i campi passati dal chiamante
+(tabella, formato, ...).
+
+Il report è attivo solo tra start_run() ed end_run() (lo fa la CLI). Il
+percorso e l'id del run passano ai processi worker (pipeline, streaming) con
+variabili d'ambiente. Fuori da un run gli span non scrivono nulla, per cui le
+funzioni usate come libreria non producono file.
+
+Utilizzo:
+  with span("Ordinato", "stage") as record:
+      df = generate_ordinato(...)
+      record["rows"] = len(df)
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+# File del report, dentro OUTPUT_DIR
+RUN_REPORT_NAME = "run_report.jsonl"
+
+# Variabili d'ambiente che identificano il run attivo (ereditate dai worker)
+_ENV_PATH         = "FAKE_DATA_RUN_REPORT"
+_ENV_RUN_ID       = "FAKE_DATA_RUN_ID"
+_ENV_TRACE_MEMORY = "FAKE_DATA_TRACE_MEMORY"
+
+# Span aperti nel thread corrente: [name, tracemalloc peak visto finora].
+# Uno stack per thread: i KPI eseguiti in parallelo (analytics/runner.py)
+# non si annidano l'uno nell'altro.
+_LOCAL = threading.local()
+
+
+def _stack() -> list:
+    """Open spans of the calling thread."""
+    if not hasattr(_LOCAL, "stack"):
+        _LOCAL.stack = []
+    return _LOCAL.stack
+
+
+def rss_mb():
+    """Current resident set size of the process in MiB (None when it cannot be read)."""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 2**20
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        return None
+
+
+def peak_rss_mb():
+    """Peak resident set size of the process in MiB (high-water mark since it started)."""
+    try:
+        import resource
+    except ImportError:                               # Windows
+        import psutil
+        return psutil.Process().memory_info().peak_wset / 2**20
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 1024
+
+
+def _round(value, digits=1):
+    return None if value is None else round(value, digits)
+
+
+def _emit(record: dict) -> None:
+    """Append one record to the active run report (no-op outside a run)."""
+    path = os.environ.get(_ENV_PATH)
+    if not path:
+        return
+    line = json.dumps({"run_id": os.environ[_ENV_RUN_ID], **record}, default=str) + "\n"
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(line)
+
+
+def start_run(output_dir, command: str, trace_memory: bool = False, append: bool = False, **fields) -> str:
+    """
+    Start a run: every span of this process and of its workers is written to
+    OUTPUT_DIR/RUN_REPORT_NAME. The report is recreated, or extended with
+    append=True (the records of each run share its run_id).
+
+    Returns:
+        run id
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    path   = output_dir / RUN_REPORT_NAME
+    run_id = uuid.uuid4().hex[:12]
+    if not append:
+        path.write_text("")
+
+    os.environ[_ENV_PATH]   = str(path)
+    os.environ[_ENV_RUN_ID] = run_id
+    if trace_memory:
+        os.environ[_ENV_TRACE_MEMORY] = "1"
+    _emit({"event": "run_start", "command": command, "pid": os.getpid(),
+           "start": datetime.now().isoformat(timespec="milliseconds"), **fields})
+    return run_id
+
+
+def end_run(wall_s: float, status: str = "ok") -> None:
+    """Close the run started by start_run: writes the run_end record and deactivates the report."""
+    _emit({"event": "run_end", "status": status, "pid": os.getpid(), "wall_s": round(wall_s, 3),
+           "cpu_s": round(time.process_time(), 3), "peak_rss_mb": _round(peak_rss_mb())})
+    for name in (_ENV_PATH, _ENV_RUN_ID, _ENV_TRACE_MEMORY):
+        os.environ.pop(name, None)
+
+
+def event(name: str, kind: str, **fields) -> None:
+    """Record an instantaneous event (e.g. a stage skipped because cached)."""
+    stack = _stack()
+    _emit({"event": "event", "name": name, "kind": kind, "pid": os.getpid(),
+           "parent": stack[-1][0] if stack else None,
+           "start": datetime.now().isoformat(timespec="milliseconds"), **fields})
+
+
+@contextmanager
+def span(name: str, kind: str, **fields):
+    """
+    Time a block and record it in the run report.
+
+    Yields a dict: keys set by the caller (typically "rows") are added to
+    the record. An exception is recorded with status "error" and re-raised.
+    """
+    trace = os.environ.get(_ENV_TRACE_MEMORY) == "1"
+    stack = _stack()
+    if trace:
+        import tracemalloc
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        # The enclosing spans keep the peak reached so far, then the peak restarts for this one
+        peak_so_far = tracemalloc.get_traced_memory()[1]
+        for frame in stack:
+            frame[1] = max(frame[1], peak_so_far)
+        tracemalloc.reset_peak()
+
+    record = dict(fields)
+    parent = stack[-1][0] if stack else None
+    stack.append([name, 0])
+    started = datetime.now().isoformat(timespec="milliseconds")
+    wall0, cpu0 = time.perf_counter(), time.process_time()
+    status = "ok"
+    try:
+        yield record
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        wall_s = time.perf_counter() - wall0
+        cpu_s  = time.process_time() - cpu0
+        _, peak_traced = stack.pop()
+
+        rows = record.pop("rows", None)
+        out  = {
+            "event":        "span",
+            "name":         name,
+            "kind":         kind,
+            "status":       status,
+            "pid":          os.getpid(),
+            "parent":       parent,
+            "start":        started,
+            "wall_s":       round(wall_s, 4),
+            "cpu_s":        round(cpu_s, 4),
+            "rows":         rows,
+            "rows_per_sec": round(rows / wall_s) if rows is not None and wall_s > 0 else None,
+            "rss_mb":       _round(rss_mb()),
+            "peak_rss_mb":  _round(peak_rss_mb()),
+        }
+        if trace:
+            import tracemalloc
+            peak_traced = max(peak_traced, tracemalloc.get_traced_memory()[1])
+            if stack:
+                stack[-1][1] = max(stack[-1][1], peak_traced)
+            out["tracemalloc_peak_mb"] = round(peak_traced / 2**20, 1)
+        _emit({**out, **record})
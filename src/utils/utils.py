@@ -1,5 +1,12 @@
+import random
 from datetime import datetime
 
+# numpy / pandas are imported inside the array helpers below: modules that only
+# need now() / on_going_messages() (CLI, loaders) do not pay for them at import
+
+# ID prefixes already reported by format_ids as wider than their zero-pad width
+_WIDE_ID_PREFIXES = set()
+
 
 # STAMPA LA DATA
 def now():
@@ -25,4 +32,144 @@ def on_going_messages(message):
         Text to display alongside the current timestamp.
     """
     timestamp = now()
-    print(timestamp, message)
\ No newline at end of file
+    print(timestamp, message)
+
+
+def numpy_rng():
+    """
+    Build a numpy Generator seeded from the global `random` module.
+
+    The seed is drawn with random.getrandbits, so a run started with
+    random.seed(SEED) produces the same numpy streams every time.
+
+    Returns
+    -------
+    numpy.random.Generator
+        Independent generator for bulk (vectorized) draws.
+    """
+    import numpy as np
+
+    return np.random.default_rng(random.getrandbits(64))
+
+
+def chunk_rng(master_seed, chunk_idx):
+    """
+    Build the numpy Generator of one chunk (shard) of a sharded run.
+
+    Every chunk gets an independent stream derived from (master_seed, chunk_idx)
+    through numpy's SeedSequence, so its draws do not depend on which process
+    generates it or in which order the chunks are processed.
+
+    Parameters
+    ----------
+    master_seed : int
+        Seed of the whole run (e.g. random.getrandbits(64) after random.seed(SEED)).
+    chunk_idx : int
+        Position of the chunk.
+
+    Returns
+    -------
+    numpy.random.Generator
+    """
+    import numpy as np
+
+    return np.random.default_rng(np.random.SeedSequence(master_seed, spawn_key=(chunk_idx,)))
+
+
+def format_ids(prefix, ids, width):
+    """
+    Format an integer array as zero-padded string IDs, e.g. ("ORD", [1, 2], 6) -> ORD000001, ORD000002.
+
+    Equivalent to f"{prefix}{i:0{width}d}" applied element-wise, without a Python loop:
+    the digits are computed arithmetically and written straight into a fixed-width
+    unicode buffer. IDs wider than `width` keep all their digits (numpy string
+    operations) and a one-time warning is printed for the prefix.
+
+    Parameters
+    ----------
+    prefix : str
+        Text prepended to every ID.
+    ids : numpy.ndarray
+        Non-negative integer IDs.
+    width : int
+        Minimum number of digits (numbers are zero-padded to this width).
+
+    Returns
+    -------
+    pandas.arrays.StringArray
+        String array of the formatted IDs.
+    """
+    import numpy as np
+    import pandas as pd
+
+    ids = np.asarray(ids, dtype=np.int64)
+    if len(ids) and ids.max() >= 10 ** width:
+        if prefix not in _WIDE_ID_PREFIXES:
+            _WIDE_ID_PREFIXES.add(prefix)
+            on_going_messages(f"[WARN] {prefix} IDs exceed {width} digits: they are no longer fixed-width "
+                              f"(still unique, but string order differs from numeric order).")
+        return pd.array(np.char.add(prefix, np.char.zfill(ids.astype(str), width)), dtype="str")
+
+    powers = 10 ** np.arange(width - 1, -1, -1, dtype=np.int64)
+    codes  = np.empty((len(ids), len(prefix) + width), dtype=np.uint32)
+    codes[:, :len(prefix)] = [ord(c) for c in prefix]
+    codes[:, len(prefix):] = ids[:, None] // powers % 10 + ord("0")
+    return pd.array(codes.view(f"U{len(prefix) + width}").ravel(), dtype="str")
+
+
+def parse_dates(values):
+    """
+    Parse ISO date strings ("YYYY-MM-DD") into a numpy datetime64[D] array.
+
+    Each distinct string is parsed once (factorize + lookup), which is much
+    cheaper than parsing every row when dates repeat, as they do in all facts.
+    Values that are already datetime64 (generated tables) are only cast to days.
+
+    Parameters
+    ----------
+    values : array-like of str or datetime64
+        ISO formatted dates.
+
+    Returns
+    -------
+    numpy.ndarray
+        Array of dtype datetime64[D].
+    """
+    import numpy as np
+    import pandas as pd
+
+    values = np.asarray(values)
+    if np.issubdtype(values.dtype, np.datetime64):
+        return values.astype("datetime64[D]")
+    codes, uniques = pd.factorize(values)
+    return np.asarray(uniques, dtype="datetime64[D]")[codes]
+
+
+def format_dates(dates, unit="D"):
+    """
+    Format a datetime64 array as ISO strings ("YYYY-MM-DD", or "YYYY-MM" with unit="M").
+
+    The strings of the covered [min, max] range are built once and gathered by
+    index, so the cost depends on the span of dates rather than on the row count.
+
+    Parameters
+    ----------
+    dates : numpy.ndarray
+        Array of datetime64 values.
+    unit : str
+        "D" for daily dates, "M" for months.
+
+    Returns
+    -------
+    pandas.arrays.StringArray
+        String array of the formatted dates.
+    """
+    import numpy as np
+    import pandas as pd
+
+    dates = np.asarray(dates).astype(f"datetime64[{unit}]")
+    if len(dates) == 0:
+        return pd.array([], dtype="str")
+    first = dates.min()
+    table = pd.array(np.datetime_as_string(np.arange(first, dates.max() + 1), unit=unit), dtype="str")
+    return table.take((dates - first).astype(np.int64))
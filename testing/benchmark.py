@@ -0,0 +1,301 @@
+"""
+testing/benchmark.py
+--------------------
+Benchmark degli stage di generazione, del caricamento SQLite e dei KPI a più
+scale factor.
+
+Per ogni scale factor gli stage vengono eseguiti in ordine (come nella
+pipeline, con lo stesso seed per stage). Ognuno gira in un processo nuovo
+("spawn"), per cui il picco di RSS misurato appartiene solo a quello stage. Il
+picco comprende l'interprete e gli input letti dal disco: rss_before_mb ne è
+la quota presente prima della chiamata. Per ogni stage vengono registrati:
+
+  seconds       tempo di esecuzione della funzione (minimo su --repeat prove)
+  rows          righe prodotte (caricate per load_to_db, ordini per kpi_otif)
+  rows_per_sec  rows / seconds
+  peak_rss_mb   picco di memoria residente del processo
+  rss_before_mb picco di memoria prima della chiamata (interprete + input)
+
+I risultati vengono scritti in BENCH_RESULTS_PATH e confrontati con
+BENCH_BASELINE_PATH. Uno stage regredisce se il tempo cresce oltre
+BENCH_TIME_THRESHOLD (solo sopra BENCH_MIN_SECONDS, sotto è rumore) o se il
+picco di RSS cresce oltre BENCH_RSS_THRESHOLD. In caso di regressione
+l'uscita è 1.
+
+La baseline dipende dalla macchina: va rigenerata con --save-baseline sulla
+macchina su cui si confronta.
+
+Utilizzo (dalla root del progetto):
+  python -m testing.benchmark                          # SF 1, 10, 50 + confronto con la baseline
+  python -m testing.benchmark -s 1 10 --repeat 3       # minimo di 3 prove per stage
+  python -m testing.benchmark --stages generate_sales load_to_db
+  python -m testing.benchmark --save-baseline          # salva i risultati come nuova baseline
+"""
+
+import argparse
+import contextlib
+import importlib
+import json
+import os
+import platform
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import get_context
+from pathlib import Path
+
+from src.utils.run_report import peak_rss_mb
+
+# ---------------------------------------------------------------------------
+# Configurazione
+# ---------------------------------------------------------------------------
+
+BENCH_SCALE_FACTORS = [1, 10, 50]
+BENCH_SEED          = 42
+
+# Cartella di lavoro: CSV, DB e output intermedi di ogni scale factor (BENCH_DIR/sf<N>/)
+BENCH_DIR = Path("bench_output")
+
+BENCH_RESULTS_PATH  = Path("testing") / "benchmark_results.json"
+BENCH_BASELINE_PATH = Path("testing") / "benchmark_baseline.json"
+
+# Crescita massima tollerata rispetto alla baseline (0.25 = +25 %)
+BENCH_TIME_THRESHOLD = 0.25
+BENCH_RSS_THRESHOLD  = 0.25
+
+# Tempi di baseline sotto questa soglia (secondi) non vengono confrontati
+BENCH_MIN_SECONDS = 0.5
+
+# Stage non di generazione, eseguiti dopo quelli di PIPELINE_STAGES
+LOAD_STAGE = "load_to_db"
+KPI_STAGE  = "kpi_otif.main"
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+def _bench_stages() -> dict:
+    """Benchmark name → pipeline stage (None for load_to_db / kpi_otif), in execution order."""
+    from src.generate_data.pipeline import PIPELINE_STAGES
+    stages = {definition["function"]: stage for stage, definition in PIPELINE_STAGES.items()}
+    stages[LOAD_STAGE] = None
+    stages[KPI_STAGE]  = None
+    return stages
+
+
+def _run_one(name: str, scale_factor: float, work_dir: Path, seed: int) -> dict:
+    """
+    Run one benchmark stage in the current (fresh) process and measure it.
+
+    The generator output is pickled to work_dir/<Stage>.pkl for the stages
+    downstream; the CSVs written by the generators feed kpi_otif.
+    """
+    from src.cli import parse_args, _apply_config
+    _apply_config(parse_args(["generate", "-s", str(scale_factor), "-o", str(work_dir)]))
+
+    import pandas as pd
+    import src.config as config
+    from src.generate_data.pipeline import PIPELINE_STAGES
+
+    stage = _bench_stages()[name]
+    if stage is not None:
+        definition = PIPELINE_STAGES[stage]
+        function   = getattr(importlib.import_module(definition["module"]), definition["function"])
+        inputs     = [pd.read_pickle(work_dir / f"{i}.pkl") for i in definition["inputs"]]
+        call       = lambda: function(*inputs)
+        random.seed(f"{seed}:{stage}")
+    elif name == LOAD_STAGE:
+        from src.generate_sql_lite_db.load_to_db import load_to_db
+        frames = {table: pd.read_pickle(work_dir / f"{table}.pkl") for table in PIPELINE_STAGES}
+        call   = lambda: load_to_db(frames)
+    else:
+        kpi_otif = importlib.import_module("analytics.kpi_otif")
+        call     = kpi_otif.main
+        random.seed(seed)
+
+    rss_before = peak_rss_mb()
+    start      = time.perf_counter()
+    result     = call()
+    seconds    = time.perf_counter() - start
+    peak_rss   = peak_rss_mb()
+
+    if stage is not None:
+        result.to_pickle(work_dir / f"{stage}.pkl")
+        rows = len(result)
+    elif name == LOAD_STAGE:
+        rows = sum(stats["rows"] for stats in result.values())
+    else:
+        rows = sum(1 for _ in open(config.OUTPUT_DIR / "Ordinato.csv", "rb")) - 1
+
+    return {
+        "seconds":       round(seconds, 3),
+        "rows":          rows,
+        "rows_per_sec":  round(rows / seconds) if seconds else None,
+        "peak_rss_mb":   round(peak_rss, 1),
+        "rss_before_mb": round(rss_before, 1),
+    }
+
+
+def _run_quiet(name: str, scale_factor: float, work_dir: Path, seed: int) -> dict:
+    """_run_one with the progress messages of the stage discarded."""
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        return _run_one(name, scale_factor, work_dir, seed)
+
+
+def _run_isolated(name: str, scale_factor: float, work_dir: Path, seed: int) -> dict:
+    """_run_one in a new "spawn" process, so that peak RSS belongs to this stage only."""
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+        return pool.submit(_run_quiet, name, scale_factor, work_dir, seed).result()
+
+
+def _best(runs: list) -> dict:
+    """Fold repeated runs of a stage: the fastest time and the lowest peak RSS."""
+    best = dict(min(runs, key=lambda r: r["seconds"]))
+    best["peak_rss_mb"]   = min(r["peak_rss_mb"] for r in runs)
+    best["rss_before_mb"] = min(r["rss_before_mb"] for r in runs)
+    return best
+
+
+def run_benchmarks(scale_factors=BENCH_SCALE_FACTORS, stages=None, repeat=1, seed=BENCH_SEED) -> dict:
+    """
+    Esegue gli stage (default: tutti) per ogni scale factor e restituisce i risultati.
+
+    Gli stage a monte di quelli richiesti vengono comunque eseguiti (servono
+    i loro output) ma non misurati.
+
+    Returns:
+        {"meta": {...}, "results": {scale_factor: {stage: {...}}}}
+    """
+    all_stages = list(_bench_stages())
+    stages     = stages or all_stages
+    last       = max(all_stages.index(name) for name in stages)
+    results    = {}
+
+    for scale_factor in scale_factors:
+        work_dir = BENCH_DIR / f"sf{scale_factor:g}"
+        work_dir.mkdir(parents=True, exist_ok=True)
+        results[f"{scale_factor:g}"] = sf_results = {}
+
+        for name in all_stages[:last + 1]:
+            runs = [_run_isolated(name, scale_factor, work_dir, seed)
+                    for _ in range(repeat if name in stages else 1)]
+            if name not in stages:
+                continue
+            sf_results[name] = _best(runs)
+            r = sf_results[name]
+            print(f"[SF {scale_factor:>4g}] {name:<31} {r['seconds']:>9.2f}s "
+                  f"{r['rows']:>12,} rows {r['rows_per_sec'] or 0:>12,} rows/s {r['peak_rss_mb']:>9.1f} MiB")
+
+    return {
+        "meta": {
+            "generated_at": datetime.now().isoformat(timespec="seconds"),
+            "python":       platform.python_version(),
+            "platform":     platform.platform(),
+            "cpu_count":    os.cpu_count(),
+            "seed":         seed,
+            "repeat":       repeat,
+        },
+        "results": results,
+    }
+
+
+def compare(current: dict, baseline: dict,
+            time_threshold=BENCH_TIME_THRESHOLD, rss_threshold=BENCH_RSS_THRESHOLD) -> list:
+    """
+    Confronta i risultati con la baseline; solo le coppie (scale factor, stage)
+    presenti in entrambe vengono confrontate (le altre: missing_from_baseline).
+
+    Returns:
+        lista di stringhe, una per regressione (vuota se non ce ne sono)
+    """
+    regressions = []
+    for scale_factor, stages in current["results"].items():
+        for name, now in stages.items():
+            base = baseline["results"].get(scale_factor, {}).get(name)
+            if base is None:
+                continue
+            label = f"SF {scale_factor} {name}"
+            if base["seconds"] >= BENCH_MIN_SECONDS and now["seconds"] > base["seconds"] * (1 + time_threshold):
+                regressions.append(f"{label}: {now['seconds']:.2f}s vs {base['seconds']:.2f}s "
+                                   f"({now['seconds'] / base['seconds'] - 1:+.0%})")
+            if now["peak_rss_mb"] > base["peak_rss_mb"] * (1 + rss_threshold):
+                regressions.append(f"{label}: {now['peak_rss_mb']:.0f} MiB vs {base['peak_rss_mb']:.0f} MiB "
+                                   f"({now['peak_rss_mb'] / base['peak_rss_mb'] - 1:+.0%})")
+    return regressions
+
+
+def missing_from_baseline(current: dict, baseline: dict) -> dict:
+    """
+    Stage misurati che la baseline non contiene, quindi non confrontati da compare().
+
+    Returns:
+        dict {stage: [scale factor, ...]} (vuoto se la baseline copre tutto)
+    """
+    missing = {}
+    for scale_factor, stages in current["results"].items():
+        for name in stages:
+            if name not in baseline["results"].get(scale_factor, {}):
+                missing.setdefault(name, []).append(scale_factor)
+    return missing
+
+
+# ---------------------------------------------------------------------------
+# Entry point
+# ---------------------------------------------------------------------------
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m testing.benchmark",
+                                     description="Benchmark generators, SQLite load and KPIs at several scale factors.")
+    parser.add_argument("-s", "--scale-factors", type=float, nargs="+", default=BENCH_SCALE_FACTORS,
+                        help=f"scale factors to run (default: {' '.join(map(str, BENCH_SCALE_FACTORS))})")
+    parser.add_argument("--stages", nargs="+", choices=list(_bench_stages()), metavar="STAGE",
+                        help="stages to measure (default: all)")
+    parser.add_argument("--repeat", type=int, default=1,
+                        help="runs per stage; the fastest is kept (default: 1)")
+    parser.add_argument("--seed", type=int, default=BENCH_SEED,
+                        help=f"random seed (default: {BENCH_SEED})")
+    parser.add_argument("--output", type=Path, default=BENCH_RESULTS_PATH,
+                        help=f"results JSON (default: {BENCH_RESULTS_PATH})")
+    parser.add_argument("--baseline", type=Path, default=BENCH_BASELINE_PATH,
+                        help=f"baseline JSON to compare with (default: {BENCH_BASELINE_PATH})")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="write the results to --baseline instead of comparing")
+    parser.add_argument("--time-threshold", type=float, default=BENCH_TIME_THRESHOLD,
+                        help=f"tolerated slowdown, 0.25 = +25%% (default: {BENCH_TIME_THRESHOLD})")
+    parser.add_argument("--rss-threshold", type=float, default=BENCH_RSS_THRESHOLD,
+                        help=f"tolerated peak RSS growth (default: {BENCH_RSS_THRESHOLD})")
+    args = parser.parse_args(argv)
+    if args.repeat < 1:
+        parser.error("--repeat must be at least 1")
+
+    current = run_benchmarks(args.scale_factors, args.stages, args.repeat, args.seed)
+    args.output.write_text(json.dumps(current, indent=2))
+    print(f"[OK] Results written to {args.output}")
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(current, indent=2))
+        print(f"[OK] Baseline saved to {args.baseline}")
+        return 0
+    if not args.baseline.exists():
+        print(f"[WARN] {args.baseline} not found — nothing to compare (use --save-baseline).")
+        return 0
+
+    baseline    = json.loads(args.baseline.read_text())
+    regressions = compare(current, baseline, args.time_threshold, args.rss_threshold)
+    missing     = missing_from_baseline(current, baseline)
+    if missing:
+        print(f"[WARN] Not in {args.baseline}, not compared (use --save-baseline):")
+        for name, scale_factors in missing.items():
+            print(f"         {name}: SF {', '.join(scale_factors)}")
+    for regression in regressions:
+        print(f"[REGRESSION] {regression}")
+    if not regressions:
+        print("[OK] No regressions against the baseline.")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,215 @@
+"""
+testing/check_engines.py
+------------------------
+Controlli dei motori di generazione (ENGINE = "numpy" / "python") su un
+dataset piccolo generato con seed fisso.
+
+I due motori usano generatori casuali diversi, per cui le righe non
+coincidono. Si controllano quindi:
+
+  invariants    : per ogni motore, le proprietà che ogni output deve avere
+                  (chiavi uniche, QuantitySold ≤ QuantityOrdered, identità
+                  dello stock di Inventario, aggregati mensili = somme di
+                  Venduto)
+  distributions : numero di righe e statistiche delle distribuzioni (quantità
+                  medie per importanza, fill rate, stockout, ...) uguali fra i
+                  due motori entro STAT_TOLERANCES
+
+I dati vengono generati in CHECK_DIR/<engine> (ricreati a ogni esecuzione). Il
+comando esce con codice 1 se un controllo fallisce.
+
+Utilizzo:
+  python -m testing.check_engines
+  python -m testing.check_engines -s 0.5 --seed 7
+"""
+
+import argparse
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+
+# ---------------------------------------------------------------------------
+# Configurazione
+# ---------------------------------------------------------------------------
+
+CHECK_SCALE_FACTOR = 0.2
+CHECK_SEED         = 42
+
+# Cartella di lavoro dei dati generati (una sottocartella per motore)
+CHECK_DIR = Path("bench_output") / "check_engines"
+
+ENGINES = ["numpy", "python"]
+
+# Chiavi naturali (oltre alle PRIMARY KEY di TABLE_SCHEMA) che devono essere uniche
+NATURAL_KEYS = {
+    "Budget":                ["MaterialID", "BudgetMonth"],
+    "Inventario":            ["MaterialID", "Date"],
+    "Forecast":              ["MaterialID", "ForecastMadeOn", "Horizon"],
+    "VendutoMensile":        ["MaterialID", "SalesMonth"],
+    "VendutoMensileCliente": ["CustomerID", "SalesMonth"],
+}
+
+# Scarto massimo fra i due motori, per prefisso del nome della statistica:
+# (relativo, assoluto) — basta che lo scarto stia entro uno dei due
+STAT_TOLERANCES = {
+    "rows":          (0.10, 0),
+    "qty_ordered":   (0.10, 0),
+    "lines_per_day": (0.10, 0),
+    "fill_rate":     (0.05, 0),
+    "stockout_rate": (0.25, 0.01),
+    "avg_stock":     (0.15, 0),
+}
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+def _tables() -> dict:
+    """Every table of TABLE_SCHEMA read from the current OUTPUT_DIR, IDs as strings."""
+    from analytics.loader import load_table
+    from src.generate_sql_lite_db.schema import TABLE_SCHEMA, KEY_FORMATS
+
+    tables = {}
+    for table in TABLE_SCHEMA:
+        df = load_table(table)
+        tables[table] = df.astype({col: str for col in df.columns if col in KEY_FORMATS})
+    return tables
+
+
+def check_invariants(tables: dict) -> list:
+    """Properties every generated dataset must have, whatever the engine."""
+    import numpy as np
+    from src.generate_sql_lite_db.schema import TABLE_SCHEMA
+
+    errors = []
+    for table, definition in TABLE_SCHEMA.items():
+        keys = [[col] for col, sql_type in definition["columns"].items() if "PRIMARY KEY" in sql_type]
+        for key in keys + ([NATURAL_KEYS[table]] if table in NATURAL_KEYS else []):
+            n = tables[table].duplicated(key).sum()
+            if n:
+                errors.append(f"{table}: {n} duplicate {'+'.join(key)}")
+
+    ordinato, venduto = tables["Ordinato"], tables["Venduto"]
+    orders = venduto.merge(ordinato[["OrderID", "QuantityOrdered"]], on="OrderID", how="left",
+                           suffixes=("", "_order"))
+    if orders["QuantityOrdered_order"].isna().any():
+        errors.append("Venduto: OrderID not in Ordinato")
+    if (orders["QuantityOrdered"] != orders["QuantityOrdered_order"]).any():
+        errors.append("Venduto: QuantityOrdered differs from Ordinato")
+    if ((venduto["QuantitySold"] <= 0) | (venduto["QuantitySold"] > venduto["QuantityOrdered"])).any():
+        errors.append("Venduto: QuantitySold not in 1..QuantityOrdered")
+
+    inv = tables["Inventario"].sort_values(["MaterialID", "Date"], kind="stable")
+    raw = inv["OpeningStock"] + inv["DailyInflow"] - inv["DailyOutflow"]
+    if (inv["ClosingStock"] != np.maximum(raw, 0)).any():
+        errors.append("Inventario: ClosingStock != max(0, OpeningStock + DailyInflow - DailyOutflow)")
+    same = inv["MaterialID"].to_numpy()[1:] == inv["MaterialID"].to_numpy()[:-1]
+    if (inv["OpeningStock"].to_numpy()[1:][same] != inv["ClosingStock"].to_numpy()[:-1][same]).any():
+        errors.append("Inventario: OpeningStock != previous day's ClosingStock")
+    days = inv["Date"].nunique()
+    if len(inv) != len(tables["MasterMaterial"]) * days:
+        errors.append(f"Inventario: {len(inv)} rows != materials × {days} days")
+    shipped = venduto.groupby(["MaterialID", "ShipmentDate"])["QuantitySold"].sum()
+    outflow = inv.set_index(["MaterialID", "Date"])["DailyOutflow"]
+    shipped = shipped.reindex(outflow.index, fill_value=0)
+    if (shipped != outflow).any():
+        errors.append("Inventario: DailyOutflow != QuantitySold shipped that day")
+
+    for table, key in (("VendutoMensile", "MaterialID"), ("VendutoMensileCliente", "CustomerID")):
+        month   = venduto["ShipmentDate"].dt.to_period("M").dt.to_timestamp()
+        sums    = venduto.groupby([venduto[key], month.rename("SalesMonth")])["QuantitySold"].agg(["sum", "size"])
+        monthly = tables[table].set_index([key, "SalesMonth"])
+        sums    = sums.reindex(monthly.index)
+        if ((sums["sum"] != monthly["QuantitySold"]) | (sums["size"] != monthly["Shipments"])).any() \
+                or len(monthly) != len(venduto.groupby([venduto[key], month]).size()):
+            errors.append(f"{table}: QuantitySold / Shipments != sums of Venduto by {key} and month")
+    return errors
+
+
+def statistics(tables: dict) -> dict:
+    """Distribution statistics compared between the engines: {name: value}."""
+    importance = tables["MasterMaterial"].set_index("MaterialID")["Importance"].astype(str)
+    materials  = importance.value_counts()
+    days       = tables["Inventario"]["Date"].nunique()
+
+    stats = {f"rows {table}": len(tables[table]) for table in ("Ordinato", "Venduto", "Inventario", "Forecast")}
+
+    ordinato = tables["Ordinato"].assign(Importance=lambda df: df["MaterialID"].map(importance))
+    for imp, group in ordinato.groupby("Importance"):
+        stats[f"qty_ordered {imp}"]   = group["QuantityOrdered"].mean()
+        stats[f"lines_per_day {imp}"] = len(group) / (materials[imp] * days)
+
+    venduto = tables["Venduto"]
+    stats["fill_rate"] = venduto["QuantitySold"].sum() / venduto["QuantityOrdered"].sum()
+
+    inv = tables["Inventario"].assign(Importance=lambda df: df["MaterialID"].map(importance))
+    raw = inv["OpeningStock"] + inv["DailyInflow"] - inv["DailyOutflow"]
+    for imp, group in inv.assign(stockout=raw < 0).groupby("Importance"):
+        stats[f"stockout_rate {imp}"] = group["stockout"].mean()
+        stats[f"avg_stock {imp}"]     = group["ClosingStock"].mean()
+    return stats
+
+
+def compare_statistics(stats: dict) -> list:
+    """Statistics of the engines that differ by more than STAT_TOLERANCES."""
+    base, other = (stats[engine] for engine in ENGINES)
+    errors = []
+    for name in sorted(set(base) | set(other)):
+        if name not in base or name not in other:
+            errors.append(f"{name}: only in {ENGINES[0] if name in base else ENGINES[1]}")
+            continue
+        a, b           = float(base[name]), float(other[name])
+        relative, abs_ = STAT_TOLERANCES[name.split()[0]]
+        if abs(a - b) > max(relative * max(abs(a), abs(b)), abs_):
+            errors.append(f"{name}: {ENGINES[0]} {a:.4g} vs {ENGINES[1]} {b:.4g} "
+                          f"(tolerance {relative:.0%} or {abs_:g})")
+    return errors
+
+
+def _run_engine(engine: str, scale_factor: float, seed: int) -> tuple:
+    """Generate the data with engine and return (invariant errors, statistics)."""
+    from src.cli import parse_args, _apply_config
+    from src.generate_data.pipeline import run_pipeline
+
+    _apply_config(parse_args(["generate", "-s", str(scale_factor), "-o", str(CHECK_DIR / engine),
+                              "--engine", engine]))
+    run_pipeline(seed=seed, force=True)
+    tables = _tables()
+    return check_invariants(tables), statistics(tables)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m testing.check_engines",
+                                     description="Check the numpy and python generation engines against each other.")
+    parser.add_argument("-s", "--scale-factor", type=float, default=CHECK_SCALE_FACTOR,
+                        help=f"scale factor of the generated data (default: {CHECK_SCALE_FACTOR})")
+    parser.add_argument("--seed", type=int, default=CHECK_SEED, help=f"random seed (default: {CHECK_SEED})")
+    parser.add_argument("-v", "--verbose", action="store_true", help="print the statistics of both engines")
+    args = parser.parse_args(argv)
+
+    # Each engine runs in a new "spawn" process: the generator modules bind
+    # the config (ENGINE, OUTPUT_DIR, scaled sizes) when they are imported
+    results, stats = {}, {}
+    for engine in ENGINES:
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+            errors, stats[engine] = pool.submit(_run_engine, engine, args.scale_factor, args.seed).result()
+        results[f"invariants {engine}"] = errors
+    results["distributions"] = compare_statistics(stats)
+
+    if args.verbose:
+        for name in stats[ENGINES[0]]:
+            print(f"  {name:<28}" + "".join(f"{stats[engine].get(name, float('nan')):>12.4g}" for engine in ENGINES))
+
+    failed = 0
+    for name, errors in results.items():
+        failed += bool(errors)
+        print(f"[{'OK' if not errors else 'FAIL'}] {name}")
+        for error in errors:
+            print(f"       {error}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
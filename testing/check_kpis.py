@@ -0,0 +1,186 @@
+"""
+testing/check_kpis.py
+---------------------
+Controlli dei KPI di analytics su un dataset piccolo generato con seed fisso.
+
+Ogni KPI controllato viene ricalcolato con un'implementazione di riferimento
+semplice (merge e groupby pandas, nessuna ottimizzazione) ristretta ai mesi
+storici, e i numeri del JSON devono coincidere con quelli di riferimento:
+
+  forecast_accuracy : MAE, MAPE, WAPE e Bias % per orizzonte
+  sales_budget      : mesi, quantità e scostamenti % actual vs budget per mese
+
+I dati vengono generati in CHECK_DIR (ricreati a ogni esecuzione), in un
+processo a parte e con una finestra diversa dai default di src/config.py
+(CHECK_START_DATE, CHECK_MONTHS_HISTORY): i KPI, calcolati con i default,
+devono ricavare la finestra storica dai dati. Il comando esce con codice 1 se
+un controllo fallisce.
+
+Utilizzo:
+  python -m testing.check_kpis
+  python -m testing.check_kpis -s 0.5 --seed 7
+"""
+
+import argparse
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+
+# ---------------------------------------------------------------------------
+# Configurazione
+# ---------------------------------------------------------------------------
+
+CHECK_SCALE_FACTOR = 0.2
+CHECK_SEED         = 42
+
+# Finestra storica dei dati generati, diversa dai default di src/config.py
+CHECK_START_DATE     = "2024-06-01"
+CHECK_MONTHS_HISTORY = 12
+
+# Cartella di lavoro dei dati generati
+CHECK_DIR = Path("bench_output") / "check_kpis"
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+def _history(df, column):
+    """Rows of df whose month (column) falls in the CHECK_MONTHS_HISTORY months from CHECK_START_DATE."""
+    import pandas as pd
+
+    start = pd.Timestamp(CHECK_START_DATE).to_period("M").to_timestamp()
+    end   = start + pd.DateOffset(months=CHECK_MONTHS_HISTORY)
+    return df[(df[column] >= start) & (df[column] < end)]
+
+
+def _compare(name: str, kpi, reference, keys: list, columns: dict) -> list:
+    """
+    Differences between the KPI rows and the reference rows: same keys, and
+    values equal within the rounding of the JSON (columns: {column: decimals}).
+    """
+    import pandas as pd
+
+    kpi       = pd.DataFrame(kpi).set_index(keys).sort_index()
+    reference = reference.set_index(keys).sort_index()
+    if not kpi.index.equals(reference.index):
+        return [f"{name}: rows {list(kpi.index)} != reference {list(reference.index)}"]
+
+    errors = []
+    for col, digits in columns.items():
+        diff = (kpi[col].astype(float) - reference[col]).abs().max()
+        if not diff <= 0.5 * 10 ** -digits + 1e-9:
+            errors.append(f"{name}.{col}: max difference {diff} from the history-only reference")
+    return errors
+
+
+def check_history_window() -> list:
+    """history_months() is the generated window, not the START_DATE / MONTHS_HISTORY defaults."""
+    import numpy as np
+    from analytics.loader import history_months
+
+    first    = np.datetime64(CHECK_START_DATE, "M")
+    expected = (first, first + CHECK_MONTHS_HISTORY - 1)
+    window   = history_months()
+    return [] if window == expected else [f"history_window: {window} != generated {expected}"]
+
+
+def check_forecast_accuracy() -> list:
+    """kpi_forecast_accuracy_by_horizon vs a merge of Forecast and VendutoMensile over the history months."""
+    import pandas as pd
+    from analytics.loader import load_table
+    from analytics import kpi_forecast_accuracy
+
+    tables = {table: load_table(table, columns) for table, columns in kpi_forecast_accuracy.KPI_INPUTS.items()}
+    kpi    = kpi_forecast_accuracy.compute(tables)["kpi_forecast_accuracy_by_horizon.json"]["data"]
+
+    sales    = tables["VendutoMensile"].astype({"MaterialID": str})
+    forecast = _history(tables["Forecast"].astype({"MaterialID": str}), "ForecastMonth")
+    df = forecast.merge(sales, left_on=["MaterialID", "ForecastMonth"], right_on=["MaterialID", "SalesMonth"],
+                        how="left")
+    df["actual"] = df["QuantitySold"].fillna(0)
+    df["error"]  = df["ForecastQty"] - df["actual"]
+    df["abs"]    = df["error"].abs()
+
+    rows = []
+    for horizon, group in df.groupby("Horizon"):
+        positive = group[group["actual"] > 0]
+        rows.append({
+            "Horizon":  horizon,
+            "mae":      group["abs"].mean(),
+            "mape":     (positive["abs"] / positive["actual"]).mean(),
+            "wape":     group["abs"].sum() / group["actual"].sum(),
+            "bias_pct": group["error"].sum() / group["actual"].sum(),
+        })
+    return _compare("forecast_accuracy", kpi, pd.DataFrame(rows), ["Horizon"],
+                    {"mae": 2, "mape": 4, "wape": 4, "bias_pct": 4})
+
+
+def check_sales_budget() -> list:
+    """kpi_sales_vs_budget_by_month vs VendutoMensile and Budget summed by month over the history months."""
+    import pandas as pd
+    from analytics.loader import load_table
+    from analytics import kpi_sales_budget
+
+    tables = {table: load_table(table, columns) for table, columns in kpi_sales_budget.KPI_INPUTS.items()}
+    kpi    = kpi_sales_budget.compute(tables)["kpi_sales_vs_budget_by_month.json"]["data"]
+
+    actual = _history(tables["VendutoMensile"], "SalesMonth")
+    budget = _history(tables["Budget"], "BudgetMonth")
+    df = pd.DataFrame({
+        "actual_qty": actual.groupby(actual["SalesMonth"].dt.strftime("%Y-%m"))["QuantitySold"].sum(),
+        "budget_qty": budget.groupby(budget["BudgetMonth"].dt.strftime("%Y-%m"))["BudgetQty"].sum(),
+    }).fillna(0)
+    df["qty_variance_pct"] = (df["actual_qty"] - df["budget_qty"]) / df["budget_qty"]
+    df = df.rename_axis("month").reset_index()
+    return _compare("sales_budget", kpi, df, ["month"],
+                    {"actual_qty": 0, "budget_qty": 0, "qty_variance_pct": 4})
+
+
+# Controlli eseguiti da main(), nell'ordine
+CHECKS = {
+    "history_window":    check_history_window,
+    "forecast_accuracy": check_forecast_accuracy,
+    "sales_budget":      check_sales_budget,
+}
+
+
+def _generate(scale_factor: float, seed: int) -> None:
+    """Generate the data in CHECK_DIR over the CHECK_START_DATE / CHECK_MONTHS_HISTORY window."""
+    from src.cli import parse_args, _apply_config
+    from src.generate_data.pipeline import run_pipeline
+
+    _apply_config(parse_args(["generate", "-s", str(scale_factor), "-o", str(CHECK_DIR),
+                              "--start-date", CHECK_START_DATE, "--months-history", str(CHECK_MONTHS_HISTORY)]))
+    run_pipeline(seed=seed, force=True)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m testing.check_kpis",
+                                     description="Check the analytics KPIs against simple reference implementations.")
+    parser.add_argument("-s", "--scale-factor", type=float, default=CHECK_SCALE_FACTOR,
+                        help=f"scale factor of the generated data (default: {CHECK_SCALE_FACTOR})")
+    parser.add_argument("--seed", type=int, default=CHECK_SEED, help=f"random seed (default: {CHECK_SEED})")
+    args = parser.parse_args(argv)
+
+    # Generation in a new "spawn" process: here config keeps its defaults, as
+    # in a separate `python -m src analytics` run
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+        pool.submit(_generate, args.scale_factor, args.seed).result()
+
+    from src.cli import parse_args, _apply_config
+    _apply_config(parse_args(["analytics", "-o", str(CHECK_DIR)]))
+
+    failed = 0
+    for name, check in CHECKS.items():
+        errors = check()
+        failed += bool(errors)
+        print(f"[{'OK' if not errors else 'FAIL'}] {name}")
+        for error in errors:
+            print(f"       {error}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
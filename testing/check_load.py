@@ -0,0 +1,124 @@
+"""
+testing/check_load.py
+---------------------
+Controlli del caricamento nel DB SQLite su un dataset piccolo generato con
+seed fisso.
+
+  refresh  : dopo `generate` (tabelle caricate dai DataFrame in memoria) un
+             `load --refresh` (tabelle lette dai CSV) trova tutte le tabelle
+             invariate e non ne ricarica nessuna
+  csv_load : un `load` completo dai CSV produce le stesse righe e le stesse
+             impronte (_LoadManifest) del caricamento da memoria
+
+I dati vengono generati in CHECK_DIR (ricreati a ogni esecuzione). Il comando
+esce con codice 1 se un controllo fallisce.
+
+Utilizzo:
+  python -m testing.check_load
+  python -m testing.check_load -s 0.5 --seed 7
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+# ---------------------------------------------------------------------------
+# Configurazione
+# ---------------------------------------------------------------------------
+
+CHECK_SCALE_FACTOR = 0.2
+CHECK_SEED         = 42
+
+# Cartella di lavoro dei dati generati
+CHECK_DIR = Path("bench_output") / "check_load"
+
+# DB caricato dai CSV per il controllo csv_load
+CSV_DB_NAME = "from_csv.db"
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+def _manifest(db_path) -> dict:
+    """{table_name: fingerprint} saved by load_to_db in db_path."""
+    import sqlite3
+    from src.generate_sql_lite_db.load_to_db import MANIFEST_TABLE
+
+    with sqlite3.connect(db_path) as conn:
+        return dict(conn.execute(f'SELECT "TableName", "Fingerprint" FROM "{MANIFEST_TABLE}"'))
+
+
+def check_refresh() -> list:
+    """load_to_db(refresh=True) right after generate reloads no table."""
+    from src.generate_sql_lite_db.load_to_db import load_to_db
+
+    reloaded = load_to_db(refresh=True)
+    return [f"refresh: '{table}' reloaded, its fingerprint changed" for table in reloaded]
+
+
+def check_csv_load() -> list:
+    """A full load_to_db() from the CSVs gives the same rows and fingerprints as the load from memory."""
+    import sqlite3
+    import src.config as config
+    from src.generate_sql_lite_db.load_to_db import load_to_db
+    from src.generate_sql_lite_db.schema import TABLE_SCHEMA
+
+    memory_db = config.DB_PATH
+    csv_db    = CHECK_DIR / CSV_DB_NAME
+    config.DB_PATH = csv_db
+    try:
+        load_to_db()
+    finally:
+        config.DB_PATH = memory_db
+
+    errors   = []
+    expected = _manifest(memory_db)
+    for table, fingerprint in _manifest(csv_db).items():
+        if expected.get(table) != fingerprint:
+            errors.append(f"csv_load: '{table}' fingerprint differs from the load from memory")
+
+    with sqlite3.connect(memory_db) as conn:
+        conn.execute("ATTACH DATABASE ? AS csv", (str(csv_db),))
+        for table in TABLE_SCHEMA:
+            for a, b in (("main", "csv"), ("csv", "main")):
+                n = conn.execute(f'SELECT COUNT(*) FROM (SELECT * FROM {a}."{table}" '
+                                 f'EXCEPT SELECT * FROM {b}."{table}")').fetchone()[0]
+                if n:
+                    errors.append(f"csv_load: '{table}' has {n} row(s) in {a} not in {b}")
+    return errors
+
+
+# Controlli eseguiti da main(), nell'ordine
+CHECKS = {
+    "refresh":  check_refresh,
+    "csv_load": check_csv_load,
+}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m testing.check_load",
+                                     description="Check that loads from memory and from the CSVs agree.")
+    parser.add_argument("-s", "--scale-factor", type=float, default=CHECK_SCALE_FACTOR,
+                        help=f"scale factor of the generated data (default: {CHECK_SCALE_FACTOR})")
+    parser.add_argument("--seed", type=int, default=CHECK_SEED, help=f"random seed (default: {CHECK_SEED})")
+    args = parser.parse_args(argv)
+
+    from src.cli import parse_args, _apply_config
+    from src.generate_data.pipeline import run_pipeline
+
+    _apply_config(parse_args(["generate", "-s", str(args.scale_factor), "-o", str(CHECK_DIR)]))
+    run_pipeline(seed=args.seed, force=True, load_db=True)
+
+    failed = 0
+    for name, check in CHECKS.items():
+        errors = check()
+        failed += bool(errors)
+        print(f"[{'OK' if not errors else 'FAIL'}] {name}")
+        for error in errors:
+            print(f"       {error}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())